@@ -1,20 +1,66 @@
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
 
-from app.models.arxiv import ArxivPaper
+from app.api.v1.markdown_response import (
+    cancel_on_disconnect,
+    raw_markdown_response,
+    wants_raw_markdown,
+)
+from app.models.arxiv import ArxivMetadata, ArxivPaper
 from app.services.arxiv_service import ArxivService
+from app.services.request_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE
 from app.services.zotero_connector import ZoteroConnectorService
-from app.services.zotero_service import ZoteroService
+from app.services.zotero_service import zotero_service
 
 router = APIRouter(prefix="/arxiv", tags=["arxiv"])
 arxiv_service = ArxivService()
-zotero_service = ZoteroService(user_id=0)
 zotero_connector = ZoteroConnectorService(
     zotero_service=zotero_service, arxiv_service=arxiv_service
 )
 
 
+# 批量元数据接口单次最多接受的ID数量
+MAX_METADATA_IDS = 200
+
+
+def _parse_ids(ids: list[str]) -> list[str]:
+    """解析逗号分隔或重复传入的ID列表"""
+    arxiv_ids = [arxiv_id.strip() for value in ids for arxiv_id in value.split(",")]
+    arxiv_ids = [arxiv_id for arxiv_id in arxiv_ids if arxiv_id]
+    if not arxiv_ids:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(arxiv_ids) > MAX_METADATA_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_METADATA_IDS} ids per request"
+        )
+    return arxiv_ids
+
+
+@router.get("/metadata", response_model=dict[str, ArxivMetadata | None])
+async def get_arxiv_metadata_batch(
+    ids: list[str] = Query(..., description="arXiv ID，逗号分隔或重复传入"),
+    bulk: bool = False,
+) -> dict[str, ArxivMetadata | None]:
+    """
+    批量获取arXiv论文元数据，未缓存的论文合并为一次arXiv查询；不存在的论文为null
+
+    bulk=true 时使用低优先级通道，不影响交互式请求
+    """
+    arxiv_ids = _parse_ids(ids)
+    priority = PRIORITY_BULK if bulk else PRIORITY_INTERACTIVE
+    return await arxiv_service.get_arxiv_metadata_many(arxiv_ids, priority)
+
+
+@router.post("/prefetch")
+async def prefetch_arxiv_pdfs(
+    ids: list[str] = Query(..., description="arXiv ID，逗号分隔或重复传入"),
+    concurrency: int | None = Query(None, ge=1, le=16),
+) -> dict[str, str | None]:
+    """批量预下载arXiv PDF（低优先级通道、并发受限），返回各论文的PDF路径，失败为null"""
+    return await arxiv_service.prefetch_pdfs(_parse_ids(ids), concurrency)
+
+
 @router.get("/{arxiv_id}", response_model=ArxivPaper)
 async def get_arxiv_paper(arxiv_id: str) -> ArxivPaper:
     """获取arXiv论文元数据"""
@@ -31,22 +77,33 @@ async def get_arxiv_pdf(arxiv_id: str):
 
 
 @router.get("/{arxiv_id}/markdown")
-async def get_arxiv_markdown(arxiv_id: str) -> dict[str, Any]:
-    """获取arXiv论文的markdown内容"""
-    markdown = await arxiv_service.get_arxiv_markdown(arxiv_id)
+async def get_arxiv_markdown(arxiv_id: str, request: Request, raw: bool = False):
+    """
+    获取arXiv论文的markdown内容
+
+    raw=true 或 Accept: text/markdown 时直接返回缓存文件（支持gzip与条件请求）
+    """
+    if wants_raw_markdown(request, raw):
+        pdf_path = await arxiv_service.get_arxiv_pdf(arxiv_id)
+        return await cancel_on_disconnect(
+            request, raw_markdown_response(request, pdf_path)
+        )
+    markdown = await cancel_on_disconnect(
+        request, arxiv_service.get_arxiv_markdown(arxiv_id)
+    )
     return {"arxiv_id": arxiv_id, "markdown": markdown}
 
 
 @router.get("/{arxiv_id}/info")
 async def get_cache_info(arxiv_id: str) -> dict[str, Any]:
     """获取缓存状态信息"""
-    return arxiv_service.get_cache_info(arxiv_id)
+    return await arxiv_service.get_cache_info(arxiv_id)
 
 
 @router.delete("/{arxiv_id}/cache")
 async def clear_cache(arxiv_id: str) -> str:
     """清除特定论文的缓存"""
-    arxiv_service.clear_cache(arxiv_id)
+    await arxiv_service.clear_cache(arxiv_id)
     return "缓存已清除"
 
 
@@ -0,0 +1,159 @@
+"""
+以原始 text/markdown 形式返回解析结果
+
+缓存文件本身是gzip压缩的，客户端接受gzip时直接发送磁盘文件（Content-Encoding: gzip），
+不读入内存也不做JSON编码；否则流式解压发送。支持 ETag / Last-Modified 条件请求
+"""
+
+import asyncio
+import contextlib
+import gzip
+from collections.abc import AsyncIterator, Awaitable, Callable
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.services.pdf_parser import pdf_parser
+
+MARKDOWN_MEDIA_TYPE = "text/markdown; charset=utf-8"
+
+# 流式解压时每次读取的字节数
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+# 等待解析期间检查客户端是否断开的间隔（秒）
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# 客户端已断开（nginx约定的状态码，不会真正发送）
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def cancel_on_disconnect[T](request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    等待awaitable完成，客户端提前断开时取消它
+
+    解析服务在所有等待方都取消后会撤销排队中的转换，断开的请求不再占用工作进程
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(
+                    status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected"
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+
+
+def wants_raw_markdown(request: Request, raw: bool) -> bool:
+    """raw=true 或 Accept 首选 text/markdown 时返回原始Markdown"""
+    return raw or request.headers.get("accept", "").startswith("text/markdown")
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding 是否允许gzip（q=0 表示拒绝）"""
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """按 If-None-Match（优先）或 If-Modified-Since 判断客户端缓存是否仍有效"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+async def _decompress(path: Path) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    handle = await loop.run_in_executor(None, gzip.open, path, "rb")
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, handle.read, DECOMPRESS_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+def markdown_file_response(request: Request, cache_key: str, path: Path) -> Response:
+    """发送gzip压缩的缓存文件，按客户端能力选择直接发送或解压"""
+    st = path.stat()
+    gzipped = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    # 缓存键是PDF内容哈希，加上文件修改时间区分重新解析的结果；两种编码使用不同的ETag
+    etag = f'"{cache_key}-{int(st.st_mtime):x}{"-gz" if gzipped else ""}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(
+            path, media_type=MARKDOWN_MEDIA_TYPE, headers=headers, stat_result=st
+        )
+    return StreamingResponse(
+        _decompress(path), media_type=MARKDOWN_MEDIA_TYPE, headers=headers
+    )
+
+
+async def raw_markdown_response(
+    request: Request,
+    pdf_path: str,
+    on_parsed: Callable[[str], Any] | None = None,
+) -> Response:
+    """
+    以 text/markdown 返回PDF的解析结果
+
+    Args:
+        request: 当前请求（读取 Accept-Encoding 与条件请求头）
+        pdf_path: PDF文件路径
+        on_parsed: 本次请求触发了解析时，在响应发送后以全文调用（如更新全文索引）
+    """
+    cached = await pdf_parser.cached_file(pdf_path)
+    if cached is not None:
+        return markdown_file_response(request, *cached)
+
+    markdown = await pdf_parser.parse_pdf(pdf_path)
+    background = BackgroundTask(on_parsed, markdown) if on_parsed else None
+    cached = await pdf_parser.cached_file(pdf_path)
+    if cached is None:
+        # 缓存写入失败时直接返回解析结果
+        return PlainTextResponse(
+            markdown, media_type=MARKDOWN_MEDIA_TYPE, background=background
+        )
+    response = markdown_file_response(request, *cached)
+    response.background = background
+    return response
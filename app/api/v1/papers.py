@@ -1,175 +1,308 @@
-import os
-import urllib.parse
-from pathlib import Path
+import json
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.models.paper import PaperResponse
+from app.api.v1.markdown_response import (
+    cancel_on_disconnect,
+    raw_markdown_response,
+    wants_raw_markdown,
+)
+from app.models.paper import PaperFacets, PaperResponse
+from app.services.attachment_resolver import (
+    AttachmentResolutionError,
+    ResolvedPDF,
+    attachment_resolver,
+)
 from app.services.pdf_parser import pdf_parser
-from app.services.zotero_service import ZoteroService
+from app.services.preparse_scheduler import preparse_scheduler
+from app.services.search_index import search_index
+from app.services.zotero_mirror import MirrorUnavailableError, PaperFilters
+from app.services.zotero_service import zotero_service
 
 router = APIRouter()
-zotero_service = ZoteroService(user_id=0)  # 本地API，user_id为0
 
+# 单页最多返回的论文数量
+MAX_PAGE_SIZE = 500
 
-@router.get("/papers", response_model=list[PaperResponse])
-async def get_papers(q: str | None = None, tag: str | None = None, limit: int = 100):
-    """获取论文列表（从Zotero）"""
-    papers = await zotero_service.get_papers_with_pdfs(limit=limit, q=q, tag=tag)
-
-    # 转换为PaperResponse模型
-    paper_responses = []
-    for paper in papers:
-        data = paper.get("data", {})
-        authors = ""
-        if "creators" in data:
-            author_names = []
-            for creator in data["creators"]:
-                if creator.get("creatorType") == "author":
-                    name_parts = []
-                    if creator.get("firstName"):
-                        name_parts.append(creator["firstName"])
-                    if creator.get("lastName"):
-                        name_parts.append(creator["lastName"])
-                    author_names.append(" ".join(name_parts))
-            authors = ", ".join(author_names)
-
-        # 获取PDF附件和URL
-        pdf_attachments = paper.get("pdf_attachments", [])
-        pdf_url = ""
-        if pdf_attachments:
-            pdf_url = (
-                await zotero_service.get_pdf_file_path(pdf_attachments[0]["key"]) or ""
-            )
-
-        paper_responses.append(
-            PaperResponse(
-                id=paper.get("key", ""),
-                title=data.get("title", "无标题"),
-                authors=authors,
-                year=data.get("date", ""),
-                journal=data.get("publicationTitle", ""),
-                abstract=data.get("abstractNote", ""),
-                doi=data.get("DOI", ""),
-                url=data.get("url", ""),
-                tags=[tag.get("tag", "") for tag in data.get("tags", [])],
-                pdf_path=pdf_url,
-                has_pdf=len(pdf_attachments) > 0,
-            )
-        )
 
-    return paper_responses
+def _format_authors(data: dict) -> str:
+    """将Zotero creators转换为作者字符串"""
+    author_names = []
+    for creator in data.get("creators", []):
+        if creator.get("creatorType") == "author":
+            name_parts = []
+            if creator.get("firstName"):
+                name_parts.append(creator["firstName"])
+            if creator.get("lastName"):
+                name_parts.append(creator["lastName"])
+            author_names.append(" ".join(name_parts))
+    return ", ".join(author_names)
 
 
-@router.get("/papers/{paper_id}", response_model=PaperResponse)
-async def get_paper(paper_id: str):
-    """获取特定论文（从Zotero）"""
-    paper = await zotero_service.get_paper_by_key(paper_id)
-    if not paper:
-        raise HTTPException(status_code=404, detail="Paper not found")
-
+def _to_paper_response(paper: dict) -> PaperResponse:
+    """将已解析PDF附件的Zotero条目转换为PaperResponse"""
     data = paper.get("data", {})
-    authors = ""
-    if "creators" in data:
-        author_names = []
-        for creator in data["creators"]:
-            if creator.get("creatorType") == "author":
-                name_parts = []
-                if creator.get("firstName"):
-                    name_parts.append(creator["firstName"])
-                if creator.get("lastName"):
-                    name_parts.append(creator["lastName"])
-                author_names.append(" ".join(name_parts))
-        authors = ", ".join(author_names)
-
-    # 获取PDF附件和URL
-    pdf_attachments = await zotero_service.get_pdf_attachments(paper_id)
-    pdf_url = ""
-    if pdf_attachments:
-        pdf_url = (
-            await zotero_service.get_pdf_file_path(pdf_attachments[0]["key"]) or ""
-        )
-
+    pdf_attachments = paper.get("pdf_attachments", [])
     return PaperResponse(
         id=paper.get("key", ""),
         title=data.get("title", "无标题"),
-        authors=authors,
+        authors=_format_authors(data),
         year=data.get("date", ""),
         journal=data.get("publicationTitle", ""),
         abstract=data.get("abstractNote", ""),
         doi=data.get("DOI", ""),
         url=data.get("url", ""),
         tags=[tag.get("tag", "") for tag in data.get("tags", [])],
-        pdf_path=pdf_url,
+        pdf_path=paper.get("pdf_path") or "",
         has_pdf=len(pdf_attachments) > 0,
     )
 
 
-@router.get("/papers/{paper_id}/pdf")
-async def get_paper_pdf(paper_id: str):
-    """获取论文PDF文件"""
-    # 获取论文详情
-    paper = await zotero_service.get_paper_by_key(paper_id)
+def _paper_filters(
+    tag: list[str] = Query([]),
+    year: list[str] = Query([]),
+    journal: list[str] = Query([]),
+    item_type: list[str] = Query([]),
+    has_pdf: bool | None = True,
+) -> PaperFilters:
+    """从查询参数构造分面过滤条件，同一参数可重复传入多个取值"""
+    return PaperFilters(
+        tags=tag, years=year, journals=journal, item_types=item_type, has_pdf=has_pdf
+    )
+
+
+@router.get("/papers", response_model=list[PaperResponse])
+async def get_papers(
+    request: Request,
+    response: Response,
+    q: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    stream: bool = False,
+    filters: PaperFilters = Depends(_paper_filters),
+):
+    """
+    获取论文列表（优先从本地镜像读取）
+
+    下一页游标通过 X-Next-Cursor 响应头返回；stream=true 或
+    Accept: application/x-ndjson 时以NDJSON逐条流式返回。
+    分面过滤（多个tag、year、journal、item_type、has_pdf）在本地镜像中计算
+    """
+    try:
+        papers, next_cursor = await zotero_service.stream_papers(
+            limit=limit, q=q, cursor=cursor, filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except MirrorUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+
+        async def ndjson_lines():
+            async for paper in papers:
+                yield _to_paper_response(paper).model_dump_json() + "\n"
+
+        return StreamingResponse(
+            ndjson_lines(), media_type="application/x-ndjson", headers=headers
+        )
+
+    # PDF附件和路径已在批量解析中获取，这里直接复用
+    response.headers.update(headers)
+    return [_to_paper_response(paper) async for paper in papers]
+
+
+@router.get("/papers/facets", response_model=PaperFacets)
+async def get_paper_facets(
+    q: str | None = None, filters: PaperFilters = Depends(_paper_filters)
+):
+    """获取论文列表的分面计数，过滤参数与 /papers 相同"""
+    try:
+        return await zotero_service.get_facets(q=q, filters=filters)
+    except MirrorUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+
+
+@router.get("/papers/{paper_id}", response_model=PaperResponse)
+async def get_paper(paper_id: str):
+    """获取特定论文（优先从本地镜像读取）"""
+    paper = await zotero_service.get_paper(paper_id)
     if not paper:
         raise HTTPException(status_code=404, detail="Paper not found")
 
-    # 获取PDF附件
-    pdfs = await zotero_service.get_pdf_attachments(paper_id)
-    if not pdfs:
-        raise HTTPException(status_code=404, detail="No PDF found")
+    return _to_paper_response(paper)
 
-    # 获取PDF文件的实际路径
-    pdf_url = await zotero_service.get_pdf_file_path(pdfs[0]["key"])
-    if not pdf_url:
-        raise HTTPException(status_code=404, detail="PDF file not accessible")
 
-    # 从file:// URL提取本地文件路径
-    if pdf_url.startswith("file://"):
-        pdf_file_path = urllib.parse.unquote(pdf_url.replace("file://", ""))
-    else:
-        pdf_file_path = pdf_url
+async def _resolve_pdf(paper_id: str) -> ResolvedPDF:
+    """解析论文的PDF附件路径，并预解析相邻论文（读者接下来很可能打开它们）"""
+    try:
+        resolved = await attachment_resolver.resolve(paper_id)
+    except AttachmentResolutionError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    preparse_scheduler.note_opened(paper_id)
+    return resolved
 
-    # 检查文件是否存在
 
-    if not os.path.exists(pdf_file_path):
-        raise HTTPException(status_code=404, detail="PDF file not found")
+@router.get("/papers/{paper_id}/pdf")
+async def get_paper_pdf(paper_id: str):
+    """获取论文PDF文件"""
+    # 路径解析缓存命中时直接读取本地文件，不访问Zotero
+    resolved = await _resolve_pdf(paper_id)
 
     # 直接提供文件服务，而不是重定向
-    return FileResponse(pdf_file_path, media_type="application/pdf")
+    return FileResponse(resolved.path, media_type="application/pdf")
 
 
 @router.get("/papers/{paper_id}/markdown")
-async def get_paper_markdown(paper_id: str):
-    """获取论文PDF的Markdown格式内容"""
-    # 获取论文详情
-    paper = await zotero_service.get_paper_by_key(paper_id)
-    if not paper:
-        raise HTTPException(status_code=404, detail="Paper not found")
+async def get_paper_markdown(
+    paper_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    stream: bool = False,
+    raw: bool = False,
+    engine: Literal["full", "text", "auto"] = "full",
+    start: int | None = Query(None, ge=0),
+    end: int | None = Query(None, ge=0),
+):
+    """
+    获取论文PDF的Markdown格式内容
 
-    # 获取PDF附件
-    pdfs = await zotero_service.get_pdf_attachments(paper_id)
-    if not pdfs:
-        raise HTTPException(status_code=404, detail="No PDF found")
+    stream=true 或 Accept: application/x-ndjson 时以NDJSON边解析边返回：
+    每行 {"index": 序号, "markdown": 片段}，最后一行 {"done": true}。
+    raw=true 或 Accept: text/markdown 时直接返回缓存文件（支持gzip与条件请求）。
+    指定 start/end 时只返回Markdown UTF-8编码中 [start, end) 字节区间的内容。
 
-    # 获取PDF文件的实际路径
-    pdf_url = await zotero_service.get_pdf_file_path(pdfs[0]["key"])
-    if not pdf_url:
-        raise HTTPException(status_code=404, detail="PDF file not accessible")
+    engine 选择解析引擎：full 为完整转换；text 为快速纯文本提取；auto 在没有完整结果时
+    先返回快速结果并在后台升级为完整转换，响应中的 engine 字段表示实际使用的引擎
+    """
+    resolved = await _resolve_pdf(paper_id)
+
+    if start is not None or end is not None:
+        try:
+            markdown = await cancel_on_disconnect(
+                request, pdf_parser.read_range(str(resolved.path), start or 0, end)
+            )
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e)) from e
+        return {
+            "paper_id": paper_id,
+            "start": start or 0,
+            "end": end,
+            "markdown": markdown,
+        }
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return _stream_markdown(paper_id, resolved)
+
+    if wants_raw_markdown(request, raw):
+
+        async def index_body(markdown: str):
+            await search_index.index_body(paper_id, markdown, resolved.paper)
+
+        return await cancel_on_disconnect(
+            request,
+            raw_markdown_response(request, str(resolved.path), on_parsed=index_body),
+        )
 
-    # 从本地文件路径读取PDF
-    # 提取本地文件路径从file:// URL
-    if pdf_url.startswith("file://"):
-        pdf_file = urllib.parse.unquote(pdf_url.replace("file://", ""))
+    # 客户端断开时不再等待解析，无人等待的排队转换会被撤销
+    if engine == "auto":
+        markdown, engine = await cancel_on_disconnect(
+            request, pdf_parser.parse_fast(str(resolved.path))
+        )
     else:
-        pdf_file = pdf_url
+        markdown = await cancel_on_disconnect(
+            request, pdf_parser.parse_pdf(str(resolved.path), engine=engine)
+        )
+    # 响应发送后增量更新全文索引（正文未变化时跳过）
+    background_tasks.add_task(
+        search_index.index_body, paper_id, markdown, resolved.paper
+    )
+    return {"paper_id": paper_id, "markdown": markdown, "engine": engine}
+
+
+@router.get("/papers/{paper_id}/markdown/sections")
+async def get_paper_sections(paper_id: str, request: Request):
+    """
+    获取论文Markdown的章节大纲
+
+    每个章节包含标题、层级、字节区间 [start, end)（包含子章节）与大致token数，
+    可通过 /markdown/sections/{index} 或 /markdown?start=&end= 读取具体内容
+    """
+    resolved = await _resolve_pdf(paper_id)
+    try:
+        index = await cancel_on_disconnect(
+            request, pdf_parser.get_sections(str(resolved.path))
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return {
+        "paper_id": paper_id,
+        "bytes": index["bytes"],
+        "sections": index["sections"],
+    }
 
-    pdf_file_path = Path(pdf_file)
-    if not pdf_file_path.exists():
-        raise HTTPException(status_code=404, detail="PDF file not found")
 
-    markdown = await pdf_parser.parse_pdf(str(pdf_file_path))
-    return {"paper_id": paper_id, "markdown": markdown}
+@router.get("/papers/{paper_id}/markdown/sections/{index}")
+async def get_paper_section(paper_id: str, index: int, request: Request):
+    """获取论文Markdown中单个章节（含子章节）的内容"""
+    resolved = await _resolve_pdf(paper_id)
+    pdf_path = str(resolved.path)
+    try:
+        sections = (
+            await cancel_on_disconnect(request, pdf_parser.get_sections(pdf_path))
+        )["sections"]
+        if not 0 <= index < len(sections):
+            raise HTTPException(status_code=404, detail="Section not found")
+        section = sections[index]
+        markdown = await pdf_parser.read_range(
+            pdf_path, section["start"], section["end"]
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return {"paper_id": paper_id, "section": section, "markdown": markdown}
+
+
+def _stream_markdown(paper_id: str, resolved: ResolvedPDF) -> StreamingResponse:
+    """逐页流式返回Markdown，完整读取后更新全文索引"""
+    chunks: list[str] = []
+    completed = False
+
+    async def ndjson_lines():
+        nonlocal completed
+        try:
+            async for chunk in pdf_parser.stream_pdf(str(resolved.path)):
+                yield json.dumps(
+                    {"index": len(chunks), "markdown": chunk}, ensure_ascii=False
+                ) + "\n"
+                chunks.append(chunk)
+        except Exception as e:
+            # 响应头已发出，只能在流中报告错误
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+            return
+        completed = True
+        yield json.dumps({"done": True, "paper_id": paper_id}) + "\n"
+
+    async def index_body():
+        if completed:
+            await search_index.index_body(paper_id, "".join(chunks), resolved.paper)
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(index_body),
+    )
 
 
 @router.get("/health")
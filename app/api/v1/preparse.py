@@ -0,0 +1,27 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.services.preparse_scheduler import preparse_scheduler
+
+router = APIRouter(prefix="/preparse")
+
+
+@router.get("")
+async def get_preparse_status() -> dict[str, Any]:
+    """获取后台预解析调度器状态"""
+    return preparse_scheduler.status()
+
+
+@router.post("/pause")
+async def pause_preparse() -> dict[str, Any]:
+    """暂停后台预解析（正在进行的任务会继续完成）"""
+    preparse_scheduler.pause()
+    return preparse_scheduler.status()
+
+
+@router.post("/resume")
+async def resume_preparse() -> dict[str, Any]:
+    """恢复后台预解析"""
+    preparse_scheduler.resume()
+    return preparse_scheduler.status()
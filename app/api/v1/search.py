@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Query
+
+from app.models.search import SearchResponse
+from app.services.search_index import search_index
+from app.services.zotero_service import zotero_service
+
+router = APIRouter(prefix="/search")
+
+
+@router.get("", response_model=SearchResponse)
+async def search_papers(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+) -> SearchResponse:
+    """在本地全文索引中搜索论文（标题、作者、摘要、标签及已解析的正文）"""
+    result = await search_index.search(q, limit=limit, offset=offset)
+    return SearchResponse(query=q, **result)
+
+
+@router.post("/reindex")
+async def reindex_papers() -> dict[str, int]:
+    """重建论文元数据索引"""
+    updated = await search_index.reindex(zotero_service)
+    return {"updated": updated}
@@ -0,0 +1,30 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.api.v1.arxiv import arxiv_service
+from app.services.attachment_resolver import attachment_resolver
+from app.services.pdf_parser import pdf_parser
+from app.services.request_scheduler import arxiv_scheduler
+from app.services.zotero_service import zotero_service
+
+router = APIRouter(prefix="/stats")
+
+
+@router.get("")
+async def get_stats() -> dict[str, Any]:
+    """获取各类缓存的统计信息"""
+    return {
+        "zotero_response_cache": zotero_service.response_cache.stats(),
+        "attachment_paths": attachment_resolver.stats(),
+        "pdf_parser": pdf_parser.stats(),
+        "arxiv_requests": arxiv_scheduler.stats(),
+        "arxiv_metadata": await arxiv_service.metadata_stats(),
+        "arxiv_downloads": arxiv_service.downloader.stats(),
+    }
+
+
+@router.post("/markdown-cache/prune")
+async def prune_markdown_cache() -> dict[str, int]:
+    """清理来源PDF已删除或替换的Markdown缓存，并按磁盘配额淘汰"""
+    return await pdf_parser.prune_cache()
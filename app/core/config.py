@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -43,5 +44,154 @@ class Settings(BaseSettings):
         default="", description="HTTPS proxy URL (e.g., http://127.0.0.1:7890)"
     )
 
+    # Shared HTTP connection pool settings
+    HTTP_POOL_LIMIT: int = Field(
+        default=100, description="Maximum open connections per upstream session"
+    )
+    HTTP_POOL_LIMIT_PER_HOST: int = Field(
+        default=20, description="Maximum open connections to a single host"
+    )
+    HTTP_KEEPALIVE_TIMEOUT: float = Field(
+        default=30.0, description="Seconds to keep idle connections alive"
+    )
+    HTTP_CONNECT_TIMEOUT: float = Field(
+        default=10.0, description="Timeout in seconds for establishing a connection"
+    )
+    HTTP_DNS_CACHE_TTL: int = Field(
+        default=300, description="Seconds to cache DNS lookups"
+    )
+    ZOTERO_HTTP_TIMEOUT: float = Field(
+        default=30.0, description="Total timeout in seconds for Zotero API requests"
+    )
+    ZOTERO_MAX_CONCURRENCY: int = Field(
+        default=8, description="Maximum concurrent per-item Zotero API lookups"
+    )
+    ZOTERO_RESPONSE_CACHE_SIZE: int = Field(
+        default=512, description="Max cached Zotero API responses (0 disables)"
+    )
+    ZOTERO_BACKEND: Literal["api", "sqlite"] = Field(
+        default="api",
+        description="Read the library via the local HTTP API or zotero.sqlite directly",
+    )
+    ZOTERO_DATA_DIR: Path = Field(
+        default=Path.home() / "Zotero",
+        description="Zotero data directory containing zotero.sqlite and storage/",
+    )
+    ZOTERO_SQLITE_SNAPSHOT: bool = Field(
+        default=False,
+        description="Read from a snapshot copy of zotero.sqlite instead of the live file",
+    )
+    ZOTERO_LINKED_ATTACHMENT_BASE_DIR: str = Field(
+        default="", description="Base directory for relative linked attachments"
+    )
+    ZOTERO_MIRROR_ENABLED: bool = Field(
+        default=True, description="Serve paper lists from a local SQLite mirror"
+    )
+    ZOTERO_MIRROR_SYNC_INTERVAL: float = Field(
+        default=60.0, description="Seconds between incremental mirror syncs"
+    )
+    SEARCH_REINDEX_INTERVAL: float = Field(
+        default=600.0,
+        description=(
+            "Seconds between full search index rebuilds when no mirror sync keeps "
+            "it current (sqlite backend or mirror disabled); 0 disables"
+        ),
+    )
+    PDF_PARSER_MODE: Literal["process", "thread"] = Field(
+        default="process",
+        description="Run markitdown conversions in a process pool or a thread pool",
+    )
+    PDF_PARSER_WORKERS: int = Field(
+        default=4, description="Number of concurrent PDF conversion workers"
+    )
+    PDF_PARSER_MAX_TASKS_PER_CHILD: int = Field(
+        default=20,
+        description="Recycle a parser process after this many conversions",
+    )
+    PDF_PARSE_TIMEOUT: float = Field(
+        default=300.0,
+        description="Seconds a single PDF conversion may take, including time queued "
+        "(0 = no limit)",
+    )
+    PDF_PARSE_QUEUE_LIMIT: int = Field(
+        default=16,
+        description="Conversions allowed to wait for a busy parser worker before new "
+        "requests are rejected",
+    )
+    PDF_CACHE_MAX_BYTES: int = Field(
+        default=1024**3,
+        description="Disk quota in bytes for compressed parsed markdown (0 = unlimited)",
+    )
+    PDF_TEXT_CACHE_MAX_BYTES: int = Field(
+        default=256 * 1024**2,
+        description="Disk quota in bytes for the fast text-only extraction cache "
+        "(0 = unlimited)",
+    )
+    PREPARSE_ENABLED: bool = Field(
+        default=True, description="Pre-parse recently added and adjacent papers"
+    )
+    PREPARSE_CONCURRENCY: int = Field(
+        default=1,
+        description="Background parse jobs (capped below PDF_PARSER_WORKERS)",
+    )
+    PREPARSE_IDLE_SECONDS: float = Field(
+        default=10.0,
+        description="Seconds without interactive parses before background jobs run",
+    )
+    PREPARSE_RECENT_LIMIT: int = Field(
+        default=50, description="Number of most recently added papers to pre-parse"
+    )
+    PREPARSE_ADJACENT: int = Field(
+        default=2, description="Neighbors on each side of an opened paper to pre-parse"
+    )
+    PREPARSE_SCAN_INTERVAL: float = Field(
+        default=600.0, description="Seconds between library scans for pre-parsing"
+    )
+    PREPARSE_ENGINE: Literal["full", "text"] = Field(
+        default="full",
+        description="Engine used for pre-parsing; 'text' only extracts plain text "
+        "for the search index",
+    )
+    ARXIV_HTTP_TIMEOUT: float = Field(
+        default=60.0, description="Total timeout in seconds for arXiv requests"
+    )
+    ARXIV_REQUESTS_PER_SECOND: float = Field(
+        default=0.5,
+        description="Sustained rate of requests to arXiv (API queries and PDF downloads)",
+    )
+    ARXIV_BURST: int = Field(
+        default=4, description="Requests to arXiv allowed in a burst above the rate"
+    )
+    ARXIV_MAX_RETRIES: int = Field(
+        default=3,
+        description="Retries for throttled or failed arXiv requests, with jittered "
+        "backoff that honors Retry-After",
+    )
+    ARXIV_METADATA_TTL: float = Field(
+        default=24 * 3600.0, description="Seconds cached arXiv metadata stays fresh"
+    )
+    ARXIV_METADATA_MAX_STALE: float = Field(
+        default=30 * 24 * 3600.0,
+        description="Seconds past the TTL that stale arXiv metadata is still served "
+        "while it is refreshed in the background",
+    )
+    ARXIV_METADATA_NEGATIVE_TTL: float = Field(
+        default=3600.0,
+        description="Seconds to remember arXiv IDs that do not exist (0 disables)",
+    )
+    ARXIV_METADATA_LRU_SIZE: int = Field(
+        default=1024, description="arXiv metadata records kept validated in memory"
+    )
+    ARXIV_PREFETCH_CONCURRENCY: int = Field(
+        default=4, description="Parallel arXiv PDF downloads during bulk prefetch"
+    )
+    ARXIV_BATCH_WINDOW: float = Field(
+        default=0.05,
+        description="Seconds to collect arXiv metadata requests into one id_list query",
+    )
+    ARXIV_BATCH_SIZE: int = Field(
+        default=50, description="Maximum arXiv IDs per metadata query"
+    )
+
 
 settings = Settings()
@@ -1,14 +1,66 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 
 from app.api.v1.arxiv import router as arxiv_router
 from app.api.v1.chat import router as chat_router
 from app.api.v1.papers import router as papers_router
+from app.api.v1.preparse import router as preparse_router
+from app.api.v1.search import router as search_router
+from app.api.v1.stats import router as stats_router
 from app.core.config import settings
+from app.services.attachment_resolver import attachment_resolver
 from app.services.database import ChatDatabase
+from app.services.http_client import http_clients
+from app.services.pdf_parser import (
+    ParserOverloadedError,
+    ParseTimeoutError,
+    pdf_parser,
+)
+from app.services.preparse_scheduler import preparse_scheduler
+from app.services.search_index import search_index
+from app.services.zotero_service import zotero_service
+
+logger = logging.getLogger(__name__)
+
+# Seconds clients are asked to wait before retrying a rejected parse
+PARSE_RETRY_AFTER = 5
+
+
+async def backfill_search_index():
+    """Build the metadata search index on first start"""
+    try:
+        if not await search_index.is_empty():
+            return
+        mirror = zotero_service.mirror
+        if mirror and not await mirror.is_ready():
+            # The first full mirror sync feeds the index through its listener
+            return
+        await search_index.reindex(zotero_service)
+    except Exception as e:
+        logger.warning(f"Search index backfill failed: {e}")
+
+
+async def refresh_search_index(interval: float):
+    """Periodically rebuild the metadata index when no mirror sync feeds it"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await search_index.reindex(zotero_service)
+        except Exception as e:
+            logger.warning(f"Search index refresh failed: {e}")
+
+
+async def prune_markdown_cache():
+    """Drop parse cache entries whose PDFs are gone and enforce the disk quota"""
+    try:
+        await pdf_parser.prune_cache()
+    except Exception as e:
+        logger.warning(f"Markdown cache prune failed: {e}")
 
 
 @asynccontextmanager
@@ -17,8 +69,42 @@ async def lifespan(app: FastAPI):
     # Initialize database on startup
     chat_db = ChatDatabase()
     await chat_db.initialize()
+    # Create shared HTTP connection pools for upstream services
+    await http_clients.startup()
+    # Keep the local Zotero mirror fresh in the background
+    # (the sqlite backend already reads a local database)
+    if settings.ZOTERO_MIRROR_ENABLED and settings.ZOTERO_BACKEND == "api":
+        mirror = zotero_service.enable_mirror()
+        await mirror.initialize()
+        mirror.add_listener(search_index.on_mirror_sync)
+        mirror.add_listener(attachment_resolver.on_mirror_sync)
+        if settings.PREPARSE_ENABLED:
+            mirror.add_listener(preparse_scheduler.on_mirror_sync)
+        mirror.start(settings.ZOTERO_MIRROR_SYNC_INTERVAL)
+    await attachment_resolver.initialize()
+    # Full-text search index, updated incrementally afterwards
+    await search_index.initialize()
+    backfill_task = asyncio.create_task(backfill_search_index())
+    # Without the mirror listener nothing else picks up library edits
+    refresh_task = None
+    if zotero_service.mirror is None and settings.SEARCH_REINDEX_INTERVAL > 0:
+        refresh_task = asyncio.create_task(
+            refresh_search_index(settings.SEARCH_REINDEX_INTERVAL)
+        )
+    prune_task = asyncio.create_task(prune_markdown_cache())
+    # Warm the parse cache in the background while no one is reading
+    if settings.PREPARSE_ENABLED:
+        preparse_scheduler.start()
     yield
-    # Cleanup can be added here if needed
+    await preparse_scheduler.stop()
+    backfill_task.cancel()
+    if refresh_task:
+        refresh_task.cancel()
+    prune_task.cancel()
+    if zotero_service.mirror:
+        await zotero_service.mirror.stop()
+    await http_clients.close()
+    pdf_parser.shutdown()
 
 
 app = FastAPI(
@@ -35,12 +121,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+
+@app.exception_handler(ParserOverloadedError)
+async def parser_overloaded_handler(request: Request, exc: ParserOverloadedError):
+    """Reject parses fast when the parse queue is full"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(PARSE_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(ParseTimeoutError)
+async def parse_timeout_handler(request: Request, exc: ParseTimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
 # Include routers
 app.include_router(papers_router, prefix="/api/v1", tags=["papers"])
 app.include_router(arxiv_router, prefix="/api/v1", tags=["arxiv"])
 app.include_router(chat_router, prefix="/api/v1", tags=["chat"])
+app.include_router(search_router, prefix="/api/v1", tags=["search"])
+app.include_router(stats_router, prefix="/api/v1", tags=["stats"])
+app.include_router(preparse_router, prefix="/api/v1", tags=["preparse"])
 
 
 @app.get("/health")
@@ -44,3 +44,21 @@ class PaperResponse(BaseModel):
     has_pdf: bool = False
 
     model_config = {"from_attributes": True}
+
+
+class FacetCount(BaseModel):
+    """分面取值及其论文数量"""
+
+    value: str
+    count: int
+
+
+class PaperFacets(BaseModel):
+    """论文列表的分面计数"""
+
+    total: int
+    tags: list[FacetCount] = Field(default_factory=list)
+    years: list[FacetCount] = Field(default_factory=list)
+    journals: list[FacetCount] = Field(default_factory=list)
+    item_types: list[FacetCount] = Field(default_factory=list)
+    has_pdf: list[FacetCount] = Field(default_factory=list)
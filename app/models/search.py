@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+
+
+class SearchHit(BaseModel):
+    """单条搜索结果"""
+
+    paper_id: str
+    title: str
+    score: float
+    snippet: str
+    highlights: list[list[int]] = Field(
+        default_factory=list, description="snippet中命中词的 [start, end) 字符区间"
+    )
+
+
+class SearchResponse(BaseModel):
+    """全文搜索响应"""
+
+    query: str
+    total: int
+    results: list[SearchHit]
+    took_ms: float
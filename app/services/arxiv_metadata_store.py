@@ -0,0 +1,287 @@
+"""
+arXiv元数据缓存
+所有论文的元数据存放在一张SQLite表中（arxiv_id为主键，cached_at用于过期判断），支持批量读写；
+前面是一个保存已校验ArxivMetadata对象的内存LRU，命中时不访问数据库也不重新校验。
+
+超过TTL但仍在 max_stale 内的条目作为过期条目返回，由调用方先使用再后台刷新；
+不存在的论文以空数据记录（负缓存），在 negative_ttl 内不再查询
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import aiosqlite
+
+from app.models.arxiv import ArxivMetadata
+
+logger = logging.getLogger(__name__)
+
+# 单条SQL中IN子句的最大参数数量
+SQL_BATCH_SIZE = 500
+
+# 负缓存条目的data列取值
+MISSING_DATA = "null"
+
+
+class CachedMetadata(NamedTuple):
+    """缓存条目；metadata为None表示论文不存在（负缓存）"""
+
+    metadata: ArxivMetadata | None
+    cached_at: float
+    stale: bool
+
+
+class ArxivMetadataStore:
+    """SQLite + 内存LRU的arXiv元数据缓存"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl: float,
+        max_stale: float = 0.0,
+        negative_ttl: float = 0.0,
+        lru_size: int = 1024,
+        legacy_dir: Path | None = None,
+    ):
+        """
+        Args:
+            db_path: SQLite数据库路径
+            ttl: 缓存有效期（秒）
+            max_stale: 超过有效期后仍可作为过期条目返回的时长（秒）
+            negative_ttl: 论文不存在的记录的有效期（秒），0表示不做负缓存
+            lru_size: 内存LRU中保存的条目数
+            legacy_dir: 旧版本按ID存放JSON文件的目录，首次初始化时导入
+        """
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+        self.legacy_dir = legacy_dir
+        self._initialized = False
+        # 并发的首次访问只初始化一次（同时建表会导致 database is locked）
+        self._init_lock = asyncio.Lock()
+
+        # arxiv_id -> (元数据或None, 缓存时间)
+        self._lru: OrderedDict[str, tuple[ArxivMetadata | None, float]] = OrderedDict()
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+
+    async def initialize(self) -> None:
+        """创建数据表，并导入旧版本的JSON缓存文件"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS arxiv_metadata (
+                        arxiv_id TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        cached_at REAL NOT NULL
+                    )
+                    """
+                )
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_arxiv_metadata_cached_at "
+                    "ON arxiv_metadata (cached_at)"
+                )
+                await self._import_legacy(db)
+                await db.commit()
+            self._initialized = True
+
+    async def _import_legacy(self, db: aiosqlite.Connection) -> None:
+        """把旧版本的 {arxiv_id}.json 文件导入数据表（保留原缓存时间），导入后删除文件"""
+        if self.legacy_dir is None or not self.legacy_dir.is_dir():
+            return
+        files = list(self.legacy_dir.glob("*.json"))
+        if not files:
+            return
+        rows = []
+        for path in files:
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                cached_at = datetime.fromisoformat(
+                    data.pop("_cached_at", "1970-01-01")
+                ).timestamp()
+                metadata = ArxivMetadata.model_validate(data)
+            except Exception as e:
+                logger.warning(f"导入元数据缓存 {path.name} 失败: {e}")
+                continue
+            rows.append((metadata.arxiv_id, metadata.model_dump_json(), cached_at))
+        await db.executemany(
+            "INSERT OR IGNORE INTO arxiv_metadata (arxiv_id, data, cached_at) "
+            "VALUES (?, ?, ?)",
+            rows,
+        )
+        await db.commit()
+        for path in files:
+            path.unlink(missing_ok=True)
+        logger.info(f"已导入 {len(rows)} 条arXiv元数据缓存")
+
+    def _entry(
+        self, metadata: ArxivMetadata | None, cached_at: float, now: float
+    ) -> CachedMetadata | None:
+        """按缓存时间判断条目是否可用，不可用时返回None"""
+        age = now - cached_at
+        if metadata is None:
+            if age < self.negative_ttl:
+                return CachedMetadata(None, cached_at, False)
+            return None
+        if age < self.ttl:
+            return CachedMetadata(metadata, cached_at, False)
+        if age < self.ttl + self.max_stale:
+            return CachedMetadata(metadata, cached_at, True)
+        return None
+
+    def _remember(
+        self, arxiv_id: str, metadata: ArxivMetadata | None, cached_at: float
+    ):
+        self._lru[arxiv_id] = (metadata, cached_at)
+        self._lru.move_to_end(arxiv_id)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def get_many(self, arxiv_ids: list[str]) -> dict[str, CachedMetadata]:
+        """
+        批量读取缓存条目，包括超过TTL但未超过 max_stale 的过期条目与负缓存条目；
+        未缓存或已超出可用期限的ID不在结果中
+        """
+        now = time.time()
+        results: dict[str, CachedMetadata] = {}
+        missing = []
+        for arxiv_id in dict.fromkeys(arxiv_ids):
+            cached = self._lru.get(arxiv_id)
+            entry = self._entry(*cached, now) if cached is not None else None
+            if entry is not None:
+                self._lru.move_to_end(arxiv_id)
+                results[arxiv_id] = entry
+                self.lru_hits += 1
+            else:
+                missing.append(arxiv_id)
+        if not missing:
+            self._count(results.values())
+            return results
+
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            for i in range(0, len(missing), SQL_BATCH_SIZE):
+                batch = missing[i : i + SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                async with db.execute(
+                    "SELECT arxiv_id, data, cached_at FROM arxiv_metadata "
+                    f"WHERE arxiv_id IN ({placeholders})",
+                    batch,
+                ) as cursor:
+                    async for arxiv_id, data, cached_at in cursor:
+                        try:
+                            metadata = (
+                                None
+                                if data == MISSING_DATA
+                                else ArxivMetadata.model_validate_json(data)
+                            )
+                        except ValueError as e:
+                            logger.warning(f"读取缓存元数据失败: {e}")
+                            continue
+                        entry = self._entry(metadata, cached_at, now)
+                        if entry is None:
+                            continue
+                        self._remember(arxiv_id, metadata, cached_at)
+                        results[arxiv_id] = entry
+        self.db_hits += sum(arxiv_id in results for arxiv_id in missing)
+        self.misses += sum(arxiv_id not in results for arxiv_id in missing)
+        self._count(results.values())
+        return results
+
+    def _count(self, entries: Iterable[CachedMetadata]) -> None:
+        for entry in entries:
+            self.stale_hits += entry.stale
+            self.negative_hits += entry.metadata is None
+
+    async def get(self, arxiv_id: str) -> CachedMetadata | None:
+        return (await self.get_many([arxiv_id])).get(arxiv_id)
+
+    async def put_many(
+        self, items: list[ArxivMetadata], not_found: list[str] | None = None
+    ) -> None:
+        """
+        在一个事务中批量写入元数据
+
+        Args:
+            items: 查询到的元数据
+            not_found: 确认不存在的论文ID，记录为负缓存（negative_ttl为0时忽略）
+        """
+        not_found = not_found if self.negative_ttl > 0 else None
+        if not items and not not_found:
+            return
+        now = time.time()
+        rows = [(item.arxiv_id, item.model_dump_json(), now) for item in items]
+        rows += [(arxiv_id, MISSING_DATA, now) for arxiv_id in not_found or []]
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO arxiv_metadata (arxiv_id, data, cached_at) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            await db.commit()
+        for item in items:
+            self._remember(item.arxiv_id, item, now)
+        for arxiv_id in not_found or []:
+            self._remember(arxiv_id, None, now)
+
+    async def cached_at(self, arxiv_id: str) -> float | None:
+        """元数据的缓存时间（无论是否过期），未缓存时返回None"""
+        entry = self._lru.get(arxiv_id)
+        if entry is not None:
+            return entry[1]
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT cached_at FROM arxiv_metadata WHERE arxiv_id = ?", (arxiv_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def delete(self, arxiv_id: str) -> None:
+        self._lru.pop(arxiv_id, None)
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "DELETE FROM arxiv_metadata WHERE arxiv_id = ?", (arxiv_id,)
+            )
+            await db.commit()
+
+    async def stats(self) -> dict[str, Any]:
+        """缓存统计信息"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*), COUNT(NULLIF(data, ?)) FROM arxiv_metadata",
+                (MISSING_DATA,),
+            ) as cursor:
+                entries, found = await cursor.fetchone()
+        return {
+            "entries": found,
+            "negative_entries": entries - found,
+            "lru_entries": len(self._lru),
+            "lru_hits": self.lru_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+        }
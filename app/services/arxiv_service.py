@@ -1,7 +1,10 @@
+import asyncio
+import glob
 import hashlib
-import json
 import logging
-from datetime import datetime, timedelta
+import re
+import time
+import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import Any
 
@@ -9,23 +12,74 @@ import aiohttp
 
 from app.core.config import settings
 from app.models.arxiv import ArxivMetadata, ArxivPaper
+from app.services.arxiv_metadata_store import ArxivMetadataStore
+from app.services.http_client import http_clients
+from app.services.pdf_downloader import PARTIAL_SUFFIX, PDFDownloader, is_valid_pdf
 from app.services.pdf_parser import pdf_parser
+from app.services.request_scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    arxiv_scheduler,
+)
 
 logger = logging.getLogger(__name__)
 
+ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
+
+# arXiv ID末尾的版本号，如 2301.00001v2
+VERSION_SUFFIX_RE = re.compile(r"v\d+$")
+
+
+def _base_id(arxiv_id: str) -> str:
+    """去掉版本号的arXiv ID，用于匹配批量查询返回的条目"""
+    return VERSION_SUFFIX_RE.sub("", arxiv_id)
+
 
 class ArxivService:
 
     def __init__(self):
         self.base_url = "https://arxiv.org"
         self.pdf_cache_dir = settings.DATA_DIR / "cache" / "arxiv" / "pdf"
-        self.metadata_cache_dir = settings.DATA_DIR / "cache" / "arxiv" / "metadata"
 
         # 确保缓存目录存在
         self.pdf_cache_dir.mkdir(parents=True, exist_ok=True)
-        self.metadata_cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # 元数据缓存（旧版本按ID存放的JSON文件在首次使用时导入）
+        self.metadata_store = ArxivMetadataStore(
+            settings.DATA_DIR / "cache" / "arxiv" / "metadata.db",
+            ttl=settings.ARXIV_METADATA_TTL,
+            max_stale=settings.ARXIV_METADATA_MAX_STALE,
+            negative_ttl=settings.ARXIV_METADATA_NEGATIVE_TTL,
+            lru_size=settings.ARXIV_METADATA_LRU_SIZE,
+            legacy_dir=settings.DATA_DIR / "cache" / "arxiv" / "metadata",
+        )
 
         self.pdf_parser = pdf_parser
+        # 所有arXiv请求经由同一调度器限速
+        self.scheduler = arxiv_scheduler
+        self.downloader = PDFDownloader(self.scheduler)
+
+        # 合并元数据请求：等待中的ID及其结果，在 ARXIV_BATCH_WINDOW 内到达的请求合并为一次查询
+        self._pending: dict[str, asyncio.Future] = {}
+        # 排队等待合并的ID -> 优先级（批次按其中最高的优先级调度）
+        self._batch_queue: dict[str, int] = {}
+        self._flush_task: asyncio.Task | None = None
+        self.batches = 0
+        self.coalesced = 0
+
+        # 正在后台刷新的过期元数据ID，及刷新任务（保留引用避免被回收）
+        self._revalidating: set[str] = set()
+        self._background_tasks: set[asyncio.Task] = set()
+        self.revalidations = 0
+        self.revalidation_failures = 0
+
+        # 使用代理时沿用原有行为：关闭SSL校验
+        http_clients.register(
+            "arxiv",
+            timeout=settings.ARXIV_HTTP_TIMEOUT,
+            trust_env=True,  # 允许从环境变量读取代理
+            verify_ssl=not self._get_proxy(),
+        )
 
     def _get_proxy(self) -> str | None:
         """获取代理配置，优先使用 HTTPS_PROXY"""
@@ -33,19 +87,8 @@ class ArxivService:
         return proxy if proxy else None
 
     def _get_session(self) -> aiohttp.ClientSession:
-        """获取配置好代理的 aiohttp 会话"""
-        connector = None
-        proxy = self._get_proxy()
-
-        if proxy:
-            connector = aiohttp.TCPConnector(ssl=False)
-            logger.debug(f"Using proxy: {proxy}")
-
-        return aiohttp.ClientSession(
-            connector=connector,
-            timeout=aiohttp.ClientTimeout(total=60),
-            trust_env=True,  # 允许从环境变量读取代理
-        )
+        """获取共享的 aiohttp 会话（连接池由应用生命周期管理，调用方不应关闭）"""
+        return http_clients.get("arxiv")
 
     async def get_arxiv_paper(self, arxiv_id: str) -> ArxivPaper:
         """获取arXiv论文完整数据"""
@@ -72,60 +115,191 @@ class ArxivService:
 
     async def get_arxiv_metadata(self, arxiv_id: str) -> ArxivMetadata | None:
         """获取论文元数据，带缓存"""
-        cache_file = self.metadata_cache_dir / f"{arxiv_id}.json"
-
-        # 检查缓存
-        if cache_file.exists():
-            try:
-                with open(cache_file, encoding="utf-8") as f:
-                    cached_data = json.load(f)
-
-                # 检查缓存是否过期（24小时）
-                cached_time = datetime.fromisoformat(
-                    cached_data.get("_cached_at", "1970-01-01")
+        return (await self.get_arxiv_metadata_many([arxiv_id]))[arxiv_id]
+
+    async def get_arxiv_metadata_many(
+        self, arxiv_ids: list[str], priority: int = PRIORITY_INTERACTIVE
+    ) -> dict[str, ArxivMetadata | None]:
+        """
+        批量获取论文元数据，带缓存
+
+        未缓存的ID与同一时间窗口内其他请求的ID合并为一次 id_list 查询；
+        priority 为请求调度的优先级通道，批量导入应使用 PRIORITY_BULK。
+        超过TTL的缓存条目直接返回并在后台刷新，只有未缓存或超过 max_stale 的ID需要等待查询
+
+        Returns:
+            arXiv ID -> 元数据（不存在的论文为None），顺序与传入的ID一致
+        """
+        cached = await self.metadata_store.get_many(arxiv_ids)
+        results: dict[str, ArxivMetadata | None] = {
+            arxiv_id: entry.metadata for arxiv_id, entry in cached.items()
+        }
+        stale = [arxiv_id for arxiv_id, entry in cached.items() if entry.stale]
+        if stale:
+            self._revalidate(stale)
+        missing = [
+            arxiv_id for arxiv_id in dict.fromkeys(arxiv_ids) if arxiv_id not in results
+        ]
+
+        if missing:
+            fetched = await asyncio.gather(
+                *(self._fetch_metadata(arxiv_id, priority) for arxiv_id in missing)
+            )
+            results.update(zip(missing, fetched, strict=True))
+            await self._save_metadata(dict(zip(missing, fetched, strict=True)))
+        return {arxiv_id: results[arxiv_id] for arxiv_id in arxiv_ids}
+
+    async def _save_metadata(self, fetched: dict[str, ArxivMetadata | None]) -> None:
+        """保存查询结果，查询不到的ID记录为负缓存"""
+        try:
+            await self.metadata_store.put_many(
+                [m for m in fetched.values() if m],
+                [arxiv_id for arxiv_id, m in fetched.items() if m is None],
+            )
+        except Exception as e:
+            logger.warning(f"保存元数据缓存失败: {e}")
+
+    def _revalidate(self, arxiv_ids: list[str]) -> None:
+        """在后台刷新过期的元数据，同一ID同时只刷新一次"""
+        arxiv_ids = [i for i in arxiv_ids if i not in self._revalidating]
+        if not arxiv_ids:
+            return
+        self._revalidating.update(arxiv_ids)
+        task = asyncio.create_task(self._refresh_metadata(arxiv_ids))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh_metadata(self, arxiv_ids: list[str]) -> None:
+        self.revalidations += len(arxiv_ids)
+        try:
+            # 刷新不阻塞任何请求，走批量通道，不与交互式请求争抢配额
+            fetched = await asyncio.gather(
+                *(
+                    self._fetch_metadata(arxiv_id, PRIORITY_BULK)
+                    for arxiv_id in arxiv_ids
                 )
-                if datetime.now() - cached_time < timedelta(hours=24):
-                    cached_data.pop("_cached_at", None)
-                    return ArxivMetadata.model_validate(cached_data)
-
-            except Exception as e:
-                logger.warning(f"读取缓存元数据失败: {e}")
-
-        # 从arXiv API获取
-        metadata = await self._fetch_metadata(arxiv_id)
-        if metadata:
-            # 保存缓存
-            metadata_dict = metadata.model_dump()
-            metadata_with_time = {
-                **metadata_dict,
-                "_cached_at": datetime.now().isoformat(),
-            }
-            try:
-                with open(cache_file, "w", encoding="utf-8") as f:
-                    json.dump(metadata_with_time, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                logger.warning(f"保存元数据缓存失败: {e}")
-
-        return metadata
+            )
+            # 已知存在的论文刷新时查不到，多半是上游临时异常：保留旧条目，不写负缓存
+            await self._save_metadata({m.arxiv_id: m for m in fetched if m is not None})
+        except Exception as e:
+            self.revalidation_failures += len(arxiv_ids)
+            logger.warning(f"后台刷新元数据失败，继续使用过期缓存: {e}")
+        finally:
+            self._revalidating.difference_update(arxiv_ids)
+
+    async def _fetch_metadata(
+        self, arxiv_id: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> ArxivMetadata | None:
+        """从arXiv API获取元数据（与同一时间窗口内的其他请求合并查询）"""
+        future = self._pending.get(arxiv_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # 所有等待方都已取消时也取走异常，避免未处理警告
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._pending[arxiv_id] = future
+            self._batch_queue[arxiv_id] = priority
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_after_window())
+        else:
+            self.coalesced += 1
+            if arxiv_id in self._batch_queue:
+                self._batch_queue[arxiv_id] = min(self._batch_queue[arxiv_id], priority)
+        # shield：一个等待方取消不影响同一ID的其他等待方
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self) -> None:
+        """等待合并窗口结束，按 ARXIV_BATCH_SIZE 分批发出查询"""
+        await asyncio.sleep(settings.ARXIV_BATCH_WINDOW)
+        queued, self._batch_queue = self._batch_queue, {}
+        self._flush_task = None
+        # 高优先级的ID排在前面，先组成批次
+        ordered = sorted(queued, key=queued.__getitem__)
+        size = max(1, settings.ARXIV_BATCH_SIZE)
+        await asyncio.gather(
+            *(
+                self._run_batch(ordered[i : i + size], queued[ordered[i]])
+                for i in range(0, len(ordered), size)
+            )
+        )
 
-    async def _fetch_metadata(self, arxiv_id: str) -> ArxivMetadata | None:
-        """从arXiv API获取元数据"""
-        url = f"https://export.arxiv.org/api/query?id_list={arxiv_id}"
+    async def _run_batch(self, arxiv_ids: list[str], priority: int) -> None:
+        """执行一次批量查询，并把结果分发给各ID的等待方"""
+        try:
+            results = await self._fetch_metadata_batch(arxiv_ids, priority)
+        except Exception as e:
+            for arxiv_id in arxiv_ids:
+                future = self._pending.pop(arxiv_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for arxiv_id in arxiv_ids:
+            future = self._pending.pop(arxiv_id)
+            if not future.done():
+                future.set_result(results.get(arxiv_id))
+
+    async def _fetch_metadata_batch(
+        self, arxiv_ids: list[str], priority: int = PRIORITY_INTERACTIVE
+    ) -> dict[str, ArxivMetadata]:
+        """
+        用一次 id_list 查询获取多篇论文的元数据
+
+        含有无效ID时arXiv会拒绝整个查询，此时拆分为单篇查询，只让无效ID失败
+        """
+        url = (
+            "https://export.arxiv.org/api/query"
+            f"?id_list={','.join(arxiv_ids)}&max_results={len(arxiv_ids)}"
+        )
 
         proxy = self._get_proxy()
-        async with self._get_session() as session:
+        session = self._get_session()
+
+        async def query() -> str:
             async with session.get(url, proxy=proxy) as response:
                 response.raise_for_status()
-                content = await response.text()
+                return await response.text()
 
-        import xml.etree.ElementTree as ET
+        self.batches += 1
+        try:
+            content = await self.scheduler.run(query, priority)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 400 or len(arxiv_ids) == 1:
+                raise
+            results: dict[str, ArxivMetadata] = {}
+            for arxiv_id in arxiv_ids:
+                try:
+                    results.update(
+                        await self._fetch_metadata_batch([arxiv_id], priority)
+                    )
+                except aiohttp.ClientResponseError as single_error:
+                    if single_error.status != 400:
+                        raise
+            return results
 
         root = ET.fromstring(content)
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-        entry = root.find("atom:entry", ns)
-        if entry is None:
-            return None
+        # 按不带版本号的ID匹配返回的条目；同一论文的多个版本可能在同一批次中
+        requested: dict[str, list[str]] = {}
+        for arxiv_id in arxiv_ids:
+            requested.setdefault(_base_id(arxiv_id), []).append(arxiv_id)
+        results = {}
+        # 已匹配到完全相同版本的ID，不再被同一论文其他版本的条目覆盖
+        exact: set[str] = set()
+        for entry in root.findall("atom:entry", ATOM_NS):
+            entry_id = entry.find("atom:id", ATOM_NS)
+            if entry_id is None or not entry_id.text or "/abs/" not in entry_id.text:
+                # 无效ID返回的错误条目
+                continue
+            version_id = entry_id.text.split("/abs/", 1)[1]
+            for arxiv_id in requested.get(_base_id(version_id), []):
+                if arxiv_id == version_id:
+                    exact.add(arxiv_id)
+                elif arxiv_id in exact:
+                    continue
+                results[arxiv_id] = self._parse_entry(entry, arxiv_id)
+        return results
+
+    def _parse_entry(self, entry: ET.Element, arxiv_id: str) -> ArxivMetadata:
+        """解析Atom feed中的单个条目"""
+        ns = ATOM_NS
 
         # 提取元数据
         title = entry.find("atom:title", ns)
@@ -172,43 +346,108 @@ class ArxivService:
             pdf_url=pdf_url,
         )
 
-    async def _get_pdf(self, arxiv_id: str) -> Path:
-        """获取PDF文件，带缓存"""
-        meta = await self.get_arxiv_metadata(arxiv_id)
-        pdf_url = meta.pdf_url if meta else f"{self.base_url}/pdf/{arxiv_id}"
+    async def _get_pdf(
+        self, arxiv_id: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> Path:
+        """获取PDF文件，带缓存；本地已有完整PDF时不查询元数据"""
+        loop = asyncio.get_running_loop()
+        local_file = await loop.run_in_executor(None, self._find_local_pdf, arxiv_id)
+        if local_file is not None:
+            return local_file
+
+        # 需要下载时才查询元数据（取得最新版本的PDF链接）
+        meta = await self.get_arxiv_metadata_many([arxiv_id], priority)
+        pdf_url = (
+            meta[arxiv_id].pdf_url
+            if meta[arxiv_id]
+            else f"{self.base_url}/pdf/{arxiv_id}"
+        )
 
         # extract basename from pdf_url
         pdf_filename = pdf_url.split("/")[-1]
         cache_file = self.pdf_cache_dir / pdf_filename
 
-        # 检查缓存
-        if cache_file.exists():
-            # 验证文件完整性
-            if cache_file.stat().st_size > 0:
-                return cache_file
-            else:
-                # 缓存文件损坏，重新下载
-                cache_file.unlink(missing_ok=True)
+        # 检查缓存：只有通过校验的完整PDF才会被使用，旧版本留下的截断文件会重新下载
+        if await self.downloader.is_cached(cache_file):
+            return cache_file
 
         try:
-            proxy = self._get_proxy()
-            async with self._get_session() as session:
-                async with session.get(pdf_url, proxy=proxy) as response:
-                    if response.status != 200:
-                        raise ValueError(f"无法下载PDF: HTTP {response.status}")
-
-                    # 写入缓存
-                    with open(cache_file, "wb") as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            f.write(chunk)
-
-                    logger.info(f"PDF已缓存: {cache_file}")
-                    return cache_file
-
+            return await self.downloader.download(
+                pdf_url,
+                cache_file,
+                self._get_session(),
+                proxy=self._get_proxy(),
+                priority=priority,
+            )
         except Exception as e:
             logger.error(f"下载PDF失败: {e}")
             raise
 
+    def _local_pdf_files(self, arxiv_id: str) -> list[Path]:
+        """
+        按ID列出可能的PDF缓存文件，按优先级排列（同步，在线程池中执行）
+
+        缓存文件以PDF链接的最后一段命名：带版本号的ID只匹配该版本；
+        不带版本号时匹配所有版本（包括只有未完成下载的版本），版本号大的优先
+        """
+        name = arxiv_id.split("/")[-1]
+        candidates = [self.pdf_cache_dir / name]
+        if name == _base_id(name):
+            names = {
+                path.name.removesuffix(PARTIAL_SUFFIX)
+                for path in self.pdf_cache_dir.glob(f"{glob.escape(name)}v*")
+            }
+            versions = sorted(
+                (n for n in names if VERSION_SUFFIX_RE.fullmatch(n[len(name) :])),
+                key=lambda n: int(n[len(name) + 1 :]),
+                reverse=True,
+            )
+            candidates = [self.pdf_cache_dir / n for n in versions] + candidates
+        return candidates
+
+    def _find_local_pdf(self, arxiv_id: str) -> Path | None:
+        """按ID查找已缓存的完整PDF（同步，在线程池中执行）"""
+        for path in self._local_pdf_files(arxiv_id):
+            if is_valid_pdf(path):
+                return path
+        return None
+
+    def _remove_local_pdfs(self, arxiv_id: str) -> None:
+        """删除ID对应的所有PDF缓存文件及未完成的下载（同步，在线程池中执行）"""
+        for path in self._local_pdf_files(arxiv_id):
+            path.unlink(missing_ok=True)
+            path.with_name(path.name + PARTIAL_SUFFIX).unlink(missing_ok=True)
+
+    async def prefetch_pdfs(
+        self, arxiv_ids: list[str], concurrency: int | None = None
+    ) -> dict[str, str | None]:
+        """
+        批量预下载PDF，使用低优先级通道，同时进行的下载不超过 concurrency 个
+
+        Returns:
+            arXiv ID -> PDF路径（下载失败为None）
+        """
+        semaphore = asyncio.Semaphore(
+            max(1, concurrency or settings.ARXIV_PREFETCH_CONCURRENCY)
+        )
+        # 先一次性取得元数据，合并为批量查询
+        try:
+            await self.get_arxiv_metadata_many(arxiv_ids, PRIORITY_BULK)
+        except Exception as e:
+            logger.warning(f"预取元数据失败: {e}")
+
+        async def fetch(arxiv_id: str) -> str | None:
+            async with semaphore:
+                try:
+                    return str(await self._get_pdf(arxiv_id, PRIORITY_BULK))
+                except Exception as e:
+                    logger.warning(f"预下载 {arxiv_id} 的PDF失败: {e}")
+                    return None
+
+        arxiv_ids = list(dict.fromkeys(arxiv_ids))
+        paths = await asyncio.gather(*(fetch(arxiv_id) for arxiv_id in arxiv_ids))
+        return dict(zip(arxiv_ids, paths, strict=True))
+
     async def _get_markdown(self, pdf_path: Path) -> str:
         """获取markdown内容，使用pdf_parser的缓存"""
         return await self.pdf_parser.parse_pdf(str(pdf_path))
@@ -221,44 +460,44 @@ class ArxivService:
                 hash_md5.update(chunk)
         return hash_md5.hexdigest()[:8]  # 取前8位作为短哈希
 
-    def get_cache_info(self, arxiv_id: str) -> dict[str, Any]:
+    async def metadata_stats(self) -> dict[str, Any]:
+        """元数据缓存与查询的统计信息"""
+        return {
+            **await self.metadata_store.stats(),
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "revalidating": len(self._revalidating),
+            "revalidations": self.revalidations,
+            "revalidation_failures": self.revalidation_failures,
+        }
+
+    async def get_cache_info(self, arxiv_id: str) -> dict[str, Any]:
         """获取缓存信息"""
-        pdf_file = self.pdf_cache_dir / f"{arxiv_id}.pdf"
-        metadata_file = self.metadata_cache_dir / f"{arxiv_id}.json"
+        loop = asyncio.get_running_loop()
+        pdf_file = await loop.run_in_executor(None, self._find_local_pdf, arxiv_id)
+        cached_at = await self.metadata_store.cached_at(arxiv_id)
 
         info = {
-            "pdf_cached": pdf_file.exists(),
-            "metadata_cached": metadata_file.exists(),
+            "pdf_cached": pdf_file is not None,
+            "metadata_cached": cached_at is not None,
             "pdf_size": 0,
             "cache_age_hours": 0,
         }
 
-        if pdf_file.exists():
+        if pdf_file is not None:
             info["pdf_size"] = pdf_file.stat().st_size
 
-        if metadata_file.exists():
-            try:
-                with open(metadata_file) as f:
-                    cached_data = json.load(f)
-                    cached_time = datetime.fromisoformat(
-                        cached_data.get("_cached_at", "1970-01-01")
-                    )
-                    info["cache_age_hours"] = (
-                        datetime.now() - cached_time
-                    ).total_seconds() / 3600
-            except Exception:
-                pass
+        if cached_at is not None:
+            info["cache_age_hours"] = (time.time() - cached_at) / 3600
 
         return info
 
-    def clear_cache(self, arxiv_id: str) -> bool:
+    async def clear_cache(self, arxiv_id: str) -> bool:
         """清除特定论文的缓存"""
         try:
-            pdf_file = self.pdf_cache_dir / f"{arxiv_id}.pdf"
-            metadata_file = self.metadata_cache_dir / f"{arxiv_id}.json"
-
-            pdf_file.unlink(missing_ok=True)
-            metadata_file.unlink(missing_ok=True)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._remove_local_pdfs, arxiv_id)
+            await self.metadata_store.delete(arxiv_id)
 
             return True
         except Exception as e:
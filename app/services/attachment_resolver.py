@@ -0,0 +1,220 @@
+"""
+论文PDF路径解析缓存
+持久化 论文key → 首个PDF附件key → 本地文件路径 的映射，命中时只需一次os.stat校验，
+无需再经过Zotero API的 条目详情 / 子条目 / 302文件跳转 三次往返。
+文件不存在或库版本变化时失效并重新解析
+"""
+
+import logging
+import os
+import urllib.parse
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from app.core.config import settings
+from app.services.zotero_service import ZoteroService, zotero_service
+
+logger = logging.getLogger(__name__)
+
+
+class AttachmentResolutionError(Exception):
+    """无法为论文找到可访问的本地PDF文件"""
+
+
+@dataclass
+class ResolvedPDF:
+    """论文首个PDF附件的本地文件"""
+
+    paper_key: str
+    attachment_key: str
+    path: Path
+    library_version: int | None = None
+    # 仅在本次重新解析时提供，缓存命中时为None
+    paper: dict | None = None
+
+
+def file_url_to_path(url: str) -> Path:
+    """将Zotero返回的 file:// 地址转换为本地路径"""
+    if url.startswith("file://"):
+        return Path(urllib.parse.unquote(url.replace("file://", "")))
+    return Path(url)
+
+
+class AttachmentResolver:
+    """带os.stat校验的PDF路径解析缓存，内存中缓存一份，SQLite持久化"""
+
+    def __init__(self, zotero_service: ZoteroService):
+        self.zotero_service = zotero_service
+        self.db_path = settings.DATA_DIR / "attachment_paths.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._initialized = False
+        self._entries: dict[str, ResolvedPDF] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def initialize(self) -> None:
+        """创建缓存表"""
+        if self._initialized:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pdf_paths (
+                    paper_key TEXT PRIMARY KEY,
+                    attachment_key TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    library_version INTEGER,
+                    resolved_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_pdf_paths_attachment
+                    ON pdf_paths (attachment_key);
+                """
+            )
+            await db.commit()
+        self._initialized = True
+
+    async def _load(self, paper_key: str) -> ResolvedPDF | None:
+        """读取缓存条目，内存未命中时查询数据库"""
+        entry = self._entries.get(paper_key)
+        if entry is not None:
+            return entry
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """
+                SELECT attachment_key, path, library_version FROM pdf_paths
+                WHERE paper_key = ?
+                """,
+                (paper_key,),
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        entry = ResolvedPDF(paper_key, row[0], Path(row[1]), row[2])
+        self._entries[paper_key] = entry
+        return entry
+
+    async def _store(self, entry: ResolvedPDF) -> None:
+        self._entries[entry.paper_key] = replace(entry, paper=None)
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO pdf_paths
+                    (paper_key, attachment_key, path, library_version, resolved_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    entry.paper_key,
+                    entry.attachment_key,
+                    str(entry.path),
+                    entry.library_version,
+                    datetime.now().isoformat(),
+                ),
+            )
+            await db.commit()
+
+    async def invalidate(self, keys: list[str]) -> None:
+        """使指定论文，或以指定条目为PDF附件的论文的缓存失效"""
+        if not keys:
+            return
+        key_set = set(keys)
+        for entry in list(self._entries.values()):
+            if entry.paper_key in key_set or entry.attachment_key in key_set:
+                del self._entries[entry.paper_key]
+                self.invalidations += 1
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "DELETE FROM pdf_paths WHERE paper_key = ? OR attachment_key = ?",
+                [(key, key) for key in keys],
+            )
+            await db.commit()
+
+    async def on_mirror_sync(self, changed: list[dict], deleted: list[str]) -> None:
+        """镜像同步监听器：只使变更或删除的条目（及变更附件的父条目）相关的缓存失效"""
+        keys = set(deleted)
+        for item in changed:
+            if item.get("key"):
+                keys.add(item["key"])
+            parent = item.get("data", {}).get("parentItem")
+            if parent:
+                keys.add(parent)
+        await self.invalidate(sorted(keys))
+
+    def _is_current(self, entry: ResolvedPDF) -> bool:
+        """
+        检查缓存条目的库版本
+
+        启用镜像时由同步监听器精确失效，这里不再比较；否则库版本变化即视为过期
+        """
+        if self.zotero_service.mirror is not None:
+            return True
+        current = self.zotero_service.library_version
+        return (
+            current is None
+            or entry.library_version is None
+            or entry.library_version == current
+        )
+
+    async def _resolve_upstream(self, paper_key: str) -> ResolvedPDF:
+        """通过Zotero后端解析论文的首个PDF附件"""
+        paper = await self.zotero_service.get_paper(paper_key)
+        if not paper:
+            raise AttachmentResolutionError("Paper not found")
+        attachments = paper.get("pdf_attachments") or []
+        if not attachments:
+            raise AttachmentResolutionError("No PDF found")
+        pdf_url = paper.get("pdf_path")
+        if not pdf_url:
+            raise AttachmentResolutionError("PDF file not accessible")
+        return ResolvedPDF(
+            paper_key=paper_key,
+            attachment_key=attachments[0]["key"],
+            path=file_url_to_path(pdf_url),
+            library_version=self.zotero_service.library_version,
+            paper=paper,
+        )
+
+    async def resolve(self, paper_key: str) -> ResolvedPDF:
+        """
+        获取论文PDF的本地路径，缓存有效时不访问Zotero
+
+        Raises:
+            AttachmentResolutionError: 论文不存在、没有PDF附件或文件不存在
+        """
+        entry = await self._load(paper_key)
+        if entry is not None:
+            if self._is_current(entry) and os.path.isfile(entry.path):
+                self.hits += 1
+                return entry
+            await self.invalidate([paper_key])
+
+        self.misses += 1
+        entry = await self._resolve_upstream(paper_key)
+        if not os.path.isfile(entry.path):
+            raise AttachmentResolutionError("PDF file not found")
+        await self._store(entry)
+        return entry
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# 全局实例
+attachment_resolver = AttachmentResolver(zotero_service)
@@ -0,0 +1,133 @@
+"""
+文件指纹索引
+以 (路径, 大小, mtime_ns, inode) 为键持久化文件内容的MD5，文件未变化时只需一次stat即可得到内容哈希，
+变化时才分块流式重新计算。供PDFParserService生成缓存键使用，在线程池中同步调用
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# 流式计算哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """分块计算文件内容的MD5，避免一次性读入整个文件"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_key(st: os.stat_result) -> tuple[int, int, int]:
+    """用于判断文件是否变化的stat信息：(大小, mtime_ns, inode)"""
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class FingerprintIndex:
+    """线程安全的文件指纹索引，内存中缓存一份，SQLite持久化"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[tuple[int, int, int], str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """每次操作使用独立连接（可在任意线程中调用），结束时提交并关闭"""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _lookup(self, path: str, key: tuple[int, int, int]) -> str | None:
+        """查找与当前stat一致的已知哈希"""
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            with self._connect() as db:
+                row = db.execute(
+                    """
+                    SELECT size, mtime_ns, inode, content_hash FROM fingerprints
+                    WHERE path = ?
+                    """,
+                    (path,),
+                ).fetchone()
+            if row is None:
+                return None
+            entry = ((row[0], row[1], row[2]), row[3])
+            with self._lock:
+                self._entries[path] = entry
+        return entry[1] if entry[0] == key else None
+
+    def _store(self, path: str, key: tuple[int, int, int], content_hash: str) -> None:
+        with self._lock:
+            self._entries[path] = (key, content_hash)
+        with self._connect() as db:
+            db.execute(
+                """
+                INSERT OR REPLACE INTO fingerprints
+                    (path, size, mtime_ns, inode, content_hash)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (path, *key, content_hash),
+            )
+
+    def get_hash(self, path: str, st: os.stat_result | None = None) -> str:
+        """
+        获取文件内容的MD5
+
+        Args:
+            path: 文件路径
+            st: 调用方已获取的stat结果，避免重复stat
+
+        Raises:
+            OSError: 文件不存在或无法读取
+        """
+        path = os.path.abspath(path)
+        key = stat_key(st or os.stat(path))
+        content_hash = self._lookup(path, key)
+        if content_hash is not None:
+            self.hits += 1
+            return content_hash
+
+        self.misses += 1
+        content_hash = hash_file(path)
+        self._store(path, key, content_hash)
+        return content_hash
+
+    def stats(self) -> dict[str, Any]:
+        """索引统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,134 @@
+"""
+HTTP连接池管理
+为每个上游服务（Zotero本地API、Zotero Connector、arXiv）维护一个长连接的aiohttp会话，
+在应用生命周期内复用TCP连接，避免每次调用都重新建立连接
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import aiohttp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpstreamConfig:
+    """上游服务的连接配置"""
+
+    base_url: str | None = None
+    timeout: float = 30.0
+    trust_env: bool = False
+    verify_ssl: bool = True
+
+
+class HTTPClientManager:
+    """按上游名称管理共享的aiohttp会话"""
+
+    def __init__(self):
+        self._configs: dict[str, UpstreamConfig] = {}
+        self._sessions: dict[
+            str, tuple[aiohttp.ClientSession, asyncio.AbstractEventLoop]
+        ] = {}
+
+    def register(
+        self,
+        name: str,
+        base_url: str | None = None,
+        timeout: float = 30.0,
+        trust_env: bool = False,
+        verify_ssl: bool = True,
+    ) -> None:
+        """注册上游服务配置，会话在首次使用或应用启动时创建"""
+        self._configs[name] = UpstreamConfig(
+            base_url=base_url,
+            timeout=timeout,
+            trust_env=trust_env,
+            verify_ssl=verify_ssl,
+        )
+
+    def _create_session(self, config: UpstreamConfig) -> aiohttp.ClientSession:
+        """根据配置创建带连接池的会话"""
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            ssl=None if config.verify_ssl else False,
+        )
+        return aiohttp.ClientSession(
+            base_url=config.base_url,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=config.timeout, connect=settings.HTTP_CONNECT_TIMEOUT
+            ),
+            trust_env=config.trust_env,
+        )
+
+    def get(self, name: str) -> aiohttp.ClientSession:
+        """
+        获取指定上游的共享会话
+
+        会话与创建它的事件循环绑定，如果当前循环不同（例如测试中每个请求使用独立循环）
+        或会话已关闭，则重新创建
+        """
+        if name not in self._configs:
+            raise KeyError(f"Unknown upstream: {name}")
+
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(name)
+        if entry is not None:
+            session, session_loop = entry
+            if not session.closed and session_loop is loop:
+                return session
+            if not session.closed:
+                self._release(name, session, session_loop)
+
+        session = self._create_session(self._configs[name])
+        self._sessions[name] = (session, loop)
+        return session
+
+    def _release(
+        self,
+        name: str,
+        session: aiohttp.ClientSession,
+        session_loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        """释放绑定在其他事件循环上的旧会话，避免泄漏连接器"""
+        logger.info(f"事件循环已变化，替换HTTP会话 ({name})")
+        if session_loop.is_running():
+            # 旧循环仍在其他线程中运行：在该循环中关闭
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            return
+        # 旧循环已停止，无法等待关闭完成：分离连接器后直接关闭其连接
+        connector = session.connector
+        session.detach()
+        if connector is not None:
+            connector._close()
+
+    async def startup(self) -> None:
+        """预先为所有已注册的上游创建会话"""
+        for name in self._configs:
+            self.get(name)
+
+    async def close(self) -> None:
+        """关闭所有会话，释放连接"""
+        loop = asyncio.get_running_loop()
+        sessions, self._sessions = self._sessions, {}
+        for name, (session, session_loop) in sessions.items():
+            if session.closed:
+                continue
+            if session_loop is not loop:
+                self._release(name, session, session_loop)
+                continue
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"关闭HTTP会话失败 ({name}): {e}")
+
+
+# 全局实例
+http_clients = HTTPClientManager()
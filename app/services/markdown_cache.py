@@ -0,0 +1,355 @@
+"""
+Markdown解析缓存
+以内容哈希为键，gzip压缩存储PDF解析结果，清单(manifest.db)记录大小、来源PDF与最近访问时间，
+超出磁盘配额时按LRU淘汰，并可清理来源PDF已不存在的条目。在线程池中同步调用
+"""
+
+import contextlib
+import gzip
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TextIO
+
+logger = logging.getLogger(__name__)
+
+# 压缩后的缓存文件后缀
+CACHE_SUFFIX = ".md.gz"
+
+# 不在清单中的文件至少闲置多久才会被清理（秒），避免删除正在写入的文件
+STRAY_GRACE = 3600.0
+
+# 同一条目的访问时间最多每隔多少秒写回一次清单，避免每次命中都写数据库
+ACCESS_RESOLUTION = 60.0
+
+
+class MarkdownCache:
+    """带磁盘配额与LRU淘汰的压缩Markdown缓存"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 0):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 压缩后的总大小上限，0表示不限制
+        """
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db_path = cache_dir / "manifest.db"
+
+        self._lock = threading.Lock()
+        self._accessed: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    source_path TEXT,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_source ON entries (source_path)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """每次操作使用独立连接（可在任意线程中调用），结束时提交并关闭"""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def path_for(self, key: str) -> Path:
+        """缓存条目的压缩文件路径"""
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def _legacy_path(self, key: str) -> Path:
+        """旧版本写入的未压缩缓存文件"""
+        return self.cache_dir / f"{key}.md"
+
+    def _touch(self, key: str) -> None:
+        """记录访问时间（按ACCESS_RESOLUTION合并写入）"""
+        now = time.time()
+        with self._lock:
+            if now - self._accessed.get(key, 0.0) < ACCESS_RESOLUTION:
+                return
+            self._accessed[key] = now
+        with self._connect() as db:
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+
+    def get(self, key: str) -> str | None:
+        """读取缓存内容，未命中返回None；旧版本的未压缩文件会被迁移为压缩格式"""
+        try:
+            with gzip.open(self.path_for(key), "rt", encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = self._migrate_legacy(key)
+        except Exception as e:
+            logger.warning(f"读取Markdown缓存 {key} 失败: {e}")
+            content = None
+
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if content is not None:
+            self._touch(key)
+        return content
+
+    def open(self, key: str) -> TextIO | None:
+        """以流的方式打开缓存内容（解压读取，不整体载入内存），未命中返回None"""
+        try:
+            handle = gzip.open(self.path_for(key), "rt", encoding="utf-8")
+        except FileNotFoundError:
+            if self._migrate_legacy(key) is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            handle = gzip.open(self.path_for(key), "rt", encoding="utf-8")
+        with self._lock:
+            self.hits += 1
+        self._touch(key)
+        return handle
+
+    def read_bytes(
+        self, key: str, start: int = 0, end: int | None = None
+    ) -> bytes | None:
+        """
+        读取缓存内容UTF-8编码中 [start, end) 字节区间，未命中返回None
+
+        流式解压：跳过start之前的内容、读到end为止，不把整篇文档载入内存
+        """
+        handle = None
+        try:
+            handle = gzip.open(self.path_for(key), "rb")
+        except FileNotFoundError:
+            if self._migrate_legacy(key) is not None:
+                handle = gzip.open(self.path_for(key), "rb")
+        if handle is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with handle:
+            handle.seek(start)
+            data = handle.read() if end is None else handle.read(max(0, end - start))
+        with self._lock:
+            self.hits += 1
+        self._touch(key)
+        return data
+
+    def file_for(self, key: str) -> Path | None:
+        """
+        返回条目的压缩文件路径（供直接按gzip编码发送），不存在时返回None
+
+        只记录访问时间；未命中由随后的解析流程计数
+        """
+        path = self.path_for(key)
+        if not path.exists() and self._migrate_legacy(key) is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        self._touch(key)
+        return path
+
+    def _migrate_legacy(self, key: str) -> str | None:
+        legacy = self._legacy_path(key)
+        try:
+            content = legacy.read_text(encoding="utf-8")
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+        self.put(key, content)
+        with contextlib.suppress(OSError):
+            legacy.unlink()
+        return content
+
+    def _atomic_write(self, path: Path, data: bytes) -> int:
+        """写入同目录下的临时文件后原子替换，返回写入的字节数"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        return len(data)
+
+    def sidecar_path(self, key: str, name: str) -> Path:
+        """与缓存条目关联的附属文件（如章节索引），随条目一起删除"""
+        return self.cache_dir / f"{key}.{name}"
+
+    def read_sidecar(self, key: str, name: str) -> bytes | None:
+        try:
+            return self.sidecar_path(key, name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write_sidecar(self, key: str, name: str, data: bytes) -> None:
+        self._atomic_write(self.sidecar_path(key, name), data)
+
+    def put(self, key: str, content: str, source_path: str | None = None) -> None:
+        """
+        压缩写入缓存（临时文件 + 原子替换），并按配额淘汰
+
+        同一来源PDF的旧条目（PDF被替换后内容哈希变化）会被一并删除
+        """
+        raw = content.encode("utf-8")
+        size = self._atomic_write(
+            self.path_for(key), gzip.compress(raw, compresslevel=6)
+        )
+
+        now = time.time()
+        with self._connect() as db:
+            stale = []
+            if source_path:
+                stale = [
+                    row[0]
+                    for row in db.execute(
+                        "SELECT key FROM entries WHERE source_path = ? AND key != ?",
+                        (source_path, key),
+                    )
+                ]
+            db.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (key, size, raw_size, source_path, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, size, len(raw), source_path, now, now),
+            )
+        with self._lock:
+            self._accessed[key] = now
+        self._remove(stale)
+        self.enforce_quota()
+
+    def _remove(self, keys: list[str]) -> None:
+        """删除缓存条目及其文件"""
+        if not keys:
+            return
+        for key in keys:
+            # 缓存文件及其附属文件
+            for path in self.cache_dir.glob(f"{key}.*"):
+                with contextlib.suppress(FileNotFoundError):
+                    path.unlink()
+        with self._connect() as db:
+            db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        with self._lock:
+            for key in keys:
+                self._accessed.pop(key, None)
+
+    def total_bytes(self) -> int:
+        with self._connect() as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[
+                0
+            ]
+
+    def enforce_quota(self) -> int:
+        """超出配额时按最近访问时间淘汰最旧的条目，返回淘汰数量"""
+        if self.max_bytes <= 0:
+            return 0
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = []
+        with self._connect() as db:
+            for key, size in db.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at"
+            ):
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+        self._remove(evicted)
+        with self._lock:
+            self.evictions += len(evicted)
+        return len(evicted)
+
+    def prune(self) -> dict[str, int]:
+        """
+        清理缓存目录
+
+        删除来源PDF已不存在的条目、清单中文件缺失的记录，以及不在清单中的文件（含遗留的临时文件）
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT key, source_path FROM entries").fetchall()
+
+        orphaned = [
+            key for key, source in rows if source and not os.path.exists(source)
+        ]
+        missing = [key for key, _ in rows if not self.path_for(key).exists()]
+        self._remove(sorted(set(orphaned) | set(missing)))
+
+        known = {key for key, _ in rows} - set(orphaned)
+        migrated = stray = 0
+        for path in list(self.cache_dir.iterdir()):
+            name = path.name
+            key, _, suffix = name.partition(".")
+            if name.endswith(CACHE_SUFFIX) or suffix.endswith(".json"):
+                # 缓存文件及附属文件
+                if key in known:
+                    continue
+            elif suffix == "md":
+                # 旧版本的未压缩缓存：压缩后纳入配额管理
+                if self._migrate_legacy(key) is not None:
+                    migrated += 1
+                continue
+            elif not name.endswith(".tmp"):
+                continue
+            # 最近修改的文件可能正在写入
+            with contextlib.suppress(FileNotFoundError):
+                if time.time() - path.stat().st_mtime >= STRAY_GRACE:
+                    path.unlink()
+                    stray += 1
+
+        result = {
+            "orphaned": len(orphaned),
+            "missing": len(missing),
+            "migrated": migrated,
+            "stray_files": stray,
+            "evicted": self.enforce_quota(),
+        }
+        logger.info(f"Markdown缓存清理完成: {result}")
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计信息"""
+        with self._connect() as db:
+            entries, size, raw_size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) "
+                "FROM entries"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "uncompressed_bytes": raw_size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,182 @@
+"""
+PDF解析工作进程
+进程池模式下每个工作进程持有独立的MarkItDown实例，只接收PDF路径、返回Markdown文本。
+本模块不导入任何服务，避免工作进程启动时创建全局实例
+
+提供两级解析引擎：
+- full: markitdown完整转换（逐页用pdfplumber检测表格/表单，再用pdfminer提取正文）
+- text: 只用pdfminer提取纯文本，单遍处理，适合全文索引与快速预览
+"""
+
+import contextlib
+import io
+import signal
+import threading
+from collections.abc import Callable, Iterator
+
+from markitdown import MarkItDown
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+_parser: MarkItDown | None = None
+
+
+def init_worker() -> None:
+    """进程池initializer：在工作进程中初始化MarkItDown"""
+    global _parser
+    _parser = MarkItDown()
+
+
+def convert_pdf(pdf_path: str) -> str:
+    """
+    在工作进程中将PDF转换为Markdown
+
+    markitdown抛出的异常不一定能跨进程序列化，统一转换为RuntimeError
+    """
+    global _parser
+    if _parser is None:
+        _parser = MarkItDown()
+    try:
+        return _parser.convert(pdf_path).text_content
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """
+    逐页提取PDF文本
+
+    与 pdfminer.high_level.extract_text（markitdown处理普通正文PDF时使用）的输出一致：
+    每页以换页符 \f 结尾，全部页面拼接即为整篇文本
+    """
+    resource_manager = PDFResourceManager(caching=True)
+    output = io.StringIO()
+    with open(pdf_path, "rb") as fp:
+        device = TextConverter(resource_manager, output, laparams=LAParams())
+        interpreter = PDFPageInterpreter(resource_manager, device)
+        try:
+            for page in PDFPage.get_pages(fp, caching=True):
+                interpreter.process_page(page)
+                text = output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+                yield text
+        finally:
+            device.close()
+
+
+def extract_text(pdf_path: str, spool: str | None = None) -> str:
+    """
+    快速引擎：逐页提取纯文本并按markitdown的方式规范化
+
+    正文类PDF的结果与完整转换一致；含表格/表单的页面不做结构化处理，
+    编号被拆成多行的标题也不会合并。
+    指定spool时，每页的结果同时追加写入该文件并立即flush，供主进程边提取边读取
+    """
+    normalizer = MarkdownNormalizer()
+    parts = []
+    try:
+        with (
+            open(spool, "a", encoding="utf-8") if spool else contextlib.nullcontext()
+        ) as out:
+            for text in iter_pdf_pages(pdf_path):
+                parts.append(normalizer.feed(text))
+                if out is not None and parts[-1]:
+                    out.write(parts[-1])
+                    out.flush()
+            parts.append(normalizer.flush())
+            if out is not None and parts[-1]:
+                out.write(parts[-1])
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    return "".join(parts)
+
+
+ENGINE_FULL = "full"
+ENGINE_TEXT = "text"
+
+# 引擎名 -> 转换函数（接收PDF路径，返回文本），均为模块级函数以便传入工作进程
+ENGINES: dict[str, Callable[..., str]] = {
+    ENGINE_FULL: convert_pdf,
+    ENGINE_TEXT: extract_text,
+}
+
+# 支持把逐页结果写入spool文件的引擎
+SPOOL_ENGINES = {ENGINE_TEXT}
+
+
+class _ConversionTimeout(BaseException):
+    """
+    SIGALRM触发的超时
+
+    继承BaseException，不会被markitdown内部的 except Exception 回退逻辑吞掉
+    """
+
+
+def _on_alarm(signum, frame):
+    raise _ConversionTimeout
+
+
+def run_engine(
+    engine: str, pdf_path: str, timeout: float = 0, spool: str | None = None
+) -> str:
+    """
+    在工作进程中按引擎名执行转换
+
+    timeout>0 时用SIGALRM限制执行时间，超时后中止转换并抛出TimeoutError，工作进程可继续使用。
+    只在支持setitimer的平台、且在主线程中执行时生效（进程池模式）。
+    spool只对 SPOOL_ENGINES 中的引擎有效
+    """
+    convert = ENGINES[engine]
+    args = (pdf_path, spool) if spool and engine in SPOOL_ENGINES else (pdf_path,)
+    if (
+        timeout <= 0
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        return convert(*args)
+
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return convert(*args)
+    except _ConversionTimeout:
+        raise TimeoutError(f"解析超过{timeout:g}秒") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class MarkdownNormalizer:
+    """
+    增量版的markitdown输出规范化：去除每行行尾空白，并将三个以上连续换行压缩为两个
+
+    逐页输入提取的文本，输出的片段拼接后与对整篇文本做规范化的结果完全一致
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._newlines = 0
+
+    def feed(self, text: str) -> str:
+        """输入一段文本，返回其中已完整的行规范化后的结果（末尾不完整的行暂存）"""
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        output = []
+        for line in lines:
+            line = line.rstrip()
+            if line:
+                self._newlines = 1
+            else:
+                self._newlines += 1
+                if self._newlines > 2:
+                    continue
+            output.append(line + "\n")
+        return "".join(output)
+
+    def flush(self) -> str:
+        """返回最后一行（不以换行结尾）规范化后的结果"""
+        line, self._pending = self._pending.rstrip(), ""
+        return line
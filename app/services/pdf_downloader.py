@@ -0,0 +1,204 @@
+"""
+PDF下载管理
+下载内容先写入同目录下的 .part 文件（写入在线程池中进行，不阻塞事件循环），
+校验长度与PDF文件头/结尾标记后原子重命名为缓存文件，中断不会留下被当作有效缓存的半截文件。
+重试时用 HTTP Range 从 .part 文件已有的长度续传；同一URL的并发下载合并为一次
+"""
+
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import aiohttp
+
+from app.services.request_scheduler import (
+    PRIORITY_INTERACTIVE,
+    RETRYABLE_STATUS,
+    RequestScheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".part"
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# PDF文件头，以及结尾标记 %%EOF 需出现在文件末尾的这些字节内
+PDF_HEADER = b"%PDF-"
+PDF_TRAILER = b"%%EOF"
+PDF_TRAILER_WINDOW = 1024
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+class PDFValidationError(ValueError):
+    """下载的文件不是完整的PDF"""
+
+
+def is_valid_pdf(path: Path) -> bool:
+    """检查文件头与结尾标记（不解析PDF结构，用于识别截断或错误页面）"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(PDF_HEADER)) != PDF_HEADER:
+                return False
+            f.seek(max(0, os.fstat(f.fileno()).st_size - PDF_TRAILER_WINDOW))
+            return PDF_TRAILER in f.read()
+    except OSError:
+        return False
+
+
+def _discard(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+def _partial_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class PDFDownloader:
+    """带校验、续传与并发合并的PDF下载器，请求经由调度器限速与重试"""
+
+    def __init__(self, scheduler: RequestScheduler):
+        self.scheduler = scheduler
+        # URL -> 进行中的下载任务
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self.downloads = 0
+        self.deduplicated = 0
+        self.resumed = 0
+        self.failures = 0
+        self.bytes_downloaded = 0
+
+    async def is_cached(self, path: Path) -> bool:
+        """缓存文件存在且是完整的PDF"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, is_valid_pdf, path)
+
+    async def download(
+        self,
+        url: str,
+        dest: Path,
+        session: aiohttp.ClientSession,
+        proxy: str | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Path:
+        """
+        下载URL到dest，同一URL正在下载时等待该下载完成
+
+        调用方取消等待不会中断下载，完成后的文件仍写入缓存供后续请求使用
+        """
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(
+                self._download(url, dest, session, proxy, priority)
+            )
+            self._inflight[url] = task
+            task.add_done_callback(lambda t: self._finish(url, t))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, url: str, task: asyncio.Task) -> None:
+        if self._inflight.get(url) is task:
+            del self._inflight[url]
+        # 所有等待方都已取消时也取走异常，避免未处理警告
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def _download(
+        self,
+        url: str,
+        dest: Path,
+        session: aiohttp.ClientSession,
+        proxy: str | None,
+        priority: int,
+    ) -> Path:
+        partial = dest.with_name(dest.name + PARTIAL_SUFFIX)
+        loop = asyncio.get_running_loop()
+
+        async def attempt() -> Path:
+            offset = await loop.run_in_executor(None, _partial_size, partial)
+            headers = {"Range": f"bytes={offset}-"} if offset else None
+            async with session.get(url, proxy=proxy, headers=headers) as response:
+                if response.status in RETRYABLE_STATUS:
+                    # 交给调度器按 Retry-After / 退避重试
+                    response.raise_for_status()
+                if response.status == 416 and offset:
+                    # 已下载的部分可能就是完整文件（上次在重命名前中断）
+                    return await self._commit(partial, dest, None)
+                if response.status == 206 and offset:
+                    expected = self._resume_total(response, offset)
+                    if expected is None:
+                        # 返回的范围与已下载部分对不上：丢弃后重新下载
+                        await loop.run_in_executor(None, _discard, partial)
+                        raise aiohttp.ClientPayloadError("续传范围不匹配")
+                    self.resumed += 1
+                elif response.status == 200:
+                    # 未请求续传，或服务器忽略了Range：从头下载
+                    offset = 0
+                    # 传输压缩时 Content-Length 是压缩后的长度，不能用于校验
+                    expected = (
+                        None
+                        if "Content-Encoding" in response.headers
+                        else response.content_length
+                    )
+                else:
+                    raise ValueError(f"无法下载PDF: HTTP {response.status}")
+
+                f = await loop.run_in_executor(
+                    None, open, partial, "ab" if offset else "wb"
+                )
+                try:
+                    await self._write(response, f)
+                finally:
+                    await loop.run_in_executor(None, f.close)
+            return await self._commit(partial, dest, expected)
+
+        self.downloads += 1
+        return await self.scheduler.run(attempt, priority)
+
+    def _resume_total(
+        self, response: aiohttp.ClientResponse, offset: int
+    ) -> int | None:
+        """续传响应的完整文件大小（未知时为0）；Content-Range与请求不符时返回None"""
+        match = CONTENT_RANGE_RE.fullmatch(response.headers.get("Content-Range", ""))
+        if match is None or int(match.group(1)) != offset:
+            return None
+        return 0 if match.group(2) == "*" else int(match.group(2))
+
+    async def _write(self, response: aiohttp.ClientResponse, f: BinaryIO) -> None:
+        loop = asyncio.get_running_loop()
+        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+            await loop.run_in_executor(None, f.write, chunk)
+            self.bytes_downloaded += len(chunk)
+
+    async def _commit(self, partial: Path, dest: Path, expected: int | None) -> Path:
+        """校验 .part 文件后原子重命名；长度不足时抛出可重试的错误以便续传"""
+        loop = asyncio.get_running_loop()
+        size = await loop.run_in_executor(None, _partial_size, partial)
+        if expected and size < expected:
+            raise aiohttp.ClientPayloadError(f"下载不完整: {size}/{expected} 字节")
+        if (expected and size > expected) or not await loop.run_in_executor(
+            None, is_valid_pdf, partial
+        ):
+            await loop.run_in_executor(None, _discard, partial)
+            raise PDFValidationError(f"下载的文件不是有效的PDF: {dest.name}")
+        await loop.run_in_executor(None, os.replace, partial, dest)
+        logger.info(f"PDF已缓存: {dest}")
+        return dest
+
+    def stats(self) -> dict[str, Any]:
+        """下载统计信息"""
+        return {
+            "active": len(self._inflight),
+            "downloads": self.downloads,
+            "deduplicated": self.deduplicated,
+            "resumed": self.resumed,
+            "failures": self.failures,
+            "bytes_downloaded": self.bytes_downloaded,
+        }
@@ -1,124 +1,655 @@
 """
 PDF解析服务
-使用markitdown将PDF转换为Markdown格式，通过线程池处理同步操作
-包含文件内容缓存功能
+使用markitdown将PDF转换为Markdown格式，转换在进程池（默认，可随CPU核数扩展）或线程池中执行；
+另有只提取纯文本的快速引擎，两级引擎使用各自的缓存命名空间。
+转换有超时限制，排队数量有上限（超出时立即拒绝），所有请求方都放弃等待时排队中的转换会被撤销
+包含文件内容缓存功能，缓存键来自文件指纹索引（文件未变化时无需重新计算哈希）
+缓存时同时生成章节索引，支持只读取大纲、单个章节或字节区间
+流式请求使用快速引擎，工作进程逐页写出结果，边转换边返回
 """
 
 import asyncio
+import codecs
+import contextlib
 import hashlib
+import json
+import logging
+import multiprocessing
 import os
-from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any
 
 from markitdown import MarkItDown
 
 from app.core.config import settings
+from app.services import parse_worker
+from app.services.fingerprint_index import FingerprintIndex
+from app.services.markdown_cache import MarkdownCache
+from app.services.parse_worker import ENGINE_FULL, ENGINE_TEXT
+from app.services.section_index import SECTION_INDEX_VERSION, build_section_index
+
+logger = logging.getLogger(__name__)
+
+# 从缓存流式读取时每次产出的字符数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 流式读取在途转换的spool文件时，没有新内容后再次检查的间隔（秒）
+SPOOL_POLL_INTERVAL = 0.05
+
+# 章节索引附属文件名
+SECTIONS_SIDECAR = "sections.json"
+
+
+class ParserOverloadedError(Exception):
+    """等待解析的转换已达上限，请求被拒绝"""
+
+
+class ParseTimeoutError(RuntimeError):
+    """转换超过 PDF_PARSE_TIMEOUT 仍未完成"""
 
 
 class PDFParserService:
     """PDF解析服务"""
 
-    def __init__(self, max_workers: int = 4):
-        self.parser = MarkItDown()
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    def __init__(
+        self,
+        mode: str | None = None,
+        max_workers: int | None = None,
+        max_tasks_per_child: int | None = None,
+    ):
+        self.mode = mode or settings.PDF_PARSER_MODE
+        self.max_workers = max_workers or settings.PDF_PARSER_WORKERS
+        self.max_tasks_per_child = (
+            max_tasks_per_child or settings.PDF_PARSER_MAX_TASKS_PER_CHILD
+        )
+        # 执行器在首次解析时创建，进程池模式下主进程不持有MarkItDown实例
+        self.executor: Executor | None = None
+        self.parser: MarkItDown | None = None
 
         # 创建缓存目录
         self.cache_dir = settings.DATA_DIR / "cache" / "markitdown"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fingerprints = FingerprintIndex(self.cache_dir / "fingerprints.db")
+        self.cache = MarkdownCache(self.cache_dir, settings.PDF_CACHE_MAX_BYTES)
+        # 每个引擎独立的缓存命名空间，完整转换沿用原缓存目录
+        self.caches = {
+            ENGINE_FULL: self.cache,
+            ENGINE_TEXT: MarkdownCache(
+                self.cache_dir / ENGINE_TEXT, settings.PDF_TEXT_CACHE_MAX_BYTES
+            ),
+        }
+
+        # 正在进行的解析，按 (引擎, 缓存键) 去重：并发请求同一PDF时共享一次转换
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        # 每个在途转换的等待方数量，降为0时撤销转换
+        self._waiters: dict[tuple[str, str], int] = {}
+        self.deduplicated = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        # 在途转换 -> 逐页写出结果的spool文件（流式请求发起的转换）
+        self._spools: dict[asyncio.Task, Path] = {}
+        self.spool_dir = self.cache_dir / "spool"
+        self.spool_dir.mkdir(exist_ok=True)
+        for stale in self.spool_dir.iterdir():
+            # 上次运行中断留下的spool文件
+            stale.unlink(missing_ok=True)
+        # 快速结果返回后在后台进行的完整解析
+        self._upgrades: set[asyncio.Task] = set()
 
-    def _get_cache_key(self, pdf_path: str) -> str:
+        # 交互式解析计数与最近一次结束的时间，供后台预解析判断是否空闲
+        self._interactive_count = 0
+        self._last_interactive = 0.0
+
+    def _get_executor(self) -> Executor:
+        """获取（必要时创建）执行转换的进程池或线程池"""
+        if self.executor is None:
+            if self.mode == "process":
+                # 工作进程执行 max_tasks_per_child 次转换后被替换，限制内存增长；
+                # 该参数不支持fork启动方式，统一使用spawn
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=parse_worker.init_worker,
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _get_cache_key(self, pdf_path: str, st: os.stat_result | None = None) -> str:
         """
         生成缓存键
 
         Args:
             pdf_path: PDF文件路径
+            st: 已获取的文件stat结果
 
         Returns:
-            基于文件内容的MD5哈希值
+            基于文件内容的MD5哈希值（stat未变化时直接取自指纹索引）
         """
         try:
-            with open(pdf_path, "rb") as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
-            return file_hash
+            return self.fingerprints.get_hash(pdf_path, st)
         except Exception:
             # 如果无法读取文件内容，使用文件路径作为备份
             return hashlib.md5(pdf_path.encode()).hexdigest()
 
     def _get_cache_path(self, cache_key: str) -> Path:
-        """获取缓存文件路径"""
-        return self.cache_dir / f"{cache_key}.md"
+        """获取缓存文件路径（gzip压缩）"""
+        return self.cache.path_for(cache_key)
 
-    def _is_cached(self, cache_key: str) -> bool:
+    def _is_cached(self, cache_key: str, engine: str = ENGINE_FULL) -> bool:
         """检查是否有缓存"""
-        cache_path = self._get_cache_path(cache_key)
+        cache_path = self.caches[engine].path_for(cache_key)
         return cache_path.exists()
 
-    def _load_cache(self, cache_key: str) -> str | None:
+    def _load_cache(self, cache_key: str, engine: str = ENGINE_FULL) -> str | None:
         """从缓存加载内容"""
-        cache_path = self._get_cache_path(cache_key)
-        if cache_path.exists():
-            try:
-                return cache_path.read_text(encoding="utf-8")
-            except Exception:
-                return None
-        return None
-
-    def _save_cache(self, cache_key: str, content: str) -> None:
-        """保存内容到缓存"""
-        cache_path = self._get_cache_path(cache_key)
+        return self.caches[engine].get(cache_key)
+
+    def _save_cache(
+        self,
+        cache_key: str,
+        content: str,
+        source_path: str | None = None,
+        engine: str = ENGINE_FULL,
+    ) -> None:
+        """保存内容到缓存（原子写入，超出配额时按LRU淘汰），完整转换结果同时生成章节索引"""
         try:
-            cache_path.write_text(content, encoding="utf-8")
-        except Exception:
+            self.caches[engine].put(cache_key, content, source_path)
+            if engine == ENGINE_FULL:
+                self._save_sections(cache_key, build_section_index(content))
+        except Exception as e:
             # 缓存失败不影响主功能
-            pass
+            logger.warning(f"写入Markdown缓存失败: {e}")
+
+    def _load_sections(self, cache_key: str) -> dict | None:
+        """读取缓存的章节索引，不存在或格式版本不同时返回None"""
+        data = self.cache.read_sidecar(cache_key, SECTIONS_SIDECAR)
+        if data is None:
+            return None
+        try:
+            index = json.loads(data)
+        except ValueError:
+            return None
+        if index.get("version") != SECTION_INDEX_VERSION:
+            return None
+        return index
+
+    def _save_sections(self, cache_key: str, index: dict) -> None:
+        self.cache.write_sidecar(
+            cache_key,
+            SECTIONS_SIDECAR,
+            json.dumps(index, ensure_ascii=False).encode("utf-8"),
+        )
+
+    def _stat_cache_key(self, pdf_path: str) -> str:
+        """stat文件并计算缓存键（同步，在线程池中执行）"""
+        try:
+            st = os.stat(pdf_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}") from None
+        return self._get_cache_key(pdf_path, st)
+
+    def _lookup_cache(
+        self, pdf_path: str, engine: str = ENGINE_FULL
+    ) -> tuple[str, str | None]:
+        """
+        计算缓存键并读取缓存（同步，在线程池中执行）
+
+        Returns:
+            (缓存键, 缓存内容或None)
+        """
+        cache_key = self._stat_cache_key(pdf_path)
+        return cache_key, self._load_cache(cache_key, engine)
+
+    def _convert_sync(self, pdf_path: str) -> str:
+        """线程池模式下在当前进程中转换"""
+        if self.parser is None:
+            self.parser = MarkItDown()
+        return self.parser.convert(pdf_path).text_content
+
+    async def _convert(
+        self, pdf_path: str, engine: str = ENGINE_FULL, spool: Path | None = None
+    ) -> str:
+        """
+        在执行器中用指定引擎转换PDF，进程池模式下只有路径和结果文本跨进程传递；
+        指定spool时（仅限 SPOOL_ENGINES），转换过程中逐页把结果追加写入该文件
+
+        从提交起超过 PDF_PARSE_TIMEOUT 秒即放弃等待（排队中的转换随之撤销）。
+        进程池模式下工作进程内的定时器同时限制转换本身的执行时间；
+        线程池模式无法中断线程，超时的转换会在后台继续运行至结束
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        timeout = settings.PDF_PARSE_TIMEOUT
+        spool_arg = str(spool) if spool is not None else None
+        if self.mode == "process":
+            call = (parse_worker.run_engine, engine, pdf_path, timeout, spool_arg)
+        elif engine == ENGINE_FULL:
+            call = (self._convert_sync, pdf_path)
+        elif spool_arg is not None:
+            call = (parse_worker.ENGINES[engine], pdf_path, spool_arg)
+        else:
+            call = (parse_worker.ENGINES[engine], pdf_path)
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, *call), timeout if timeout > 0 else None
+            )
+        except TimeoutError as e:
+            # 工作进程内的超时与等待超时都会到达这里
+            self.timeouts += 1
+            raise ParseTimeoutError(f"PDF解析超时: {pdf_path}") from e
+        except BrokenProcessPool as e:
+            # 工作进程异常退出（如内存耗尽），丢弃进程池，下次解析时重建
+            logger.warning(f"PDF解析进程池已损坏，将重新创建: {e}")
+            if self.executor is executor:
+                self.executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"PDF解析失败: {str(e)}") from e
+        except Exception as e:
+            raise RuntimeError(f"PDF解析失败: {str(e)}") from e
+
+    @contextmanager
+    def _interactive(self) -> Iterator[None]:
+        """标记一次交互式解析请求，后台预解析会在其进行期间及之后一段时间内让行"""
+        self._interactive_count += 1
+        try:
+            yield
+        finally:
+            self._interactive_count -= 1
+            self._last_interactive = time.monotonic()
 
-    def _parse_pdf_sync(self, pdf_path: str) -> str:
+    def is_busy(self, idle_seconds: float = 0.0) -> bool:
+        """是否有交互式解析正在进行，或最近idle_seconds秒内刚结束"""
+        return (
+            self._interactive_count > 0
+            or time.monotonic() - self._last_interactive < idle_seconds
+        )
+
+    async def is_cached(self, pdf_path: str, engine: str = ENGINE_FULL) -> bool:
+        """PDF是否已有指定引擎的解析缓存（只stat，不读取内容）"""
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._stat_cache_key, pdf_path)
+        return (engine, cache_key) in self._inflight or self._is_cached(
+            cache_key, engine
+        )
+
+    async def parse_pdf(
+        self, pdf_path: str, background: bool = False, engine: str = ENGINE_FULL
+    ) -> str:
         """
-        同步解析PDF为Markdown（内部使用）
+        异步解析PDF为Markdown
 
         Args:
             pdf_path: PDF文件路径
+            background: 是否为后台预解析（不计为交互式请求）
+            engine: 解析引擎，full为markitdown完整转换，text为快速纯文本提取
 
         Returns:
             Markdown文本内容
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+        if engine not in parse_worker.ENGINES:
+            raise ValueError(f"未知的解析引擎: {engine}")
+        if background:
+            return await self._parse(pdf_path, engine, background=True)
+        with self._interactive():
+            return await self._parse(pdf_path, engine)
+
+    async def parse_fast(self, pdf_path: str) -> tuple[str, str]:
+        """
+        尽快获取PDF文本
+
+        已有完整转换结果时直接返回；否则用快速引擎提取，并在后台升级为完整转换，
+        之后的请求即可得到完整结果
+
+        Returns:
+            (文本内容, 实际使用的引擎)
+        """
+        with self._interactive():
+            loop = asyncio.get_running_loop()
+            _, content = await loop.run_in_executor(None, self._lookup_cache, pdf_path)
+            if content is not None:
+                return content, ENGINE_FULL
+            content = await self._parse(pdf_path, ENGINE_TEXT)
+        self._schedule_upgrade(pdf_path)
+        return content, ENGINE_TEXT
+
+    def _schedule_upgrade(self, pdf_path: str) -> None:
+        """在后台进行完整转换（不计为交互式请求，与其他请求共享在途转换）"""
+        task = asyncio.create_task(self._parse(pdf_path, ENGINE_FULL, background=True))
+        self._upgrades.add(task)
+        task.add_done_callback(self._finish_upgrade)
 
-        # 检查缓存
-        cache_key = self._get_cache_key(pdf_path)
-        cached_content = self._load_cache(cache_key)
+    def _finish_upgrade(self, task: asyncio.Task) -> None:
+        self._upgrades.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.info(f"后台完整解析失败: {task.exception()}")
+
+    async def _parse(
+        self, pdf_path: str, engine: str = ENGINE_FULL, background: bool = False
+    ) -> str:
+        loop = asyncio.get_running_loop()
+        # 检查缓存（文件IO在默认线程池中执行，不占用解析工作进程）
+        cache_key, cached_content = await loop.run_in_executor(
+            None, self._lookup_cache, pdf_path, engine
+        )
         if cached_content is not None:
             return cached_content
 
-        # 解析PDF
+        inflight_key, task = self._start(pdf_path, cache_key, engine, background)
+        return await self._wait(inflight_key, task)
+
+    def _start(
+        self,
+        pdf_path: str,
+        cache_key: str,
+        engine: str,
+        background: bool = False,
+        spool: bool = False,
+    ) -> tuple[tuple[str, str], asyncio.Task]:
+        """
+        发起转换，同一 (引擎, 缓存键) 已有在途转换时复用它
+
+        Args:
+            spool: 新发起的转换是否逐页写出spool文件（供流式读取）
+
+        Returns:
+            (在途记录的键, 转换任务)
+        """
+        inflight_key = (engine, cache_key)
+        task = self._inflight.get(inflight_key)
+        if task is not None:
+            self.deduplicated += 1
+            return inflight_key, task
+
+        self._admit(background)
+        spool_path = None
+        if spool and engine in parse_worker.SPOOL_ENGINES:
+            fd, name = tempfile.mkstemp(dir=self.spool_dir, suffix=".md")
+            os.close(fd)
+            spool_path = Path(name)
+        task = asyncio.create_task(
+            self._convert_and_cache(pdf_path, cache_key, engine, spool_path)
+        )
+        self._inflight[inflight_key] = task
+        if spool_path is not None:
+            self._spools[task] = spool_path
+        task.add_done_callback(lambda t: self._finish_inflight(inflight_key, t))
+        return inflight_key, task
+
+    def _admit(self, background: bool) -> None:
+        """
+        准入控制：转换数已达工作进程数加排队上限时拒绝新转换
+
+        后台转换不排队，只在有空闲工作进程时才被接受
+        """
+        limit = self.max_workers
+        if not background:
+            limit += settings.PDF_PARSE_QUEUE_LIMIT
+        if len(self._inflight) >= limit:
+            self.rejected += 1
+            raise ParserOverloadedError(
+                f"PDF解析繁忙：{len(self._inflight)} 个转换正在进行或排队"
+            )
+
+    async def _wait(self, inflight_key: tuple[str, str], task: asyncio.Task) -> str:
+        """
+        等待共享的在途转换
+
+        shield：某个调用方取消（如客户端断开）不会中断其他调用方共享的转换；
+        最后一个等待方也取消时撤销转换（排队中的转换不再占用工作进程）
+        """
+        with self._waiting(inflight_key, task):
+            return await asyncio.shield(task)
+
+    @contextmanager
+    def _waiting(self, inflight_key: tuple[str, str], task: asyncio.Task):
+        """登记一个在途转换的等待方，离开时若已没有等待方则撤销转换"""
+        self._waiters[inflight_key] = self._waiters.get(inflight_key, 0) + 1
         try:
-            result = self.parser.convert(pdf_path)
-            content = result.text_content
+            yield
+        finally:
+            remaining = self._waiters[inflight_key] - 1
+            if remaining:
+                self._waiters[inflight_key] = remaining
+            else:
+                del self._waiters[inflight_key]
+                if not task.done():
+                    # 立即移除在途记录，之后的请求会发起新的转换而不是等待被撤销的转换
+                    if self._inflight.get(inflight_key) is task:
+                        del self._inflight[inflight_key]
+                    task.cancel()
+                    self.cancelled += 1
 
-            # 保存到缓存
-            self._save_cache(cache_key, content)
+    def _finish_inflight(
+        self, inflight_key: tuple[str, str], task: asyncio.Task
+    ) -> None:
+        """转换结束后移除在途记录；所有调用方都已取消时也要取走异常，避免未处理警告"""
+        if self._inflight.get(inflight_key) is task:
+            del self._inflight[inflight_key]
+        spool = self._spools.pop(task, None)
+        if spool is not None:
+            # 正在读取的流式请求已持有打开的文件，删除不影响其读完
+            with contextlib.suppress(OSError):
+                spool.unlink(missing_ok=True)
+        if not task.cancelled():
+            task.exception()
 
-            return content
-        except Exception as e:
-            raise RuntimeError(f"PDF解析失败: {str(e)}") from e
+    async def _convert_and_cache(
+        self,
+        pdf_path: str,
+        cache_key: str,
+        engine: str = ENGINE_FULL,
+        spool: Path | None = None,
+    ) -> str:
+        """转换PDF并写入对应引擎的缓存"""
+        content = await self._convert(pdf_path, engine, spool)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None,
+            self._save_cache,
+            cache_key,
+            content,
+            os.path.abspath(pdf_path),
+            engine,
+        )
+        return content
 
-    async def parse_pdf(self, pdf_path: str) -> str:
+    async def cached_file(self, pdf_path: str) -> tuple[str, Path] | None:
         """
-        异步解析PDF为Markdown（使用线程池）
+        获取PDF解析结果的缓存文件（gzip压缩），未解析过时返回None（不触发解析）
 
-        Args:
-            pdf_path: PDF文件路径
+        Returns:
+            (缓存键, 缓存文件路径)
+        """
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._stat_cache_key, pdf_path)
+        path = await loop.run_in_executor(None, self.cache.file_for, cache_key)
+        return None if path is None else (cache_key, path)
+
+    async def get_sections(self, pdf_path: str) -> dict:
+        """
+        获取PDF的章节索引（必要时先解析PDF）
 
         Returns:
-            Markdown文本内容
+            {"version", "bytes", "sections": [{"index", "title", "level", "start",
+            "end", "tokens"}]}，start/end 为Markdown UTF-8编码中的字节偏移
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self._parse_pdf_sync, pdf_path)
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._stat_cache_key, pdf_path)
+        index = await loop.run_in_executor(None, self._load_sections, cache_key)
+        if index is not None:
+            return index
+
+        # 未解析过，或缓存早于章节索引功能写入：由全文生成后补写
+        content = await self.parse_pdf(pdf_path)
+        index = build_section_index(content)
+        try:
+            await loop.run_in_executor(None, self._save_sections, cache_key, index)
+        except Exception as e:
+            logger.warning(f"写入章节索引失败: {e}")
+        return index
+
+    async def read_range(
+        self, pdf_path: str, start: int = 0, end: int | None = None
+    ) -> str:
+        """
+        读取Markdown中 [start, end) 字节区间的内容（必要时先解析PDF）
+
+        已缓存时直接从压缩文件中按偏移读取，不解压整篇文档；
+        区间边界落在多字节字符中间时，不完整的字符会被丢弃
+        """
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._stat_cache_key, pdf_path)
+        data = await loop.run_in_executor(
+            None, self.cache.read_bytes, cache_key, start, end
+        )
+        if data is None:
+            content = await self.parse_pdf(pdf_path)
+            data = content.encode("utf-8")[start:end]
+        return data.decode("utf-8", errors="ignore")
+
+    async def stream_pdf(self, pdf_path: str) -> AsyncIterator[str]:
+        """
+        逐页产出PDF的文本内容
+
+        已有完整转换（或快速引擎）的缓存时直接从磁盘流式读取；否则发起快速引擎转换，
+        边转换边产出工作进程逐页写出的结果。转换与其他解析一样经过准入控制、超时、
+        去重与解析执行器，结果只写入快速引擎的缓存（与完整转换的结果不同），
+        完整转换随后在后台进行
+        """
+        with self._interactive():
+            async for chunk in self._stream(pdf_path):
+                yield chunk
+
+    async def _stream(self, pdf_path: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._stat_cache_key, pdf_path)
+
+        # 已有缓存时直接从磁盘读取，不等待正在进行的（后台）完整转换
+        for engine in (ENGINE_FULL, ENGINE_TEXT):
+            handle = await loop.run_in_executor(
+                None, self.caches[engine].open, cache_key
+            )
+            if handle is None:
+                continue
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(
+                        None, handle.read, STREAM_CHUNK_SIZE
+                    )
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                handle.close()
+            if engine == ENGINE_TEXT:
+                self._schedule_upgrade(pdf_path)
+            return
+
+        # 没有缓存但同一PDF正在完整转换：等待其结果；转换失败时改用快速引擎
+        inflight_key = (ENGINE_FULL, cache_key)
+        task = self._inflight.get(inflight_key)
+        if task is not None:
+            self.deduplicated += 1
+            try:
+                with self._waiting(inflight_key, task):
+                    content = await asyncio.shield(task)
+            except Exception as e:
+                logger.info(f"完整转换失败，改用快速引擎流式读取: {e}")
+            else:
+                if content:
+                    yield content
+                return
+
+        inflight_key, task = self._start(pdf_path, cache_key, ENGINE_TEXT, spool=True)
+        # 作为等待方登记：所有流式请求都断开时撤销转换
+        with self._waiting(inflight_key, task):
+            async for chunk in self._follow(task):
+                yield chunk
+        self._schedule_upgrade(pdf_path)
+
+    async def _follow(self, task: asyncio.Task) -> AsyncIterator[str]:
+        """
+        读取在途转换写出的spool文件直到转换结束；
+        转换没有spool文件（非流式请求发起）时，等待完成后一次性产出结果
+        """
+        loop = asyncio.get_running_loop()
+        handle = None
+        spool = self._spools.get(task)
+        if spool is not None and not task.done():
+            with contextlib.suppress(FileNotFoundError):
+                handle = await loop.run_in_executor(None, open, spool, "rb")
+        if handle is None:
+            content = await asyncio.shield(task)
+            if content:
+                yield content
+            return
+
+        # 工作进程按字符写入，读取的字节块可能截断多字节字符
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            while True:
+                # 先记录是否已结束再读取：结束前写入的内容都能在本轮读到
+                done = task.done()
+                data = await loop.run_in_executor(None, handle.read, STREAM_CHUNK_SIZE)
+                if data:
+                    text = decoder.decode(data)
+                    if text:
+                        yield text
+                    continue
+                if done:
+                    break
+                await asyncio.wait({task}, timeout=SPOOL_POLL_INTERVAL)
+        finally:
+            handle.close()
+        # 转换失败或超时时抛出对应的异常
+        task.result()
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def stats(self) -> dict[str, Any]:
+        """解析缓存统计信息"""
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "inflight": len(self._inflight),
+            "running": min(len(self._inflight), self.max_workers),
+            "queued": max(0, len(self._inflight) - self.max_workers),
+            "queue_limit": settings.PDF_PARSE_QUEUE_LIMIT,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "upgrading": len(self._upgrades),
+            "fingerprints": self.fingerprints.stats(),
+            "cache": self.cache.stats(),
+            "text_cache": self.caches[ENGINE_TEXT].stats(),
+        }
+
+    async def prune_cache(self) -> dict[str, int]:
+        """清理来源PDF已不存在的缓存条目并执行配额淘汰，返回各引擎缓存的合计"""
+        loop = asyncio.get_running_loop()
+        total: dict[str, int] = {}
+        for cache in self.caches.values():
+            result = await loop.run_in_executor(None, cache.prune)
+            for name, count in result.items():
+                total[name] = total.get(name, 0) + count
+        return total
 
     def shutdown(self):
-        """关闭线程池"""
-        self.executor.shutdown(wait=True)
+        """关闭解析进程池或线程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
 
 
 # 全局实例
@@ -0,0 +1,239 @@
+"""
+后台预解析调度
+按优先级把论文PDF预先解析进PDFParserService的缓存并更新全文索引：最近打开的论文的相邻论文优先，
+其次是最近添加的论文。PREPARSE_ENGINE=text 时只做快速文本提取，低成本地为整个库建立正文索引。
+只在没有交互式解析时执行，且并发数小于解析工作进程数，交互式请求总能立即获得空闲的工作进程；
+只有一个工作进程时不做预解析
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any
+
+from app.core.config import settings
+from app.services.attachment_resolver import (
+    AttachmentResolutionError,
+    AttachmentResolver,
+    attachment_resolver,
+)
+from app.services.pdf_parser import (
+    ParserOverloadedError,
+    PDFParserService,
+    pdf_parser,
+)
+from app.services.search_index import SearchIndex, search_index
+from app.services.zotero_mirror import NON_PAPER_ITEM_TYPES
+from app.services.zotero_service import ZoteroService, zotero_service
+
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越先执行
+PRIORITY_ADJACENT = 0
+PRIORITY_RECENT = 1
+
+# 队列为空、暂停或交互式解析进行中时的轮询间隔（秒）
+POLL_INTERVAL = 1.0
+
+
+class PreparseScheduler:
+    """后台预解析调度器"""
+
+    def __init__(
+        self,
+        parser: PDFParserService,
+        resolver: AttachmentResolver,
+        zotero: ZoteroService,
+        index: SearchIndex,
+    ):
+        self.parser = parser
+        self.resolver = resolver
+        self.zotero = zotero
+        self.index = index
+
+        self._queue: list[tuple[int, int, str]] = []
+        self._queued: dict[str, int] = {}
+        self._seq = itertools.count()
+        # 最近一次扫描得到的论文顺序（按添加时间倒序），用于查找相邻论文
+        self._order: list[str] = []
+        self._position: dict[str, int] = {}
+
+        self.paused = False
+        self._tasks: list[asyncio.Task] = []
+        self.current: set[str] = set()
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @property
+    def concurrency(self) -> int:
+        """后台并发数，至少为交互式请求保留一个解析工作进程（只有一个工作进程时为0）"""
+        return max(0, min(settings.PREPARSE_CONCURRENCY, self.parser.max_workers - 1))
+
+    def enqueue(self, paper_keys: list[str], priority: int) -> int:
+        """加入队列（已在队列中的论文只会提升优先级），返回新加入或提升的数量"""
+        added = 0
+        for key in paper_keys:
+            if key in self.current:
+                continue
+            queued = self._queued.get(key)
+            if queued is not None and queued <= priority:
+                continue
+            # 旧的堆元素保留在堆中，出队时按 _queued 中的优先级识别并跳过
+            self._queued[key] = priority
+            heapq.heappush(self._queue, (priority, next(self._seq), key))
+            added += 1
+        return added
+
+    def _pop(self) -> str | None:
+        while self._queue:
+            priority, _, key = heapq.heappop(self._queue)
+            if self._queued.get(key) == priority:
+                del self._queued[key]
+                return key
+        return None
+
+    def note_opened(self, paper_key: str) -> None:
+        """记录交互式打开的论文，将其在列表中前后相邻的论文加入高优先级队列"""
+        index = self._position.get(paper_key)
+        if index is None:
+            return
+        radius = settings.PREPARSE_ADJACENT
+        neighbors = [
+            self._order[i]
+            for i in range(max(0, index - radius), index + radius + 1)
+            if i != index and i < len(self._order)
+        ]
+        self.enqueue(neighbors, PRIORITY_ADJACENT)
+
+    async def scan_library(self) -> int:
+        """按添加时间倒序读取最近的论文并加入队列"""
+        order: list[str] = []
+        cursor = None
+        while len(order) < settings.PREPARSE_RECENT_LIMIT:
+            papers, cursor = await self.zotero.list_papers(
+                limit=min(100, settings.PREPARSE_RECENT_LIMIT - len(order)),
+                cursor=cursor,
+            )
+            order.extend(paper["key"] for paper in papers)
+            if not cursor:
+                break
+        self._order = order
+        self._position = {key: i for i, key in enumerate(order)}
+        return self.enqueue(order, PRIORITY_RECENT)
+
+    async def on_mirror_sync(self, changed: list[dict], deleted: list[str]) -> None:
+        """镜像同步监听器：新增或修改的论文加入队列（解析缓存按内容去重，未变化的PDF会被跳过）"""
+        keys = []
+        for item in changed:
+            data = item.get("data", {})
+            if data.get("itemType") == "attachment" and data.get("parentItem"):
+                keys.append(data["parentItem"])
+            elif data.get("itemType") not in NON_PAPER_ITEM_TYPES and not data.get(
+                "deleted"
+            ):
+                keys.append(item["key"])
+        for key in deleted:
+            self._queued.pop(key, None)
+        self.enqueue(keys, PRIORITY_RECENT)
+
+    async def _process(self, paper_key: str) -> None:
+        try:
+            resolved = await self.resolver.resolve(paper_key)
+        except AttachmentResolutionError:
+            self.skipped += 1
+            return
+        path = str(resolved.path)
+        engine = settings.PREPARSE_ENGINE
+        if await self.parser.is_cached(path, engine):
+            self.skipped += 1
+            return
+        try:
+            content = await self.parser.parse_pdf(path, background=True, engine=engine)
+        except ParserOverloadedError:
+            # 没有空闲的解析工作进程，稍后重试
+            self.current.discard(paper_key)
+            self.enqueue([paper_key], PRIORITY_RECENT)
+            await asyncio.sleep(POLL_INTERVAL)
+            return
+        # 顺便更新全文索引，搜索正文无需等用户打开论文
+        await self.index.index_body(paper_key, content, resolved.paper)
+        self.completed += 1
+
+    async def _worker(self) -> None:
+        while True:
+            if (
+                self.paused
+                or not self._queue
+                or self.parser.is_busy(settings.PREPARSE_IDLE_SECONDS)
+            ):
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            paper_key = self._pop()
+            if paper_key is None:
+                continue
+            self.current.add(paper_key)
+            try:
+                await self._process(paper_key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.info(f"预解析论文 {paper_key} 失败: {e}")
+            finally:
+                self.current.discard(paper_key)
+
+    async def _scan_loop(self) -> None:
+        while True:
+            try:
+                await self.scan_library()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"预解析扫描论文库失败: {e}")
+            await asyncio.sleep(settings.PREPARSE_SCAN_INTERVAL)
+
+    def start(self) -> None:
+        """启动定期扫描与后台解析任务"""
+        if self._tasks:
+            return
+        if self.concurrency == 0:
+            logger.info("解析工作进程只有一个，留给交互式请求，不启动后台预解析")
+            return
+        self._tasks.append(asyncio.create_task(self._scan_loop()))
+        self._tasks.extend(
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        )
+
+    async def stop(self) -> None:
+        """停止后台任务（正在进行的转换会在解析进程池中完成并写入缓存）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def pause(self) -> None:
+        self.paused = True
+
+    def resume(self) -> None:
+        self.paused = False
+
+    def status(self) -> dict[str, Any]:
+        """调度器状态"""
+        return {
+            "running": bool(self._tasks),
+            "paused": self.paused,
+            "concurrency": self.concurrency,
+            "queued": len(self._queued),
+            "current": sorted(self.current),
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+
+# 全局实例
+preparse_scheduler = PreparseScheduler(
+    pdf_parser, attachment_resolver, zotero_service, search_index
+)
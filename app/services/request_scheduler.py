@@ -0,0 +1,238 @@
+"""
+上游请求调度
+令牌桶限制对同一上游（arXiv）的请求速率，等待令牌的请求按优先级通道放行（交互式请求优先于批量任务）。
+失败的请求按带抖动的指数退避重试；上游返回 Retry-After 时整个调度器暂停到指定时间，不再发出新请求
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import aiohttp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 优先级通道：数值越小越先放行
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+# 可重试的HTTP状态码（限流与临时性的服务端错误）
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """令牌桶限速、分优先级通道、带重试的请求调度器"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        Args:
+            name: 上游名称（用于日志）
+            rate: 每秒补充的令牌数，即长期平均请求速率
+            burst: 令牌桶容量，允许的突发请求数
+            max_retries: 单个请求最多重试次数
+            backoff_base: 退避基数（秒），第n次重试最多等待 backoff_base * 2**n
+            backoff_max: 单次退避休眠的上限（秒），不会缩短上游 Retry-After 要求的暂停
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # 收到 Retry-After 后暂停放行直到该时刻（monotonic）
+        self._blocked_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+
+        self.granted = dict.fromkeys(LANE_NAMES, 0)
+        self.wait_seconds = dict.fromkeys(LANE_NAMES, 0.0)
+        self.max_wait_seconds = dict.fromkeys(LANE_NAMES, 0.0)
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self) -> float:
+        """距离下一个令牌可用的秒数（0表示当前即可放行）"""
+        self._refill()
+        blocked = self._blocked_until - time.monotonic()
+        if blocked > 0:
+            return blocked
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _record_wait(self, priority: int, waited: float) -> None:
+        self.granted[priority] += 1
+        self.wait_seconds[priority] += waited
+        self.max_wait_seconds[priority] = max(self.max_wait_seconds[priority], waited)
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """等待一个令牌；同时等待的请求按优先级、再按先后顺序放行"""
+        if not self._waiters and self._delay() == 0:
+            self._tokens -= 1
+            self._record_wait(priority, 0.0)
+            return
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        # 取消等待时，分发器会跳过已取消的future
+        await future
+        self._record_wait(priority, time.monotonic() - started)
+
+    async def _dispatch(self) -> None:
+        """按优先级依次放行等待中的请求，令牌不足时睡眠到下一个令牌可用"""
+        while self._waiters:
+            delay = self._delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+    def _backoff(self, attempt: int) -> float:
+        """第attempt次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """可重试的错误返回重试前的等待秒数，否则返回None"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            if error.status not in RETRYABLE_STATUS:
+                return None
+            retry_after = parse_retry_after(
+                error.headers.get("Retry-After") if error.headers else None
+            )
+            if retry_after is not None:
+                # 上游明确要求等待：暂停整个调度器，其他请求也不再发出
+                # 调度器按完整的 Retry-After 暂停；本次重试只休眠不超过 backoff_max，
+                # 之后在 acquire 中等待暂停结束
+                self.throttled += 1
+                self._blocked_until = max(
+                    self._blocked_until, time.monotonic() + retry_after
+                )
+                return min(retry_after, self.backoff_max)
+            if error.status == 429:
+                self.throttled += 1
+            return self._backoff(attempt)
+        if isinstance(
+            error,
+            aiohttp.ClientConnectionError | aiohttp.ClientPayloadError | TimeoutError,
+        ):
+            return self._backoff(attempt)
+        return None
+
+    async def run[T](
+        self,
+        request: Callable[[], Awaitable[T]],
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> T:
+        """
+        在限速下执行请求，失败时按退避策略重试
+
+        Args:
+            request: 发出一次请求并返回结果的协程函数，每次尝试都会重新调用；
+                HTTP错误应以 aiohttp.ClientResponseError 抛出（如 raise_for_status）
+            priority: 优先级通道
+        """
+        attempt = 0
+        while True:
+            await self.acquire(priority)
+            try:
+                return await request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.info(
+                    f"{self.name} 请求失败（{e}），{delay:.1f}秒后第{attempt}次重试"
+                )
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict[str, Any]:
+        """调度器统计信息"""
+        self._refill()
+        queued = dict.fromkeys(LANE_NAMES, 0)
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[priority] += 1
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "blocked_seconds": round(
+                max(0.0, self._blocked_until - time.monotonic()), 2
+            ),
+            "lanes": {
+                LANE_NAMES[lane]: {
+                    "queued": queued[lane],
+                    "granted": self.granted[lane],
+                    "avg_wait_seconds": (
+                        self.wait_seconds[lane] / self.granted[lane]
+                        if self.granted[lane]
+                        else 0.0
+                    ),
+                    "max_wait_seconds": self.max_wait_seconds[lane],
+                }
+                for lane in LANE_NAMES
+            },
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+        }
+
+
+# 全局实例：所有arXiv请求（API查询与PDF下载）共用
+arxiv_scheduler = RequestScheduler(
+    "arXiv",
+    rate=settings.ARXIV_REQUESTS_PER_SECOND,
+    burst=settings.ARXIV_BURST,
+    max_retries=settings.ARXIV_MAX_RETRIES,
+)
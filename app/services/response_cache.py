@@ -0,0 +1,88 @@
+"""
+Zotero API 响应缓存
+以 URL+参数 为键缓存已解析的JSON及其库版本，配合 If-Modified-Since-Version
+条件请求，库未变化时只需一次304往返即可复用缓存内容
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlencode
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应内容"""
+
+    payload: Any
+    version: int
+
+
+def copy_payload(payload: Any) -> Any:
+    """
+    复制响应的最外层结构
+
+    调用方会在条目字典上追加 pdf_attachments 等字段，复制外层即可避免污染缓存；
+    嵌套的 data 等结构是共享的，不应修改
+    """
+    if isinstance(payload, list):
+        return [dict(item) if isinstance(item, dict) else item for item in payload]
+    if isinstance(payload, dict):
+        return dict(payload)
+    return payload
+
+
+class ResponseCache:
+    """带命中统计的有界LRU响应缓存"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path: str, params: dict[str, Any] | None = None) -> str:
+        """由路径和参数生成缓存键（参数顺序无关，取值经URL编码）"""
+        if not params:
+            return path
+        return f"{path}?{urlencode(sorted(params.items()), doseq=True)}"
+
+    def get(self, key: str) -> CachedResponse | None:
+        """查找缓存条目并标记为最近使用"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, payload: Any, version: int) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = CachedResponse(payload=payload, version=version)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_hit(self) -> None:
+        self.hits += 1
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
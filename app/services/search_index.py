@@ -0,0 +1,318 @@
+"""
+全文搜索索引
+基于SQLite FTS5索引论文的标题、作者、摘要、标签以及PDFParserService解析出的Markdown正文，
+随镜像同步和论文解析增量更新，查询完全在本地完成
+"""
+
+import hashlib
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Any
+
+import aiosqlite
+
+from app.core.config import settings
+from app.services.zotero_mirror import NON_PAPER_ITEM_TYPES, format_creators
+
+if TYPE_CHECKING:
+    from app.services.zotero_service import ZoteroService
+
+logger = logging.getLogger(__name__)
+
+# snippet() 中标记命中词的控制字符，返回前会被移除并转换为偏移量
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# 各列在bm25排名中的权重：title, authors, abstract, tags, body
+COLUMN_WEIGHTS = (10.0, 5.0, 3.0, 3.0, 1.0)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> str:
+    """
+    将用户输入转换为安全的FTS5查询
+
+    每个词作为短语引用（避免FTS5语法错误），词之间为AND关系，最后一个词按前缀匹配
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def extract_highlights(marked: str) -> tuple[str, list[list[int]]]:
+    """移除高亮标记，返回纯文本与命中区间 [start, end) 列表"""
+    text_parts: list[str] = []
+    highlights: list[list[int]] = []
+    position = 0
+    start: int | None = None
+    for part in re.split(f"([{HIGHLIGHT_START}{HIGHLIGHT_END}])", marked):
+        if part == HIGHLIGHT_START:
+            start = position
+        elif part == HIGHLIGHT_END:
+            if start is not None:
+                highlights.append([start, position])
+            start = None
+        else:
+            text_parts.append(part)
+            position += len(part)
+    return "".join(text_parts), highlights
+
+
+def _paper_fields(paper: dict) -> dict[str, str]:
+    """从Zotero条目提取需要索引的元数据字段"""
+    data = paper.get("data", {})
+    return {
+        "title": data.get("title", ""),
+        "authors": format_creators(data),
+        "abstract": data.get("abstractNote", ""),
+        "tags": " ".join(tag.get("tag", "") for tag in data.get("tags", [])),
+    }
+
+
+class SearchIndex:
+    """论文全文搜索索引"""
+
+    def __init__(self):
+        self.db_path = settings.DATA_DIR / "search_index.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._initialized = False
+
+    async def initialize(self) -> None:
+        """创建FTS5索引表"""
+        if self._initialized:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                    title, authors, abstract, tags, body,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                );
+
+                CREATE TABLE IF NOT EXISTS paper_docs (
+                    paper_key TEXT PRIMARY KEY,
+                    doc_id INTEGER NOT NULL UNIQUE,
+                    body_hash TEXT
+                );
+                """
+            )
+            await db.commit()
+        self._initialized = True
+
+    async def _upsert(
+        self,
+        db: aiosqlite.Connection,
+        paper_key: str,
+        fields: dict[str, str] | None = None,
+        body: str | None = None,
+    ) -> bool:
+        """写入或更新一篇论文的索引文档，未提供的部分保持原值；返回是否有变化"""
+        body_hash = hashlib.md5(body.encode()).hexdigest() if body is not None else None
+
+        async with db.execute(
+            """
+            SELECT d.doc_id, d.body_hash, f.title, f.authors, f.abstract, f.tags, f.body
+            FROM paper_docs d JOIN papers_fts f ON f.rowid = d.doc_id
+            WHERE d.paper_key = ?
+            """,
+            (paper_key,),
+        ) as cursor:
+            row = await cursor.fetchone()
+
+        if row is not None:
+            doc_id, old_hash = row[0], row[1]
+            current = dict(
+                zip(("title", "authors", "abstract", "tags"), row[2:6], strict=True)
+            )
+            old_body = row[6]
+            if (fields is None or fields == current) and (
+                body is None or body_hash == old_hash
+            ):
+                return False
+            await db.execute("DELETE FROM papers_fts WHERE rowid = ?", (doc_id,))
+        else:
+            doc_id, old_hash, old_body = None, None, ""
+            current = {"title": "", "authors": "", "abstract": "", "tags": ""}
+
+        merged = fields if fields is not None else current
+        cursor = await db.execute(
+            """
+            INSERT INTO papers_fts (rowid, title, authors, abstract, tags, body)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                doc_id,
+                merged["title"],
+                merged["authors"],
+                merged["abstract"],
+                merged["tags"],
+                body if body is not None else old_body,
+            ),
+        )
+        await db.execute(
+            """
+            INSERT OR REPLACE INTO paper_docs (paper_key, doc_id, body_hash)
+            VALUES (?, ?, ?)
+            """,
+            (paper_key, cursor.lastrowid, body_hash or old_hash),
+        )
+        return True
+
+    async def _remove(self, db: aiosqlite.Connection, paper_keys: list[str]) -> None:
+        for paper_key in paper_keys:
+            async with db.execute(
+                "SELECT doc_id FROM paper_docs WHERE paper_key = ?", (paper_key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                continue
+            await db.execute("DELETE FROM papers_fts WHERE rowid = ?", (row[0],))
+            await db.execute("DELETE FROM paper_docs WHERE paper_key = ?", (paper_key,))
+
+    async def index_papers(self, papers: list[dict]) -> int:
+        """批量索引论文元数据，返回实际更新的数量"""
+        await self.initialize()
+        updated = 0
+        async with aiosqlite.connect(self.db_path) as db:
+            for paper in papers:
+                if paper.get("key") and await self._upsert(
+                    db, paper["key"], fields=_paper_fields(paper)
+                ):
+                    updated += 1
+            await db.commit()
+        return updated
+
+    async def index_body(
+        self, paper_key: str, markdown: str, paper: dict | None = None
+    ) -> bool:
+        """索引论文解析后的Markdown正文（内容未变化时跳过），可同时更新元数据"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            changed = await self._upsert(
+                db,
+                paper_key,
+                fields=_paper_fields(paper) if paper else None,
+                body=markdown,
+            )
+            await db.commit()
+        return changed
+
+    async def remove_papers(self, paper_keys: list[str]) -> None:
+        """从索引中移除论文"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            await self._remove(db, paper_keys)
+            await db.commit()
+
+    async def on_mirror_sync(self, changed: list[dict], deleted: list[str]) -> None:
+        """镜像同步监听器：更新变更论文的元数据，移除已删除或移入回收站的论文"""
+        papers = []
+        removed = list(deleted)
+        for item in changed:
+            data = item.get("data", {})
+            if data.get("itemType") in NON_PAPER_ITEM_TYPES or data.get("parentItem"):
+                continue
+            if data.get("deleted"):
+                removed.append(item["key"])
+            else:
+                papers.append(item)
+        await self.index_papers(papers)
+        await self.remove_papers(removed)
+
+    async def is_empty(self) -> bool:
+        """索引中是否还没有任何论文"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT 1 FROM paper_docs LIMIT 1") as cursor:
+                return await cursor.fetchone() is None
+
+    async def reindex(self, zotero_service: "ZoteroService") -> int:
+        """
+        从镜像（可用时）或Zotero后端分页读取全部论文，重建元数据索引
+
+        已不在库中的论文（已删除或移入回收站）从索引中移除
+        """
+        if zotero_service.mirror and await zotero_service.mirror.is_ready():
+            papers = await zotero_service.mirror.all_papers()
+        else:
+            papers = []
+            while True:
+                page = await zotero_service.get_papers(limit=100, start=len(papers))
+                papers.extend(page)
+                if len(page) < 100:
+                    break
+        updated = await self.index_papers(papers)
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT paper_key FROM paper_docs") as cursor:
+                indexed = {row[0] for row in await cursor.fetchall()}
+        removed = sorted(indexed - {paper.get("key") for paper in papers})
+        await self.remove_papers(removed)
+        logger.info(
+            f"搜索索引已重建: {len(papers)} 篇论文, {updated} 篇有更新, "
+            f"移除 {len(removed)} 篇"
+        )
+        return updated + len(removed)
+
+    async def search(
+        self, query: str, limit: int = 20, offset: int = 0
+    ) -> dict[str, Any]:
+        """
+        按相关度搜索论文
+
+        Returns:
+            {"total": 命中总数, "results": [...], "took_ms": 耗时}，每个结果包含
+            paper_id、title、score、snippet以及snippet中的命中区间highlights
+        """
+        await self.initialize()
+        started = time.perf_counter()
+        match = build_match_query(query)
+        if not match:
+            return {"total": 0, "results": [], "took_ms": 0.0}
+
+        weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM papers_fts WHERE papers_fts MATCH ?", (match,)
+            ) as cursor:
+                total = (await cursor.fetchone())[0]
+            async with db.execute(
+                f"""
+                SELECT d.paper_key, f.title, bm25(papers_fts, {weights}) AS score,
+                       snippet(papers_fts, -1, ?, ?, '…', 24)
+                FROM papers_fts f JOIN paper_docs d ON d.doc_id = f.rowid
+                WHERE papers_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                (HIGHLIGHT_START, HIGHLIGHT_END, match, limit, offset),
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        results = []
+        for paper_key, title, score, marked in rows:
+            snippet, highlights = extract_highlights(marked)
+            results.append(
+                {
+                    "paper_id": paper_key,
+                    "title": title,
+                    # bm25越小越相关，取反后分数越大越相关
+                    "score": -score,
+                    "snippet": snippet,
+                    "highlights": highlights,
+                }
+            )
+        return {
+            "total": total,
+            "results": results,
+            "took_ms": (time.perf_counter() - started) * 1000,
+        }
+
+
+# 全局实例
+search_index = SearchIndex()
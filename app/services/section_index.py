@@ -0,0 +1,106 @@
+"""
+Markdown章节索引
+从解析后的Markdown中识别标题（Markdown标题、编号章节如"3.2 Method"、常见的无编号章节名），
+记录每节在UTF-8编码中的字节偏移、层级与大致token数，用于只返回大纲或单个章节
+"""
+
+import math
+import re
+
+# 索引格式版本，格式变化时旧的缓存索引会被重新生成
+SECTION_INDEX_VERSION = 1
+
+# 粗略估计：英文文本平均每个token约4个字符
+CHARS_PER_TOKEN = 4
+
+MAX_HEADING_LENGTH = 80
+
+ATX_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+NUMBERED_HEADING_RE = re.compile(
+    r"^((?:\d{1,2}|[A-Z])(?:\.\d{1,2}){0,3})\.?\s+([A-Z][^\n]*)$"
+)
+NAMED_HEADINGS = {
+    "abstract",
+    "introduction",
+    "background",
+    "related work",
+    "method",
+    "methods",
+    "methodology",
+    "experiments",
+    "results",
+    "discussion",
+    "conclusion",
+    "conclusions",
+    "acknowledgments",
+    "acknowledgements",
+    "references",
+    "bibliography",
+    "appendix",
+}
+
+
+def _match_heading(line: str, after_blank: bool) -> tuple[int, str] | None:
+    """判断一行是否为标题，返回 (层级, 标题)"""
+    stripped = line.strip().lstrip("\f")
+    if not stripped or len(stripped) > MAX_HEADING_LENGTH:
+        return None
+
+    match = ATX_HEADING_RE.match(stripped)
+    if match:
+        return len(match.group(1)), match.group(2)
+
+    # 纯文本标题只在段落开头识别，减少把正文中的编号句子误判为标题
+    if not after_blank:
+        return None
+    if stripped.lower().rstrip(":") in NAMED_HEADINGS:
+        return 1, stripped.rstrip(":")
+    match = NUMBERED_HEADING_RE.match(stripped)
+    if match and not stripped.endswith((".", ",", ";")):
+        number = match.group(1)
+        return number.count(".") + 1, stripped
+    return None
+
+
+def build_section_index(markdown: str) -> dict:
+    """
+    构建章节索引
+
+    Returns:
+        {"version", "bytes": 总字节数, "sections": [{"index", "title", "level",
+        "start", "end", "tokens"}]}，start/end 为UTF-8字节偏移 [start, end)，
+        end 延伸到下一个同级或更高级标题（包含子章节）
+    """
+    headings: list[tuple[int, str, int, int]] = []  # (层级, 标题, 字节偏移, 字符偏移)
+    byte_offset = char_offset = 0
+    after_blank = True
+    for line in markdown.splitlines(keepends=True):
+        heading = _match_heading(line, after_blank)
+        if heading:
+            headings.append((heading[0], heading[1], byte_offset, char_offset))
+        after_blank = not line.strip()
+        byte_offset += len(line.encode("utf-8"))
+        char_offset += len(line)
+
+    sections = []
+    for i, (level, title, start, char_start) in enumerate(headings):
+        end, char_end = byte_offset, char_offset
+        for next_level, _, next_start, next_char in headings[i + 1 :]:
+            if next_level <= level:
+                end, char_end = next_start, next_char
+                break
+        sections.append(
+            {
+                "index": i,
+                "title": title,
+                "level": level,
+                "start": start,
+                "end": end,
+                "tokens": math.ceil((char_end - char_start) / CHARS_PER_TOKEN),
+            }
+        )
+    return {
+        "version": SECTION_INDEX_VERSION,
+        "bytes": byte_offset,
+        "sections": sections,
+    }
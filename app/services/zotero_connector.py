@@ -11,7 +11,9 @@ import string
 import aiohttp
 from fastapi import HTTPException
 
+from app.core.config import settings
 from app.services.arxiv_service import ArxivService
+from app.services.http_client import http_clients
 from app.services.zotero_service import ZoteroService
 
 
@@ -27,25 +29,27 @@ class ZoteroConnectorService:
         self.base_url = base_url
         self.zotero_service = zotero_service
         self.arxiv_service = arxiv_service
-
-    def get_session(self) -> aiohttp.ClientSession:
-        """获取配置好的aiohttp会话"""
-        return aiohttp.ClientSession(
+        http_clients.register(
+            "zotero-connector",
             base_url=self.base_url,
-            timeout=aiohttp.ClientTimeout(total=30),
+            timeout=settings.ZOTERO_HTTP_TIMEOUT,
         )
 
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的aiohttp会话（连接池由应用生命周期管理，调用方不应关闭）"""
+        return http_clients.get("zotero-connector")
+
     async def test_connection(self) -> bool:
         """测试Zotero Connector连接"""
-        async with self.get_session() as session:
-            try:
-                async with session.get(
-                    "/connector/ping",
-                    timeout=aiohttp.ClientTimeout(total=5),
-                ) as response:
-                    return response.status == 200
-            except Exception:
-                return False
+        session = self.get_session()
+        try:
+            async with session.get(
+                "/connector/ping",
+                timeout=aiohttp.ClientTimeout(total=5),
+            ) as response:
+                return response.status == 200
+        except Exception:
+            return False
 
     def _generate_item_id(self) -> str:
         """生成符合Zotero要求的8位item ID"""
@@ -102,20 +106,20 @@ class ZoteroConnectorService:
 
         payload = {"items": [zotero_item], "sessionID": session_id}
 
-        async with self.get_session() as session:
-            async with session.post(
-                "/connector/saveItems",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-            ) as response:
-                if response.status == 201:
-                    _ = await response.json()
-                else:
-                    error_text = await response.text()
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Failed to save item: {error_text}",
-                    )
+        session = self.get_session()
+        async with session.post(
+            "/connector/saveItems",
+            json=payload,
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            if response.status == 201:
+                _ = await response.json()
+            else:
+                error_text = await response.text()
+                raise HTTPException(
+                    status_code=response.status,
+                    detail=f"Failed to save item: {error_text}",
+                )
 
         # 如果有PDF路径，添加附件 - 使用生成的item_id作为parent_key
         if pdf_path:
@@ -211,24 +215,24 @@ class ZoteroConnectorService:
             "sessionID": session_id,
         }
 
-        async with self.get_session() as session:
-            async with session.post(
-                "/connector/saveAttachment",
-                headers={
-                    "X-Metadata": json.dumps(metadata, ensure_ascii=False),
-                    "Content-Type": "application/pdf",
-                },
-                data=pdf_content,
-            ) as response:
-                if response.status == 201:
-                    _ = await response.text()
-                    return
-                else:
-                    error_text = await response.text()
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Failed to save attachment: {error_text}",
-                    )
+        session = self.get_session()
+        async with session.post(
+            "/connector/saveAttachment",
+            headers={
+                "X-Metadata": json.dumps(metadata, ensure_ascii=False),
+                "Content-Type": "application/pdf",
+            },
+            data=pdf_content,
+        ) as response:
+            if response.status == 201:
+                _ = await response.text()
+                return
+            else:
+                error_text = await response.text()
+                raise HTTPException(
+                    status_code=response.status,
+                    detail=f"Failed to save attachment: {error_text}",
+                )
 
     async def find_saved_arxiv_paper(self, arxiv_id: str, title: str) -> str | None:
         """
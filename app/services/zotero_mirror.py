@@ -0,0 +1,734 @@
+"""
+Zotero 本地镜像
+将Zotero库同步到DATA_DIR下的SQLite数据库，基于库版本号（since / Last-Modified-Version）增量更新，
+论文列表与详情直接从镜像读取，Zotero重启期间依然可以提供只读访问
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+import aiosqlite
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.services.zotero_service import ZoteroService
+
+logger = logging.getLogger(__name__)
+
+# 不作为论文展示的条目类型
+NON_PAPER_ITEM_TYPES = ("attachment", "note", "annotation")
+
+# 同步监听器：接收 (变更的条目, 删除的key)
+SyncListener = Callable[[list[dict], list[str]], Awaitable[None]]
+
+# 每页同步的条目数量（Zotero API单次最多返回100条）
+SYNC_PAGE_SIZE = 100
+
+# 单条SQL中IN列表的最大参数数量
+SQL_BATCH_SIZE = 500
+
+
+class MirrorUnavailableError(Exception):
+    """请求需要本地镜像，但镜像未启用或尚未完成首次同步"""
+
+
+@dataclass
+class PaperFilters:
+    """
+    论文列表的分面过滤条件
+
+    不同分面之间为AND关系；同一分面的多个取值为OR关系，标签除外（多个标签需同时具备）。
+    has_pdf为None时不限制是否有PDF
+    """
+
+    tags: list[str] = field(default_factory=list)
+    years: list[str] = field(default_factory=list)
+    journals: list[str] = field(default_factory=list)
+    item_types: list[str] = field(default_factory=list)
+    has_pdf: bool | None = True
+
+    def needs_mirror(self) -> bool:
+        """Zotero API只支持单个标签且只列出带PDF的论文，其余组合只能在镜像中计算"""
+        return (
+            len(self.tags) > 1
+            or bool(self.years or self.journals or self.item_types)
+            or self.has_pdf is not True
+        )
+
+
+def format_creators(data: dict) -> str:
+    """将creators转换为可搜索的文本"""
+    names = []
+    for creator in data.get("creators", []):
+        if creator.get("name"):
+            names.append(creator["name"])
+        else:
+            names.append(
+                " ".join(
+                    part
+                    for part in (creator.get("firstName"), creator.get("lastName"))
+                    if part
+                )
+            )
+    return ", ".join(names)
+
+
+def build_facets(
+    total: int,
+    tags: list[dict],
+    years: list[dict],
+    journals: list[dict],
+    item_types: list[dict],
+    has_pdf: list[dict],
+) -> dict[str, Any]:
+    """整理各分面的计数：年份按倒序排列，空值（无年份、无期刊）不计入"""
+    return {
+        "total": total,
+        "tags": tags,
+        "years": sorted(
+            (entry for entry in years if entry["value"]),
+            key=lambda entry: entry["value"],
+            reverse=True,
+        ),
+        "journals": [entry for entry in journals if entry["value"]],
+        "item_types": item_types,
+        "has_pdf": has_pdf,
+    }
+
+
+def _extract_year(item: dict) -> str:
+    """从parsedDate或date字段提取年份"""
+    parsed = item.get("meta", {}).get("parsedDate") or item.get("data", {}).get(
+        "date", ""
+    )
+    year = parsed[:4]
+    return year if year.isdigit() else ""
+
+
+class ZoteroMirror:
+    """Zotero库的本地SQLite镜像"""
+
+    def __init__(self, zotero_service: "ZoteroService"):
+        self.zotero_service = zotero_service
+        self.db_path = settings.DATA_DIR / "zotero_mirror.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._initialized = False
+        self._sync_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._deleted_endpoint_supported = True
+        self._listeners: list[SyncListener] = []
+
+    def add_listener(self, listener: SyncListener) -> None:
+        """注册同步监听器，每次同步写入镜像后调用，用于增量更新派生索引"""
+        self._listeners.append(listener)
+
+    async def initialize(self) -> None:
+        """创建镜像表结构"""
+        if self._initialized:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    parent_key TEXT,
+                    item_type TEXT NOT NULL,
+                    content_type TEXT,
+                    date_added TEXT,
+                    title TEXT NOT NULL DEFAULT '',
+                    creators TEXT NOT NULL DEFAULT '',
+                    year TEXT NOT NULL DEFAULT '',
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    file_url TEXT,
+                    item_json JSON NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_items_parent
+                    ON items (parent_key, content_type);
+                CREATE INDEX IF NOT EXISTS idx_items_top_date
+                    ON items (parent_key, date_added DESC);
+
+                CREATE TABLE IF NOT EXISTS tags (
+                    item_key TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (item_key, tag)
+                );
+                CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags (tag);
+
+                -- 分面索引：每篇论文一行，随同步增量维护
+                CREATE TABLE IF NOT EXISTS paper_facets (
+                    key TEXT PRIMARY KEY,
+                    date_added TEXT,
+                    item_type TEXT NOT NULL,
+                    year TEXT NOT NULL DEFAULT '',
+                    journal TEXT NOT NULL DEFAULT '',
+                    has_pdf INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_facets_date
+                    ON paper_facets (date_added DESC, key DESC);
+                CREATE INDEX IF NOT EXISTS idx_facets_has_pdf
+                    ON paper_facets (has_pdf, date_added DESC);
+                CREATE INDEX IF NOT EXISTS idx_facets_year ON paper_facets (year);
+                CREATE INDEX IF NOT EXISTS idx_facets_journal ON paper_facets (journal);
+                CREATE INDEX IF NOT EXISTS idx_facets_item_type
+                    ON paper_facets (item_type);
+
+                -- 同步时通过Zotero API查询附件文件地址的结果（条目未带 file:// 链接时），
+                -- error为空表示已查询但没有本地文件
+                CREATE TABLE IF NOT EXISTS file_url_lookups (
+                    key TEXT PRIMARY KEY,
+                    error TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS deletions (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER,
+                    deleted_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    library_version INTEGER NOT NULL,
+                    synced_at TEXT NOT NULL
+                );
+                """
+            )
+            # 旧版本创建的镜像没有分面索引，首次启动时一次性补建
+            async with db.execute("SELECT 1 FROM paper_facets LIMIT 1") as cursor:
+                facets_empty = await cursor.fetchone() is None
+            if facets_empty:
+                await self._refresh_facets(db, None)
+            await db.commit()
+        self._initialized = True
+
+    async def get_library_version(self) -> int | None:
+        """获取镜像已同步到的库版本，从未同步过返回None"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT library_version FROM sync_state WHERE id = 1"
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+
+    async def is_ready(self) -> bool:
+        """镜像是否完成过至少一次完整同步"""
+        return await self.get_library_version() is not None
+
+    # ------------------------------------------------------------------
+    # 同步
+    # ------------------------------------------------------------------
+
+    def _item_row(self, item: dict) -> tuple:
+        """将API条目转换为items表的一行"""
+        data = item.get("data", {})
+        enclosure = item.get("links", {}).get("enclosure", {}).get("href", "")
+        return (
+            item["key"],
+            item.get("version", data.get("version", 0)),
+            data.get("parentItem"),
+            data.get("itemType", ""),
+            data.get("contentType"),
+            data.get("dateAdded"),
+            data.get("title", ""),
+            format_creators(data),
+            _extract_year(item),
+            1 if data.get("deleted") else 0,
+            enclosure if enclosure.startswith("file://") else None,
+            json.dumps(item, ensure_ascii=False),
+        )
+
+    async def _apply_items(self, db: aiosqlite.Connection, items: list[dict]) -> None:
+        """写入一批新增或修改的条目"""
+        rows = [self._item_row(item) for item in items if item.get("key")]
+        await db.executemany(
+            """
+            INSERT OR REPLACE INTO items (
+                key, version, parent_key, item_type, content_type, date_added,
+                title, creators, year, deleted, file_url, item_json
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        keys = [(row[0],) for row in rows]
+        await db.executemany("DELETE FROM tags WHERE item_key = ?", keys)
+        await db.executemany(
+            "INSERT OR IGNORE INTO tags (item_key, tag) VALUES (?, ?)",
+            [
+                (item["key"], tag["tag"])
+                for item in items
+                if item.get("key")
+                for tag in item.get("data", {}).get("tags", [])
+                if tag.get("tag")
+            ],
+        )
+        await db.executemany("DELETE FROM deletions WHERE key = ?", keys)
+        # 变更的附件重新查询文件地址
+        await db.executemany("DELETE FROM file_url_lookups WHERE key = ?", keys)
+
+    async def _apply_deletions(
+        self, db: aiosqlite.Connection, keys: list[str], version: int | None
+    ) -> None:
+        """删除已从Zotero库中移除的条目，并记录删除"""
+        if not keys:
+            return
+        now = datetime.now().isoformat()
+        rows = [(key,) for key in keys]
+        await db.executemany("DELETE FROM items WHERE key = ?", rows)
+        await db.executemany("DELETE FROM tags WHERE item_key = ?", rows)
+        await db.executemany("DELETE FROM file_url_lookups WHERE key = ?", rows)
+        await db.executemany(
+            "INSERT OR REPLACE INTO deletions (key, version, deleted_at) VALUES (?, ?, ?)",
+            [(key, version, now) for key in keys],
+        )
+
+    async def _fetch_deleted_keys(self, since: int) -> list[str] | None:
+        """获取自since以来删除的条目key，本地API不支持时返回None"""
+        if not self._deleted_endpoint_supported:
+            return None
+        try:
+            deleted = await self.zotero_service.get_deleted_since(since)
+        except Exception as e:
+            logger.info(f"Zotero本地API不支持 /deleted，改用key对账: {e}")
+            self._deleted_endpoint_supported = False
+            return None
+        return deleted.get("items", [])
+
+    async def _reconcile_deletions(self, db: aiosqlite.Connection) -> list[str]:
+        """通过对比全部key找出已删除的条目（/deleted 不可用时的回退方案）"""
+        remote_keys = await self.zotero_service.get_all_item_keys()
+        async with db.execute("SELECT key FROM items") as cursor:
+            local_keys = {row[0] for row in await cursor.fetchall()}
+        return sorted(local_keys - remote_keys)
+
+    async def _parent_keys(self, db: aiosqlite.Connection, keys: list[str]) -> set[str]:
+        """查询条目当前在镜像中的父条目key"""
+        parents: set[str] = set()
+        for i in range(0, len(keys), SQL_BATCH_SIZE):
+            batch = keys[i : i + SQL_BATCH_SIZE]
+            async with db.execute(
+                f"""
+                SELECT parent_key FROM items
+                WHERE key IN ({",".join("?" * len(batch))}) AND parent_key IS NOT NULL
+                """,
+                batch,
+            ) as cursor:
+                parents.update(row[0] for row in await cursor.fetchall())
+        return parents
+
+    async def _refresh_facets(
+        self, db: aiosqlite.Connection, keys: list[str] | None
+    ) -> None:
+        """重新计算指定论文的分面记录，keys为None时重建全部"""
+        insert = f"""
+            INSERT INTO paper_facets (key, date_added, item_type, year, journal, has_pdf)
+            SELECT p.key, p.date_added, p.item_type, p.year,
+                   COALESCE(json_extract(p.item_json, '$.data.publicationTitle'), ''),
+                   EXISTS (
+                       SELECT 1 FROM items a
+                       WHERE a.parent_key = p.key
+                         AND a.item_type = 'attachment'
+                         AND a.content_type = 'application/pdf'
+                         AND a.deleted = 0
+                   )
+            FROM items p
+            WHERE p.parent_key IS NULL
+              AND p.item_type NOT IN ({",".join("?" * len(NON_PAPER_ITEM_TYPES))})
+              AND p.deleted = 0
+        """
+        if keys is None:
+            await db.execute("DELETE FROM paper_facets")
+            await db.execute(insert, NON_PAPER_ITEM_TYPES)
+            return
+        for i in range(0, len(keys), SQL_BATCH_SIZE):
+            batch = keys[i : i + SQL_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            await db.execute(
+                f"DELETE FROM paper_facets WHERE key IN ({placeholders})", batch
+            )
+            await db.execute(
+                f"{insert} AND p.key IN ({placeholders})",
+                [*NON_PAPER_ITEM_TYPES, *batch],
+            )
+
+    async def _resolve_file_urls(self) -> None:
+        """
+        通过Zotero API补全缺少文件地址的PDF附件，结果写回镜像
+
+        每次同步时执行（包括库未变更时），读取镜像时不再访问Zotero；
+        查询失败的附件记录错误，下次同步时重试
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """
+                SELECT i.key FROM items i
+                LEFT JOIN file_url_lookups l ON l.key = i.key
+                WHERE i.item_type = 'attachment'
+                  AND i.content_type = 'application/pdf'
+                  AND i.deleted = 0
+                  AND i.file_url IS NULL
+                  AND (l.key IS NULL OR l.error IS NOT NULL)
+                """
+            ) as cursor:
+                keys = [row[0] for row in await cursor.fetchall()]
+            if not keys:
+                return
+
+            semaphore = asyncio.Semaphore(settings.ZOTERO_MAX_CONCURRENCY)
+            resolved: dict[str, str] = {}
+            errors: dict[str, str | None] = {}
+
+            async def resolve(attachment_key: str) -> None:
+                async with semaphore:
+                    try:
+                        file_url = await self.zotero_service.get_pdf_file_path(
+                            attachment_key
+                        )
+                    except Exception as e:
+                        logger.warning(f"获取附件 {attachment_key} 文件地址失败: {e}")
+                        errors[attachment_key] = str(e) or type(e).__name__
+                        return
+                if file_url:
+                    resolved[attachment_key] = file_url
+                errors[attachment_key] = None
+
+            await asyncio.gather(*(resolve(key) for key in keys))
+            await db.executemany(
+                "UPDATE items SET file_url = ? WHERE key = ?",
+                [(file_url, key) for key, file_url in resolved.items()],
+            )
+            await db.executemany(
+                "INSERT OR REPLACE INTO file_url_lookups (key, error) VALUES (?, ?)",
+                list(errors.items()),
+            )
+            await db.commit()
+        failed = sum(error is not None for error in errors.values())
+        logger.info(f"已补全 {len(resolved)} 个附件的文件地址，{failed} 个失败")
+
+    async def sync(self) -> int:
+        """
+        增量同步镜像
+
+        Returns:
+            本次新增、修改或删除的条目数量
+        """
+        await self.initialize()
+        async with self._sync_lock:
+            since = await self.get_library_version() or 0
+            changed: list[dict] = []
+            library_version: int | None = None
+            start = 0
+
+            while True:
+                items, version = await self.zotero_service.get_items_since(
+                    since, start=start, limit=SYNC_PAGE_SIZE
+                )
+                if library_version is None:
+                    library_version = version
+                changed.extend(items)
+                if len(items) < SYNC_PAGE_SIZE:
+                    break
+                start += len(items)
+
+            if library_version is not None and library_version == since and since:
+                # 库未变更时仍重试此前失败的附件文件地址查询
+                await self._resolve_file_urls()
+                return 0
+
+            deleted_keys = await self._fetch_deleted_keys(since) if since else []
+
+            async with aiosqlite.connect(self.db_path) as db:
+                if deleted_keys is None:
+                    deleted_keys = await self._reconcile_deletions(db)
+                # 受影响的论文：变更或删除的条目本身，以及附件变更前后的父条目
+                touched = [item["key"] for item in changed if item.get("key")]
+                touched.extend(deleted_keys)
+                affected = set(touched) | await self._parent_keys(db, touched)
+                affected.update(
+                    item["data"]["parentItem"]
+                    for item in changed
+                    if item.get("data", {}).get("parentItem")
+                )
+                await self._apply_items(db, changed)
+                await self._apply_deletions(db, deleted_keys, library_version)
+                await self._refresh_facets(db, sorted(affected))
+                await db.execute(
+                    """
+                    INSERT OR REPLACE INTO sync_state (id, library_version, synced_at)
+                    VALUES (1, ?, ?)
+                    """,
+                    (library_version or since, datetime.now().isoformat()),
+                )
+                await db.commit()
+            await self._resolve_file_urls()
+
+            if changed or deleted_keys:
+                logger.info(
+                    f"Zotero镜像已同步到版本 {library_version}: "
+                    f"{len(changed)} 条变更, {len(deleted_keys)} 条删除"
+                )
+                for listener in self._listeners:
+                    try:
+                        await listener(changed, deleted_keys)
+                    except Exception as e:
+                        logger.warning(f"镜像同步监听器执行失败: {e}")
+            return len(changed) + len(deleted_keys)
+
+    async def run(self, interval: float) -> None:
+        """后台循环同步，Zotero不可用时保留现有镜像继续提供读取"""
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Zotero镜像同步失败: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        """启动后台同步任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(interval))
+
+    async def stop(self) -> None:
+        """停止后台同步任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    async def _load_pdf_attachments(
+        self, db: aiosqlite.Connection, parent_keys: list[str]
+    ) -> dict[str, list[tuple[dict, str | None, str | None]]]:
+        """批量读取父条目的PDF附件、已知文件地址及查询文件地址时的错误"""
+        attachments: dict[str, list[tuple[dict, str | None, str | None]]] = {}
+        if not parent_keys:
+            return attachments
+        placeholders = ",".join("?" * len(parent_keys))
+        async with db.execute(
+            f"""
+            SELECT i.parent_key, i.item_json, i.file_url, l.error FROM items i
+            LEFT JOIN file_url_lookups l ON l.key = i.key
+            WHERE i.parent_key IN ({placeholders})
+              AND i.item_type = 'attachment'
+              AND i.content_type = 'application/pdf'
+              AND i.deleted = 0
+            ORDER BY i.date_added, i.key
+            """,
+            parent_keys,
+        ) as cursor:
+            async for parent_key, item_json, file_url, error in cursor:
+                attachments.setdefault(parent_key, []).append(
+                    (json.loads(item_json), file_url, error)
+                )
+        return attachments
+
+    async def _attach_pdfs(self, db: aiosqlite.Connection, papers: list[dict]) -> None:
+        """
+        为论文补充 pdf_attachments 与 pdf_path 字段（只读取镜像，不访问Zotero）
+
+        同步时未能取得文件地址的论文带有 pdf_error 字段
+        """
+        attachments = await self._load_pdf_attachments(
+            db, [paper["key"] for paper in papers]
+        )
+        for paper in papers:
+            entries = attachments.get(paper["key"])
+            if not entries:
+                continue
+            _, file_url, error = entries[0]
+            paper["pdf_attachments"] = [attachment for attachment, _, _ in entries]
+            if file_url:
+                paper["pdf_path"] = file_url
+            elif error:
+                paper["pdf_error"] = error
+
+    @staticmethod
+    def _filter_conditions(
+        q: str | None, filters: PaperFilters
+    ) -> tuple[list[str], list[Any]]:
+        """生成分面过滤的SQL条件，f为paper_facets，p为items"""
+        conditions: list[str] = []
+        params: list[Any] = []
+        if filters.has_pdf is not None:
+            conditions.append("f.has_pdf = ?")
+            params.append(1 if filters.has_pdf else 0)
+        if q:
+            # 与Zotero默认的 titleCreatorYear 搜索模式一致
+            conditions.append("(p.title LIKE ? OR p.creators LIKE ? OR p.year LIKE ?)")
+            params.extend([f"%{q}%"] * 3)
+        for tag in filters.tags:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM tags t WHERE t.item_key = f.key AND t.tag = ?)"
+            )
+            params.append(tag)
+        for column, values in (
+            ("year", filters.years),
+            ("journal", filters.journals),
+            ("item_type", filters.item_types),
+        ):
+            if values:
+                conditions.append(f"f.{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        return conditions, params
+
+    async def query_papers(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        after: list[str] | None = None,
+        filters: PaperFilters | None = None,
+    ) -> list[dict]:
+        """
+        从镜像查询论文列表，按添加时间倒序
+
+        Args:
+            after: 键集分页位置 [dateAdded, key]，只返回排在其后的论文
+            filters: 分面过滤条件，默认只返回带PDF的论文
+        """
+        await self.initialize()
+        filters = filters or PaperFilters()
+        if tag:
+            filters = replace(filters, tags=[tag, *filters.tags])
+        conditions, params = self._filter_conditions(q, filters)
+        if after:
+            conditions.append("(f.date_added, f.key) < (?, ?)")
+            params.extend(after)
+        params.append(limit)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"""
+                SELECT p.item_json FROM paper_facets f JOIN items p ON p.key = f.key
+                WHERE {" AND ".join(conditions) or "1"}
+                ORDER BY f.date_added DESC, f.key DESC
+                LIMIT ?
+                """,
+                params,
+            ) as cursor:
+                papers = [json.loads(row[0]) async for row in cursor]
+            await self._attach_pdfs(db, papers)
+        return papers
+
+    async def _count_values(
+        self,
+        db: aiosqlite.Connection,
+        value_sql: str,
+        q: str | None,
+        filters: PaperFilters,
+        limit: int | None = None,
+        join_tags: bool = False,
+    ) -> list[dict]:
+        """统计满足过滤条件的论文在某一分面上的取值分布"""
+        conditions, params = self._filter_conditions(q, filters)
+        joins = "JOIN items p ON p.key = f.key"
+        if join_tags:
+            joins += " JOIN tags tg ON tg.item_key = f.key"
+        sql = f"""
+            SELECT {value_sql} AS value, COUNT(*) AS n
+            FROM paper_facets f {joins}
+            WHERE {" AND ".join(conditions) or "1"}
+            GROUP BY value
+            ORDER BY n DESC, value
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        async with db.execute(sql, params) as cursor:
+            return [{"value": str(value), "count": n} async for value, n in cursor]
+
+    async def get_facets(
+        self,
+        q: str | None = None,
+        filters: PaperFilters | None = None,
+        tag_limit: int = 100,
+    ) -> dict[str, Any]:
+        """
+        统计论文列表的分面计数
+
+        每个分面在计算时忽略自身的过滤条件（便于多选），其余条件照常生效；
+        标签为逐级收窄，已选标签仍参与统计。空值（无年份、无期刊）不计入
+
+        Returns:
+            {"total": 满足全部条件的论文数, "tags"/"years"/"journals"/"item_types"/"has_pdf":
+            [{"value": 取值, "count": 数量}, ...]}
+        """
+        await self.initialize()
+        filters = filters or PaperFilters()
+        async with aiosqlite.connect(self.db_path) as db:
+            conditions, params = self._filter_conditions(q, filters)
+            async with db.execute(
+                f"""
+                SELECT COUNT(*) FROM paper_facets f JOIN items p ON p.key = f.key
+                WHERE {" AND ".join(conditions) or "1"}
+                """,
+                params,
+            ) as cursor:
+                total = (await cursor.fetchone())[0]
+
+            tags = await self._count_values(
+                db, "tg.tag", q, filters, limit=tag_limit, join_tags=True
+            )
+            years = await self._count_values(
+                db, "f.year", q, replace(filters, years=[])
+            )
+            journals = await self._count_values(
+                db, "f.journal", q, replace(filters, journals=[])
+            )
+            item_types = await self._count_values(
+                db, "f.item_type", q, replace(filters, item_types=[])
+            )
+            has_pdf = await self._count_values(
+                db,
+                "CASE WHEN f.has_pdf THEN 'true' ELSE 'false' END",
+                q,
+                replace(filters, has_pdf=None),
+            )
+
+        return build_facets(total, tags, years, journals, item_types, has_pdf)
+
+    async def all_papers(self) -> list[dict]:
+        """读取镜像中全部论文条目（不含附件、笔记及回收站中的条目）"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"""
+                SELECT item_json FROM items
+                WHERE parent_key IS NULL
+                  AND item_type NOT IN ({','.join('?' * len(NON_PAPER_ITEM_TYPES))})
+                  AND deleted = 0
+                """,
+                NON_PAPER_ITEM_TYPES,
+            ) as cursor:
+                return [json.loads(row[0]) async for row in cursor]
+
+    async def get_paper(self, key: str) -> dict | None:
+        """从镜像读取单篇论文，附带PDF附件信息"""
+        await self.initialize()
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT item_json FROM items WHERE key = ? AND deleted = 0", (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return None
+            paper = json.loads(row[0])
+            await self._attach_pdfs(db, [paper])
+        return paper
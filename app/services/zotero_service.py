@@ -1,38 +1,103 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from collections.abc import AsyncIterator
+from dataclasses import replace
+from typing import Any
+
 import aiohttp
 from fastapi import HTTPException
 
+from app.core.config import settings
+from app.services.http_client import http_clients
+from app.services.response_cache import ResponseCache, copy_payload
+from app.services.zotero_mirror import (
+    MirrorUnavailableError,
+    PaperFilters,
+    ZoteroMirror,
+)
+
+logger = logging.getLogger(__name__)
+
+# Zotero API 的 itemKey 参数每次最多支持50个key
+ITEM_KEY_BATCH_SIZE = 50
+
 
 class ZoteroService:
     def __init__(self, user_id: int = 0, base_url: str = "http://localhost:23119"):
         self.user_id = user_id
         self.base_url = base_url
+        # 每个Zotero地址对应一个共享连接池
+        self._upstream = f"zotero:{self.base_url}"
+        http_clients.register(
+            self._upstream, base_url=self.base_url, timeout=settings.ZOTERO_HTTP_TIMEOUT
+        )
+        self.mirror: ZoteroMirror | None = None
+        # 最近一次响应中的 Last-Modified-Version
+        self.library_version: int | None = None
+        self.response_cache = ResponseCache(settings.ZOTERO_RESPONSE_CACHE_SIZE)
 
     def get_session(self) -> aiohttp.ClientSession:
-        """获取配置好的aiohttp会话"""
-        return aiohttp.ClientSession(
-            base_url=self.base_url,
-            timeout=aiohttp.ClientTimeout(total=30),
-        )
+        """获取共享的aiohttp会话（连接池由应用生命周期管理，调用方不应关闭）"""
+        return http_clients.get(self._upstream)
+
+    def _observe_version(self, response: aiohttp.ClientResponse) -> None:
+        """记录响应头中的库版本"""
+        version = response.headers.get("Last-Modified-Version")
+        if version and version.isdigit():
+            self.library_version = int(version)
+
+    async def _get_json(self, path: str, params: dict[str, Any] | None = None) -> Any:
+        """
+        GET请求Zotero API并解析JSON，带条件请求缓存
+
+        已缓存时携带 If-Modified-Since-Version 重新验证，收到304直接复用缓存内容
+        """
+        cache_key = self.response_cache.make_key(path, params)
+        cached = self.response_cache.get(cache_key)
+        headers = {"If-Modified-Since-Version": str(cached.version)} if cached else None
+
+        session = self.get_session()
+        async with session.get(path, params=params, headers=headers) as response:
+            self._observe_version(response)
+            if response.status == 304 and cached is not None:
+                self.response_cache.record_hit()
+                return copy_payload(cached.payload)
+
+            response.raise_for_status()
+            payload = await response.json()
+            self.response_cache.record_miss()
+            version = response.headers.get("Last-Modified-Version")
+            if version and version.isdigit():
+                self.response_cache.put(cache_key, payload, int(version))
+            return copy_payload(payload)
 
     async def test_connection(self) -> bool:
         """测试Zotero本地API连接"""
-        async with self.get_session() as session:
-            try:
-                async with session.get(
-                    f"/api/users/{self.user_id}/items/top",
-                    timeout=aiohttp.ClientTimeout(total=5),
-                ) as response:
-                    return response.status == 200
-            except Exception:
-                return False
+        session = self.get_session()
+        try:
+            async with session.get(
+                f"/api/users/{self.user_id}/items/top",
+                timeout=aiohttp.ClientTimeout(total=5),
+            ) as response:
+                return response.status == 200
+        except Exception:
+            return False
 
     async def get_papers(
-        self, limit: int = 100, q: str | None = None, tag: str | None = None
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        start: int = 0,
     ) -> list[dict]:
         """获取论文列表，按创建时间倒序排序"""
         params = {
             "format": "json",
             "limit": limit,
+            "start": start,
             "sort": "dateAdded",
             "direction": "desc",
         }
@@ -41,82 +106,395 @@ class ZoteroService:
         if tag:
             params["tag"] = tag
 
-        async with self.get_session() as session:
-            async with session.get(
-                f"/api/users/{self.user_id}/items/top",
-                params=params,
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await self._get_json(f"/api/users/{self.user_id}/items/top", params)
+
+    async def get_items_since(
+        self, since: int, start: int = 0, limit: int = 100
+    ) -> tuple[list[dict], int | None]:
+        """
+        获取自指定库版本以来新增或修改的条目（包含回收站中的条目）
+
+        Returns:
+            (条目列表, 响应头中的 Last-Modified-Version)
+        """
+        session = self.get_session()
+        async with session.get(
+            f"/api/users/{self.user_id}/items",
+            params={
+                "format": "json",
+                "since": since,
+                "start": start,
+                "limit": limit,
+                "includeTrashed": 1,
+            },
+        ) as response:
+            response.raise_for_status()
+            self._observe_version(response)
+            version = response.headers.get("Last-Modified-Version")
+            return await response.json(), int(version) if version else None
+
+    async def get_deleted_since(self, since: int) -> dict:
+        """获取自指定库版本以来删除的对象"""
+        session = self.get_session()
+        async with session.get(
+            f"/api/users/{self.user_id}/deleted", params={"since": since}
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def get_all_item_keys(self) -> set[str]:
+        """获取库中全部条目的key"""
+        session = self.get_session()
+        async with session.get(
+            f"/api/users/{self.user_id}/items",
+            params={"format": "keys", "includeTrashed": 1},
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+            return {line.strip() for line in text.splitlines() if line.strip()}
 
     async def get_paper_by_key(self, key: str) -> dict:
         """根据key获取单篇论文详情"""
-        async with self.get_session() as session:
-            async with session.get(
-                f"/api/users/{self.user_id}/items/{key}"
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+        return await self._get_json(f"/api/users/{self.user_id}/items/{key}")
 
     async def get_pdf_attachments(self, item_key: str) -> list[dict]:
         """获取论文的PDF附件"""
         # 获取该论文的子项（attachments）
-        async with self.get_session() as session:
-            async with session.get(
-                f"/api/users/{self.user_id}/items/{item_key}/children"
-            ) as response:
-                response.raise_for_status()
-                children = await response.json()
-
-                # 过滤出PDF附件
-                pdf_attachments = []
-                for child in children:
-                    if (
-                        child.get("data", {}).get("itemType") == "attachment"
-                        and child.get("data", {}).get("contentType")
-                        == "application/pdf"
-                    ):
-                        pdf_attachments.append(child)
+        children = await self._get_json(
+            f"/api/users/{self.user_id}/items/{item_key}/children"
+        )
 
-                return pdf_attachments
+        # 过滤出PDF附件
+        return [child for child in children if _is_pdf_attachment(child)]
 
     async def get_pdf_file_path(self, attachment_key: str) -> str | None:
         """获取PDF文件的实际路径（通过302重定向）"""
-        async with self.get_session() as session:
-            async with session.get(
-                f"/api/users/{self.user_id}/items/{attachment_key}/file",
-                allow_redirects=False,  # 不要自动跟随重定向
-            ) as response:
-                if response.status == 302:
-                    redirect_url = response.headers.get("Location")
-                    return redirect_url
-                elif response.status == 200:
-                    # 直接返回文件内容，这种情况通常不会发生
-                    return None
-                else:
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Unexpected status code: {response.status}",
-                    )
+        session = self.get_session()
+        async with session.get(
+            f"/api/users/{self.user_id}/items/{attachment_key}/file",
+            allow_redirects=False,  # 不要自动跟随重定向
+        ) as response:
+            if response.status == 302:
+                redirect_url = response.headers.get("Location")
+                return redirect_url
+            elif response.status == 200:
+                # 直接返回文件内容，这种情况通常不会发生
+                return None
+            else:
+                raise HTTPException(
+                    status_code=response.status,
+                    detail=f"Unexpected status code: {response.status}",
+                )
 
-    async def get_papers_with_pdfs(
-        self, limit: int = 100, q: str | None = None, tag: str | None = None
-    ) -> list[dict]:
-        """获取带有PDF的论文列表"""
-        papers = await self.get_papers(limit, q, tag)
-        papers_with_pdfs = []
+    async def get_items_by_keys(self, keys: list[str]) -> list[dict]:
+        """按key批量获取条目，每次请求最多包含ITEM_KEY_BATCH_SIZE个key"""
+        batches = [
+            keys[i : i + ITEM_KEY_BATCH_SIZE]
+            for i in range(0, len(keys), ITEM_KEY_BATCH_SIZE)
+        ]
+
+        async def fetch(batch: list[str]) -> list[dict]:
+            return await self._get_json(
+                f"/api/users/{self.user_id}/items",
+                {"format": "json", "itemKey": ",".join(batch), "limit": len(batch)},
+            )
+
+        results = await asyncio.gather(*(fetch(batch) for batch in batches))
+        return [item for items in results for item in items]
+
+    async def resolve_pdf_attachments(self, papers: list[dict]) -> dict[str, dict]:
+        """
+        批量解析一页论文的PDF附件及文件路径
+
+        优先使用父条目 links.attachment 指向的最佳附件，通过多key查询一次性获取；
+        没有PDF最佳附件的条目才回退到逐条查询 /children。文件路径优先取附件
+        links.enclosure 中的 file:// 地址，否则再通过302探测。
+
+        Args:
+            papers: Zotero API返回的父条目列表
+
+        Returns:
+            {父条目key: {"attachments": PDF附件列表, "pdf_path": 文件路径或None}}，
+            查询失败的条目额外带有 "error" 字段；没有PDF的条目不出现在结果中
+        """
+        semaphore = asyncio.Semaphore(settings.ZOTERO_MAX_CONCURRENCY)
+        resolved: dict[str, dict] = {}
+        best_attachments: dict[str, str] = {}  # 附件key -> 父条目key
+        fallback: list[str] = []
 
         for paper in papers:
             key = paper.get("key")
-            if key:
-                # 获取PDF附件
-                pdfs = await self.get_pdf_attachments(key)
-                if pdfs:
-                    paper["pdf_attachments"] = pdfs
-                    # 获取第一个PDF的路径
-                    pdf_path = await self.get_pdf_file_path(pdfs[0]["key"])
-                    if pdf_path:
-                        paper["pdf_path"] = pdf_path
-                    papers_with_pdfs.append(paper)
-
-        return papers_with_pdfs
+            if not key:
+                continue
+            link = paper.get("links", {}).get("attachment", {})
+            if link.get("attachmentType") == "application/pdf" and link.get("href"):
+                best_attachments[link["href"].rstrip("/").split("/")[-1]] = key
+            elif paper.get("meta", {}).get("numChildren", 1) > 0:
+                fallback.append(key)
+
+        # 1. 多key批量获取最佳附件
+        if best_attachments:
+            try:
+                attachments = await self.get_items_by_keys(list(best_attachments))
+            except Exception as e:
+                logger.warning(f"批量获取附件失败: {e}")
+                attachments = []
+                for parent_key in best_attachments.values():
+                    resolved[parent_key] = {
+                        "attachments": [],
+                        "pdf_path": None,
+                        "error": str(e) or type(e).__name__,
+                    }
+            for attachment in attachments:
+                parent_key = best_attachments.get(attachment.get("key", ""))
+                if parent_key and _is_pdf_attachment(attachment):
+                    resolved[parent_key] = {
+                        "attachments": [attachment],
+                        "pdf_path": None,
+                    }
+
+        # 2. 最佳附件不是PDF或无法识别的条目，逐条查询子项
+        async def resolve_children(parent_key: str) -> None:
+            async with semaphore:
+                try:
+                    pdfs = await self.get_pdf_attachments(parent_key)
+                except Exception as e:
+                    # 单篇失败只标记该条目，不影响整个列表
+                    logger.warning(f"获取论文 {parent_key} 的PDF附件失败: {e}")
+                    resolved[parent_key] = {
+                        "attachments": [],
+                        "pdf_path": None,
+                        "error": str(e) or type(e).__name__,
+                    }
+                    return
+            if pdfs:
+                resolved[parent_key] = {"attachments": pdfs, "pdf_path": None}
+
+        await asyncio.gather(*(resolve_children(key) for key in fallback))
+
+        # 3. 解析第一个PDF的文件路径
+        async def resolve_path(parent_key: str, entry: dict) -> None:
+            attachment = entry["attachments"][0]
+            pdf_path = _enclosure_file_url(attachment)
+            if pdf_path is None:
+                async with semaphore:
+                    try:
+                        pdf_path = await self.get_pdf_file_path(attachment["key"])
+                    except Exception as e:
+                        logger.warning(f"获取论文 {parent_key} 的PDF路径失败: {e}")
+                        entry["error"] = str(e) or type(e).__name__
+            entry["pdf_path"] = pdf_path
+
+        await asyncio.gather(
+            *(
+                resolve_path(key, entry)
+                for key, entry in resolved.items()
+                if entry["attachments"]
+            )
+        )
+        return resolved
+
+    async def iter_papers_with_pdfs(self, papers: list[dict]) -> AsyncIterator[dict]:
+        """
+        分批并发解析PDF附件，按原有顺序逐批产出带PDF的论文
+
+        每批对应一次多key查询，第一批解析完成即可开始产出，无需等待整页
+        """
+        chunks = [
+            papers[i : i + ITEM_KEY_BATCH_SIZE]
+            for i in range(0, len(papers), ITEM_KEY_BATCH_SIZE)
+        ]
+        tasks = [
+            asyncio.create_task(self.resolve_pdf_attachments(chunk)) for chunk in chunks
+        ]
+        try:
+            for chunk, task in zip(chunks, tasks, strict=True):
+                resolved = await task
+                for paper in chunk:
+                    entry = resolved.get(paper.get("key", ""))
+                    if entry is None:
+                        continue
+                    if entry["attachments"]:
+                        paper["pdf_attachments"] = entry["attachments"]
+                    if entry["pdf_path"]:
+                        paper["pdf_path"] = entry["pdf_path"]
+                    if "error" in entry:
+                        paper["pdf_error"] = entry["error"]
+                    yield paper
+        finally:
+            # 客户端提前断开时取消尚未完成的批次
+            for task in tasks:
+                task.cancel()
+
+    async def get_papers_with_pdfs(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        start: int = 0,
+    ) -> list[dict]:
+        """获取带有PDF的论文列表（批量解析附件，保持原有顺序）"""
+        papers = await self.get_papers(limit, q, tag, start=start)
+        return [paper async for paper in self.iter_papers_with_pdfs(papers)]
+
+    def enable_mirror(self) -> ZoteroMirror:
+        """启用本地镜像，列表与详情优先从镜像读取"""
+        if self.mirror is None:
+            self.mirror = ZoteroMirror(self)
+        return self.mirror
+
+    async def stream_papers(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        cursor: str | None = None,
+        filters: PaperFilters | None = None,
+    ) -> tuple[AsyncIterator[dict], str | None]:
+        """
+        分页获取论文，镜像可用时从镜像读取
+
+        Args:
+            cursor: 上一页返回的游标，为空时从第一页开始
+            filters: 分面过滤条件，默认只返回带PDF的论文
+
+        Returns:
+            (逐条产出论文的异步迭代器, 下一页游标或None)
+
+        Raises:
+            ValueError: 游标无效
+            MirrorUnavailableError: 过滤条件需要镜像，但镜像不可用
+        """
+        filters = filters or PaperFilters()
+        if tag:
+            filters = replace(filters, tags=[tag, *filters.tags])
+        position = decode_cursor(cursor) if cursor else {}
+        mirror_ready = bool(self.mirror and await self.mirror.is_ready())
+
+        if "after" in position or (not position and mirror_ready):
+            # 镜像使用 (dateAdded, key) 键集游标
+            if not mirror_ready:
+                raise ValueError("Cursor is no longer valid")
+            papers = await self.mirror.query_papers(
+                limit=limit, q=q, after=position.get("after"), filters=filters
+            )
+            next_cursor = None
+            if len(papers) == limit:
+                last = papers[-1]
+                next_cursor = encode_cursor(
+                    {"after": [last["data"].get("dateAdded", ""), last["key"]]}
+                )
+            return _iterate(papers), next_cursor
+
+        if filters.needs_mirror():
+            raise MirrorUnavailableError(
+                "Facet filters require the local library mirror"
+            )
+
+        # Zotero API 使用 start 偏移游标（按父条目计数，包括没有PDF的条目）
+        start = position.get("start", 0)
+        remote_tag = filters.tags[0] if filters.tags else None
+        papers = await self.get_papers(limit, q, remote_tag, start=start)
+        next_cursor = (
+            encode_cursor({"start": start + len(papers)})
+            if len(papers) == limit
+            else None
+        )
+        return self.iter_papers_with_pdfs(papers), next_cursor
+
+    async def list_papers(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        cursor: str | None = None,
+        filters: PaperFilters | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """获取一页论文列表及下一页游标"""
+        papers, next_cursor = await self.stream_papers(limit, q, tag, cursor, filters)
+        return [paper async for paper in papers], next_cursor
+
+    async def get_facets(
+        self, q: str | None = None, filters: PaperFilters | None = None
+    ) -> dict[str, Any]:
+        """
+        从镜像的分面索引统计标签、年份、期刊、条目类型及是否有PDF的计数
+
+        Raises:
+            MirrorUnavailableError: 镜像未启用或尚未完成首次同步
+        """
+        if not (self.mirror and await self.mirror.is_ready()):
+            raise MirrorUnavailableError("Facet index is not available yet")
+        return await self.mirror.get_facets(q, filters)
+
+    async def get_paper(self, key: str) -> dict | None:
+        """获取单篇论文及其PDF附件信息，镜像可用时从镜像读取"""
+        if self.mirror and await self.mirror.is_ready():
+            paper = await self.mirror.get_paper(key)
+            if paper is not None:
+                return paper
+
+        paper = await self.get_paper_by_key(key)
+        if not paper:
+            return None
+        resolved = await self.resolve_pdf_attachments([paper])
+        entry = resolved.get(paper.get("key", key))
+        if entry:
+            paper["pdf_attachments"] = entry["attachments"]
+            if entry["pdf_path"]:
+                paper["pdf_path"] = entry["pdf_path"]
+        return paper
+
+
+def encode_cursor(position: dict) -> str:
+    """将分页位置编码为不透明游标"""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """解析游标，无效时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+async def _iterate(papers: list[dict]) -> AsyncIterator[dict]:
+    for paper in papers:
+        yield paper
+
+
+def _is_pdf_attachment(item: dict) -> bool:
+    """判断条目是否为PDF附件"""
+    data = item.get("data", {})
+    return (
+        data.get("itemType") == "attachment"
+        and data.get("contentType") == "application/pdf"
+    )
+
+
+def _enclosure_file_url(attachment: dict) -> str | None:
+    """从附件的 links.enclosure 中提取本地 file:// 地址"""
+    href = attachment.get("links", {}).get("enclosure", {}).get("href", "")
+    return href if href.startswith("file://") else None
+
+
+def create_zotero_service() -> ZoteroService:
+    """根据 ZOTERO_BACKEND 配置创建Zotero后端"""
+    if settings.ZOTERO_BACKEND == "sqlite":
+        from app.services.zotero_sqlite import ZoteroSQLiteService
+
+        return ZoteroSQLiteService(
+            settings.ZOTERO_DATA_DIR, snapshot=settings.ZOTERO_SQLITE_SNAPSHOT
+        )
+    # 本地API，user_id为0
+    return ZoteroService(user_id=0)
+
+
+# 全局实例
+zotero_service = create_zotero_service()
@@ -0,0 +1,646 @@
+"""
+Zotero SQLite 直读后端
+以只读、immutable方式打开Zotero自身的 zotero.sqlite（或其快照副本），
+用集合式SQL查询代替本地HTTP API，返回与本地API一致的条目JSON结构。
+分面过滤与计数同样直接在 zotero.sqlite 中计算，不需要本地镜像
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from collections.abc import AsyncIterator
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+
+from app.core.config import settings
+from app.services.zotero_mirror import PaperFilters, build_facets
+from app.services.zotero_service import ZoteroService, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# 不作为论文展示的条目类型
+NON_PAPER_ITEM_TYPES = ("attachment", "note", "annotation")
+
+# Zotero多段日期格式："2017-06-12 June 12, 2017"
+MULTIPART_DATE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}) (.*)$", re.DOTALL)
+
+# 用户个人库
+USER_LIBRARY_SQL = "(SELECT libraryID FROM libraries WHERE type = 'user')"
+
+
+def _field_sql(field_name: str) -> str:
+    """条目（i）某个字段取值的相关子查询"""
+    return f"""(
+        SELECT v.value FROM itemData d
+        JOIN fieldsCombined f ON f.fieldID = d.fieldID
+        JOIN itemDataValues v ON v.valueID = d.valueID
+        WHERE d.itemID = i.itemID AND f.fieldName = '{field_name}'
+    )"""
+
+
+# 用户库中的论文及其分面取值，对应镜像的 paper_facets 表。
+# 年份取多段日期开头的SQL日期，未知年份（0000）为空
+PAPERS_CTE = f"""
+    WITH paper_rows AS (
+        SELECT i.itemID AS item_id, i.key AS key, i.dateAdded AS date_added,
+               t.typeName AS item_type,
+               SUBSTR({_field_sql("date")}, 1, 4) AS year_prefix,
+               COALESCE({_field_sql("publicationTitle")}, '') AS journal,
+               EXISTS (
+                   SELECT 1 FROM itemAttachments a
+                   WHERE a.parentItemID = i.itemID
+                     AND a.contentType = 'application/pdf'
+                     AND a.itemID NOT IN (SELECT itemID FROM deletedItems)
+               ) AS has_pdf
+        FROM items i
+        JOIN itemTypesCombined t ON t.itemTypeID = i.itemTypeID
+        WHERE i.libraryID = {USER_LIBRARY_SQL}
+          AND t.typeName NOT IN ({", ".join(f"'{t}'" for t in NON_PAPER_ITEM_TYPES)})
+          AND i.itemID NOT IN (SELECT itemID FROM deletedItems)
+    ),
+    papers AS (
+        SELECT item_id, key, date_added, item_type, journal, has_pdf,
+               CASE WHEN year_prefix GLOB '[0-9][0-9][0-9][0-9]'
+                         AND year_prefix != '0000'
+                    THEN year_prefix ELSE '' END AS year
+        FROM paper_rows
+    )
+"""
+
+
+def _search_sql(item_id: str) -> str:
+    """与Zotero默认的 titleCreatorYear 搜索模式一致的条件，需要两个LIKE参数"""
+    return f"""(
+        EXISTS (
+            SELECT 1 FROM itemData d
+            JOIN fieldsCombined f ON f.fieldID = d.fieldID
+            JOIN itemDataValues v ON v.valueID = d.valueID
+            WHERE d.itemID = {item_id}
+              AND f.fieldName IN ('title', 'date')
+              AND v.value LIKE ?
+        )
+        OR EXISTS (
+            SELECT 1 FROM itemCreators ic
+            JOIN creators c ON c.creatorID = ic.creatorID
+            WHERE ic.itemID = {item_id}
+              AND (c.firstName || ' ' || c.lastName) LIKE ?
+        )
+    )"""
+
+
+def _tag_sql(item_id: str) -> str:
+    """条目带有指定标签的条件，需要一个标签名参数"""
+    return f"""EXISTS (
+        SELECT 1 FROM itemTags it JOIN tags tg ON tg.tagID = it.tagID
+        WHERE it.itemID = {item_id} AND tg.name = ?
+    )"""
+
+
+def _sql_datetime(value: str) -> str:
+    """条目JSON中的 dateAdded（2024-01-01T10:00:00Z）转换为数据库中的格式"""
+    return value.removesuffix("Z").replace("T", " ")
+
+
+async def _iterate(papers: list[dict]) -> AsyncIterator[dict]:
+    for paper in papers:
+        yield paper
+
+
+def _split_multipart_date(value: str) -> tuple[str, str]:
+    """拆分Zotero多段日期，返回 (原始日期字符串, parsedDate)"""
+    match = MULTIPART_DATE_RE.match(value)
+    if not match:
+        return value, ""
+    sql_date, original = match.groups()
+    parsed = re.sub(r"(-00)+$", "", sql_date)
+    return original, "" if parsed == "0000" else parsed
+
+
+def _placeholders(values: list) -> str:
+    return ",".join("?" * len(values))
+
+
+class ZoteroSQLiteService(ZoteroService):
+    """直接读取 zotero.sqlite 的Zotero后端"""
+
+    def __init__(self, data_dir: Path, snapshot: bool = False):
+        super().__init__(user_id=0)
+        self.data_dir = Path(data_dir).expanduser()
+        self.db_path = self.data_dir / "zotero.sqlite"
+        self.snapshot = snapshot
+        self.snapshot_path = settings.DATA_DIR / "cache" / "zotero" / "zotero.sqlite"
+        self._snapshot_stat: tuple[int, int] | None = None
+        # 并发查询可能同时发现源数据库变化，快照刷新需串行执行
+        self._snapshot_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    def _refresh_snapshot(self) -> None:
+        """源数据库变化时重新生成快照副本（先写临时文件再原子替换）"""
+        with self._snapshot_lock:
+            stat = self.db_path.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key == self._snapshot_stat and self.snapshot_path.exists():
+                return
+
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            # 临时文件名唯一，多个进程同时刷新也不会互相覆盖
+            fd, name = tempfile.mkstemp(dir=self.snapshot_path.parent, suffix=".tmp")
+            os.close(fd)
+            tmp_path = Path(name)
+            try:
+                source = sqlite3.connect(
+                    f"{self.db_path.absolute().as_uri()}?mode=ro&immutable=1", uri=True
+                )
+                try:
+                    target = sqlite3.connect(tmp_path)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+                finally:
+                    source.close()
+                tmp_path.replace(self.snapshot_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            self._snapshot_stat = key
+            logger.info(f"已更新Zotero数据库快照: {self.snapshot_path}")
+
+    async def _database_uri(self) -> str:
+        """只读数据库URI，immutable模式下不受Zotero文件锁影响"""
+        if self.snapshot:
+            await asyncio.to_thread(self._refresh_snapshot)
+            path = self.snapshot_path
+        else:
+            path = self.db_path
+        return f"{path.absolute().as_uri()}?mode=ro&immutable=1"
+
+    async def test_connection(self) -> bool:
+        """测试数据库是否可读"""
+        try:
+            async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+                await db.execute("SELECT 1 FROM items LIMIT 1")
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # 条目组装
+    # ------------------------------------------------------------------
+
+    def _attachment_file_path(self, key: str, path: str | None) -> Path | None:
+        """将 itemAttachments.path 解析为本地文件路径"""
+        if not path:
+            return None
+        if path.startswith("storage:"):
+            return self.data_dir / "storage" / key / path[len("storage:") :]
+        if path.startswith("attachments:"):
+            base_dir = settings.ZOTERO_LINKED_ATTACHMENT_BASE_DIR
+            if not base_dir:
+                return None
+            return Path(base_dir).expanduser() / path[len("attachments:") :]
+        return Path(path)
+
+    def _attachment_file_url(self, key: str, path: str | None) -> str | None:
+        """附件的 file:// 地址，与本地API /file 重定向结果一致"""
+        file_path = self._attachment_file_path(key, path)
+        return file_path.absolute().as_uri() if file_path else None
+
+    async def _load_items(
+        self, db: aiosqlite.Connection, item_ids: list[int]
+    ) -> list[dict]:
+        """按itemID批量组装与本地API一致的条目JSON，保持输入顺序"""
+        if not item_ids:
+            return []
+        marks = _placeholders(item_ids)
+        items: dict[int, dict] = {}
+
+        async with db.execute(
+            f"""
+            SELECT i.itemID, i.key, i.version, i.dateAdded, i.dateModified,
+                   t.typeName, p.key, a.contentType, a.linkMode, a.path
+            FROM items i
+            JOIN itemTypesCombined t ON t.itemTypeID = i.itemTypeID
+            LEFT JOIN itemAttachments a ON a.itemID = i.itemID
+            LEFT JOIN items p ON p.itemID = a.parentItemID
+            WHERE i.itemID IN ({marks})
+            """,
+            item_ids,
+        ) as cursor:
+            async for row in cursor:
+                item_id, key, version, added, modified, item_type = row[:6]
+                parent_key, content_type, link_mode, path = row[6:]
+                data: dict[str, Any] = {
+                    "key": key,
+                    "version": version,
+                    "itemType": item_type,
+                    "dateAdded": added.replace(" ", "T") + "Z",
+                    "dateModified": modified.replace(" ", "T") + "Z",
+                }
+                item: dict[str, Any] = {
+                    "key": key,
+                    "version": version,
+                    "meta": {},
+                    "links": {},
+                    "data": data,
+                }
+                if item_type == "attachment":
+                    data["linkMode"] = link_mode
+                    data["contentType"] = content_type or ""
+                    if parent_key:
+                        data["parentItem"] = parent_key
+                    file_url = self._attachment_file_url(key, path)
+                    if file_url:
+                        item["links"]["enclosure"] = {
+                            "href": file_url,
+                            "type": content_type or "",
+                        }
+                else:
+                    data["creators"] = []
+                    data["tags"] = []
+                items[item_id] = item
+
+        async with db.execute(
+            f"""
+            SELECT d.itemID, f.fieldName, v.value
+            FROM itemData d
+            JOIN fieldsCombined f ON f.fieldID = d.fieldID
+            JOIN itemDataValues v ON v.valueID = d.valueID
+            WHERE d.itemID IN ({marks})
+            """,
+            item_ids,
+        ) as cursor:
+            async for item_id, field_name, value in cursor:
+                item = items[item_id]
+                if field_name == "date":
+                    value, parsed = _split_multipart_date(str(value))
+                    if parsed:
+                        item["meta"]["parsedDate"] = parsed
+                item["data"][field_name] = value
+
+        async with db.execute(
+            f"""
+            SELECT ic.itemID, ct.creatorType, c.firstName, c.lastName, c.fieldMode
+            FROM itemCreators ic
+            JOIN creators c ON c.creatorID = ic.creatorID
+            JOIN creatorTypes ct ON ct.creatorTypeID = ic.creatorTypeID
+            WHERE ic.itemID IN ({marks})
+            ORDER BY ic.itemID, ic.orderIndex
+            """,
+            item_ids,
+        ) as cursor:
+            async for item_id, creator_type, first, last, field_mode in cursor:
+                if field_mode == 1:
+                    creator = {"creatorType": creator_type, "name": last}
+                else:
+                    creator = {
+                        "creatorType": creator_type,
+                        "firstName": first,
+                        "lastName": last,
+                    }
+                items[item_id]["data"].setdefault("creators", []).append(creator)
+
+        async with db.execute(
+            f"""
+            SELECT it.itemID, t.name, it.type
+            FROM itemTags it JOIN tags t ON t.tagID = it.tagID
+            WHERE it.itemID IN ({marks})
+            """,
+            item_ids,
+        ) as cursor:
+            async for item_id, name, tag_type in cursor:
+                tag = {"tag": name}
+                if tag_type:
+                    tag["type"] = tag_type
+                items[item_id]["data"].setdefault("tags", []).append(tag)
+
+        async with db.execute(
+            f"""
+            SELECT parentItemID, COUNT(*) FROM (
+                SELECT parentItemID FROM itemAttachments
+                WHERE parentItemID IN ({marks})
+                UNION ALL
+                SELECT parentItemID FROM itemNotes
+                WHERE parentItemID IN ({marks})
+            ) GROUP BY parentItemID
+            """,
+            item_ids + item_ids,
+        ) as cursor:
+            async for parent_id, count in cursor:
+                items[parent_id]["meta"]["numChildren"] = count
+
+        return [items[item_id] for item_id in item_ids if item_id in items]
+
+    # ------------------------------------------------------------------
+    # 查询接口（与 ZoteroService 保持一致）
+    # ------------------------------------------------------------------
+
+    async def get_papers(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        start: int = 0,
+    ) -> list[dict]:
+        """获取论文列表，按创建时间倒序排序"""
+        conditions = [
+            f"i.libraryID = {USER_LIBRARY_SQL}",
+            f"t.typeName NOT IN ({_placeholders(NON_PAPER_ITEM_TYPES)})",
+            "i.itemID NOT IN (SELECT itemID FROM deletedItems)",
+        ]
+        params: list[Any] = list(NON_PAPER_ITEM_TYPES)
+        if q:
+            conditions.append(_search_sql("i.itemID"))
+            params.extend([f"%{q}%", f"%{q}%"])
+        if tag:
+            conditions.append(_tag_sql("i.itemID"))
+            params.append(tag)
+        params.extend([limit, start])
+
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            async with db.execute(
+                f"""
+                SELECT i.itemID FROM items i
+                JOIN itemTypesCombined t ON t.itemTypeID = i.itemTypeID
+                WHERE {" AND ".join(conditions)}
+                ORDER BY i.dateAdded DESC, i.itemID DESC
+                LIMIT ? OFFSET ?
+                """,
+                params,
+            ) as cursor:
+                item_ids = [row[0] for row in await cursor.fetchall()]
+            return await self._load_items(db, item_ids)
+
+    async def get_paper_by_key(self, key: str) -> dict:
+        """根据key获取单篇论文详情"""
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            async with db.execute(
+                f"SELECT itemID FROM items WHERE key = ? AND libraryID = {USER_LIBRARY_SQL}",
+                (key,),
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                return {}
+            items = await self._load_items(db, [row[0]])
+        return items[0] if items else {}
+
+    async def get_items_by_keys(self, keys: list[str]) -> list[dict]:
+        """按key批量获取条目"""
+        if not keys:
+            return []
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            async with db.execute(
+                f"""
+                SELECT itemID FROM items
+                WHERE key IN ({_placeholders(keys)})
+                  AND libraryID = {USER_LIBRARY_SQL}
+                """,
+                keys,
+            ) as cursor:
+                item_ids = [row[0] for row in await cursor.fetchall()]
+            return await self._load_items(db, item_ids)
+
+    async def _query_pdf_attachments(
+        self, db: aiosqlite.Connection, parent_keys: list[str]
+    ) -> dict[str, list[dict]]:
+        """一次查询多个父条目的PDF附件，按添加时间排序"""
+        async with db.execute(
+            f"""
+            SELECT p.key, a.itemID
+            FROM itemAttachments a
+            JOIN items p ON p.itemID = a.parentItemID
+            JOIN items i ON i.itemID = a.itemID
+            WHERE p.key IN ({_placeholders(parent_keys)})
+              AND p.libraryID = {USER_LIBRARY_SQL}
+              AND a.contentType = 'application/pdf'
+              AND a.itemID NOT IN (SELECT itemID FROM deletedItems)
+            ORDER BY i.dateAdded, i.itemID
+            """,
+            parent_keys,
+        ) as cursor:
+            rows = await cursor.fetchall()
+        attachments = await self._load_items(db, [row[1] for row in rows])
+
+        grouped: dict[str, list[dict]] = {}
+        for parent_key, attachment in zip(
+            [row[0] for row in rows], attachments, strict=True
+        ):
+            grouped.setdefault(parent_key, []).append(attachment)
+        return grouped
+
+    async def get_pdf_attachments(self, item_key: str) -> list[dict]:
+        """获取论文的PDF附件"""
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            grouped = await self._query_pdf_attachments(db, [item_key])
+        return grouped.get(item_key, [])
+
+    async def get_pdf_file_path(self, attachment_key: str) -> str | None:
+        """获取PDF文件的 file:// 地址"""
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            async with db.execute(
+                f"""
+                SELECT i.key, a.path FROM items i
+                JOIN itemAttachments a ON a.itemID = i.itemID
+                WHERE i.key = ? AND i.libraryID = {USER_LIBRARY_SQL}
+                """,
+                (attachment_key,),
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return self._attachment_file_url(row[0], row[1])
+
+    async def resolve_pdf_attachments(self, papers: list[dict]) -> dict[str, dict]:
+        """用一次集合查询解析整页论文的PDF附件及文件路径"""
+        parent_keys = [paper["key"] for paper in papers if paper.get("key")]
+        if not parent_keys:
+            return {}
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            grouped = await self._query_pdf_attachments(db, parent_keys)
+        return {
+            parent_key: {
+                "attachments": attachments,
+                "pdf_path": attachments[0]["links"].get("enclosure", {}).get("href"),
+            }
+            for parent_key, attachments in grouped.items()
+        }
+
+    # ------------------------------------------------------------------
+    # 分面过滤与计数（语义与本地镜像一致）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filter_conditions(
+        q: str | None, filters: PaperFilters
+    ) -> tuple[list[str], list[Any]]:
+        """生成分面过滤的SQL条件，p为 PAPERS_CTE 中的papers"""
+        conditions: list[str] = []
+        params: list[Any] = []
+        if filters.has_pdf is not None:
+            conditions.append("p.has_pdf = ?")
+            params.append(1 if filters.has_pdf else 0)
+        if q:
+            conditions.append(_search_sql("p.item_id"))
+            params.extend([f"%{q}%", f"%{q}%"])
+        for tag in filters.tags:
+            conditions.append(_tag_sql("p.item_id"))
+            params.append(tag)
+        for column, values in (
+            ("year", filters.years),
+            ("journal", filters.journals),
+            ("item_type", filters.item_types),
+        ):
+            if values:
+                conditions.append(f"p.{column} IN ({_placeholders(values)})")
+                params.extend(values)
+        return conditions, params
+
+    async def stream_papers(
+        self,
+        limit: int = 100,
+        q: str | None = None,
+        tag: str | None = None,
+        cursor: str | None = None,
+        filters: PaperFilters | None = None,
+    ) -> tuple[AsyncIterator[dict], str | None]:
+        """
+        分页获取论文，分面过滤直接在数据库中计算
+
+        使用与镜像相同的 (dateAdded, key) 键集游标
+
+        Raises:
+            ValueError: 游标无效
+        """
+        filters = filters or PaperFilters()
+        if tag:
+            filters = replace(filters, tags=[tag, *filters.tags])
+        position = decode_cursor(cursor) if cursor else {}
+        conditions, params = self._filter_conditions(q, filters)
+        if position:
+            after = position.get("after")
+            if not (isinstance(after, list) and len(after) == 2):
+                raise ValueError("Cursor is no longer valid")
+            conditions.append("(p.date_added, p.key) < (?, ?)")
+            params.extend([_sql_datetime(str(after[0])), str(after[1])])
+        params.append(limit)
+
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            async with db.execute(
+                f"""
+                {PAPERS_CTE}
+                SELECT p.item_id FROM papers p
+                WHERE {" AND ".join(conditions) or "1"}
+                ORDER BY p.date_added DESC, p.key DESC
+                LIMIT ?
+                """,
+                params,
+            ) as rows:
+                item_ids = [row[0] for row in await rows.fetchall()]
+            papers = await self._load_items(db, item_ids)
+            grouped = (
+                await self._query_pdf_attachments(db, [p["key"] for p in papers])
+                if papers
+                else {}
+            )
+
+        for paper in papers:
+            attachments = grouped.get(paper["key"])
+            if not attachments:
+                continue
+            paper["pdf_attachments"] = attachments
+            pdf_path = attachments[0]["links"].get("enclosure", {}).get("href")
+            if pdf_path:
+                paper["pdf_path"] = pdf_path
+
+        next_cursor = None
+        if len(papers) == limit:
+            last = papers[-1]
+            next_cursor = encode_cursor(
+                {"after": [last["data"].get("dateAdded", ""), last["key"]]}
+            )
+        return _iterate(papers), next_cursor
+
+    async def _count_values(
+        self,
+        db: aiosqlite.Connection,
+        value_sql: str,
+        q: str | None,
+        filters: PaperFilters,
+        limit: int | None = None,
+        join_tags: bool = False,
+    ) -> list[dict]:
+        """统计满足过滤条件的论文在某一分面上的取值分布"""
+        conditions, params = self._filter_conditions(q, filters)
+        joins = ""
+        if join_tags:
+            joins = """
+                JOIN itemTags pt ON pt.itemID = p.item_id
+                JOIN tags ptg ON ptg.tagID = pt.tagID
+            """
+        sql = f"""
+            {PAPERS_CTE}
+            SELECT {value_sql} AS value, COUNT(*) AS n
+            FROM papers p {joins}
+            WHERE {" AND ".join(conditions) or "1"}
+            GROUP BY value
+            ORDER BY n DESC, value
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        async with db.execute(sql, params) as cursor:
+            return [{"value": str(value), "count": n} async for value, n in cursor]
+
+    async def get_facets(
+        self,
+        q: str | None = None,
+        filters: PaperFilters | None = None,
+        tag_limit: int = 100,
+    ) -> dict[str, Any]:
+        """
+        统计论文列表的分面计数，结果格式与镜像的 get_facets 相同
+
+        每个分面在计算时忽略自身的过滤条件，标签为逐级收窄
+        """
+        filters = filters or PaperFilters()
+        async with aiosqlite.connect(await self._database_uri(), uri=True) as db:
+            conditions, params = self._filter_conditions(q, filters)
+            async with db.execute(
+                f"""
+                {PAPERS_CTE}
+                SELECT COUNT(*) FROM papers p
+                WHERE {" AND ".join(conditions) or "1"}
+                """,
+                params,
+            ) as cursor:
+                total = (await cursor.fetchone())[0]
+
+            tags = await self._count_values(
+                db, "ptg.name", q, filters, limit=tag_limit, join_tags=True
+            )
+            years = await self._count_values(
+                db, "p.year", q, replace(filters, years=[])
+            )
+            journals = await self._count_values(
+                db, "p.journal", q, replace(filters, journals=[])
+            )
+            item_types = await self._count_values(
+                db, "p.item_type", q, replace(filters, item_types=[])
+            )
+            has_pdf = await self._count_values(
+                db,
+                "CASE WHEN p.has_pdf THEN 'true' ELSE 'false' END",
+                q,
+                replace(filters, has_pdf=None),
+            )
+        return build_facets(total, tags, years, journals, item_types, has_pdf)
@@ -0,0 +1,53 @@
+import json
+import time
+
+from app.models.arxiv import ArxivMetadata
+from app.services.arxiv_metadata_store import ArxivMetadataStore
+
+
+def metadata(arxiv_id):
+    return ArxivMetadata(
+        arxiv_id=arxiv_id,
+        title=f"Paper {arxiv_id}",
+        pdf_url=f"https://arxiv.org/pdf/{arxiv_id}",
+    )
+
+
+async def test_bulk_put_get_and_lru(tmp_path):
+    db_path = tmp_path / "metadata.db"
+    store = ArxivMetadataStore(db_path, ttl=3600, lru_size=2)
+    await store.put_many([metadata("2301.00001"), metadata("2301.00002")])
+    assert (await store.get("2301.00001")).metadata.title == "Paper 2301.00001"
+    assert store.lru_hits == 1
+
+    # 新实例从数据库读取，结果进入LRU
+    reopened = ArxivMetadataStore(db_path, ttl=3600, lru_size=1)
+    found = await reopened.get_many(["2301.00001", "2301.00002", "2301.00003"])
+    assert sorted(found) == ["2301.00001", "2301.00002"]
+    assert (reopened.db_hits, reopened.misses) == (2, 1)
+    assert list(reopened._lru) == ["2301.00002"]
+    assert (await reopened.stats())["entries"] == 2
+
+    await reopened.delete("2301.00002")
+    assert await reopened.get("2301.00002") is None
+    assert await reopened.cached_at("2301.00002") is None
+
+
+async def test_expired_entries_and_legacy_import(tmp_path):
+    legacy_dir = tmp_path / "metadata"
+    legacy_dir.mkdir()
+    fresh = metadata("2301.00001").model_dump()
+    fresh["_cached_at"] = "2999-01-01T00:00:00"
+    (legacy_dir / "2301.00001.json").write_text(json.dumps(fresh))
+    stale = metadata("2301.00002").model_dump()
+    stale["_cached_at"] = "2000-01-01T00:00:00"
+    (legacy_dir / "2301.00002.json").write_text(json.dumps(stale))
+
+    store = ArxivMetadataStore(
+        tmp_path / "metadata.db", ttl=3600, legacy_dir=legacy_dir
+    )
+    found = await store.get_many(["2301.00001", "2301.00002"])
+    # 旧缓存文件导入后删除，过期时间沿用原缓存时间
+    assert list(found) == ["2301.00001"]
+    assert await store.cached_at("2301.00002") < time.time() - 3600
+    assert not list(legacy_dir.iterdir())
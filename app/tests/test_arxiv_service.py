@@ -0,0 +1,175 @@
+import asyncio
+from urllib.parse import parse_qs, urlparse
+
+from app.core.config import settings
+from app.services.arxiv_service import ArxivService
+from app.services.request_scheduler import RequestScheduler
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+{entries}
+</feed>"""
+
+ENTRY = """<entry>
+  <id>http://arxiv.org/abs/{arxiv_id}v3</id>
+  <title>Paper {arxiv_id}</title>
+  <summary> Abstract </summary>
+  <published>2023-01-01T00:00:00Z</published>
+  <author><name>Alice</name></author>
+  <category term="cs.LG"/>
+  <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v3" type="application/pdf"/>
+</entry>"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def text(self):
+        return self._text
+
+
+class FakeSession:
+    def __init__(self):
+        self.queries = []
+
+    def get(self, url, proxy=None):
+        ids = parse_qs(urlparse(url).query)["id_list"][0].split(",")
+        self.queries.append(ids)
+        # 不存在的论文不返回条目
+        entries = "".join(
+            ENTRY.format(arxiv_id=arxiv_id.removesuffix("v1"))
+            for arxiv_id in ids
+            if arxiv_id != "0000.00000"
+        )
+        return FakeResponse(FEED.format(entries=entries))
+
+
+async def test_metadata_requests_are_coalesced(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "ARXIV_BATCH_SIZE", 3)
+    service = ArxivService()
+    session = FakeSession()
+    monkeypatch.setattr(service, "_get_session", lambda: session)
+    service.scheduler = RequestScheduler("test", rate=1000, burst=10)
+
+    ids = ["2301.00001", "2301.00002v1", "2301.00003", "2301.00004", "0000.00000"]
+    single, batch = await asyncio.gather(
+        service.get_arxiv_metadata("2301.00001"),
+        service.get_arxiv_metadata_many(ids),
+    )
+
+    # 同一窗口内的请求合并，按批大小拆分为两次查询
+    assert sorted(len(query) for query in session.queries) == [2, 3]
+    assert service.coalesced == 1
+    assert single.title == "Paper 2301.00001"
+    assert list(batch) == ids
+    assert batch["2301.00002v1"].arxiv_id == "2301.00002v1"
+    assert batch["2301.00003"].pdf_url == "http://arxiv.org/pdf/2301.00003v3"
+    assert batch["0000.00000"] is None
+
+    # 已缓存的元数据不再查询
+    assert (await service.get_arxiv_metadata_many(ids[:4]))["2301.00004"]
+    assert len(session.queries) == 2
+
+
+async def test_stale_metadata_is_served_and_revalidated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    service = ArxivService()
+    session = FakeSession()
+    monkeypatch.setattr(service, "_get_session", lambda: session)
+    service.scheduler = RequestScheduler("test", rate=1000, burst=10)
+    store = service.metadata_store
+
+    await service.get_arxiv_metadata_many(["2301.00001", "0000.00000"])
+    assert session.queries == [["2301.00001", "0000.00000"]]
+
+    # 不存在的论文在负缓存有效期内不再查询
+    assert await service.get_arxiv_metadata("0000.00000") is None
+    assert len(session.queries) == 1
+
+    # 超过TTL的条目立即返回，刷新在后台进行
+    store.ttl = 0
+    metadata = await service.get_arxiv_metadata("2301.00001")
+    assert metadata.title == "Paper 2301.00001"
+    assert store.stale_hits == 1
+    assert len(session.queries) == 1
+    await asyncio.gather(*service._background_tasks)
+    assert session.queries[-1] == ["2301.00001"]
+    assert service.revalidations == 1
+
+    # 超过 max_stale 后必须等待查询
+    store.max_stale = 0
+    store._lru.clear()
+    await service.get_arxiv_metadata("2301.00001")
+    assert len(session.queries) == 3
+
+
+class VersionedSession(FakeSession):
+    """按请求的版本返回条目，不同版本的标题不同"""
+
+    def get(self, url, proxy=None):
+        ids = parse_qs(urlparse(url).query)["id_list"][0].split(",")
+        self.queries.append(ids)
+        entries = "".join(
+            ENTRY.replace("{arxiv_id}v3", arxiv_id)
+            .replace("Paper {arxiv_id}", f"Title {arxiv_id}")
+            .format(arxiv_id=arxiv_id)
+            for arxiv_id in ids
+        )
+        return FakeResponse(FEED.format(entries=entries))
+
+
+async def test_versions_of_one_paper_in_one_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    service = ArxivService()
+    session = VersionedSession()
+    monkeypatch.setattr(service, "_get_session", lambda: session)
+    service.scheduler = RequestScheduler("test", rate=1000, burst=10)
+
+    ids = ["2301.00001v1", "2301.00001v2", "2301.00001"]
+    results = await service.get_arxiv_metadata_many(ids)
+
+    assert len(session.queries) == 1
+    assert results["2301.00001v1"].title == "Title 2301.00001v1"
+    assert results["2301.00001v2"].title == "Title 2301.00001v2"
+    assert results["2301.00001"] is not None
+    # 不会有版本被误记为不存在
+    assert (await service.metadata_store.stats())["negative_entries"] == 0
+
+
+async def test_local_pdf_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    service = ArxivService()
+    session = FakeSession()
+    monkeypatch.setattr(service, "_get_session", lambda: session)
+    service.scheduler = RequestScheduler("test", rate=1000, burst=10)
+
+    pdf = b"%PDF-1.7\n" + b"x" * 100 + b"\n%%EOF\n"
+    for name in ("2301.00001v2", "2301.00001v10"):
+        (service.pdf_cache_dir / name).write_bytes(pdf)
+    # 截断的文件不会被使用
+    (service.pdf_cache_dir / "2301.00001v11").write_bytes(pdf[:50])
+
+    # 本地已有PDF时不查询元数据，不带版本号的ID使用最新的完整版本
+    assert (await service._get_pdf("2301.00001")).name == "2301.00001v10"
+    assert (await service._get_pdf("2301.00001v2")).name == "2301.00001v2"
+    assert session.queries == []
+
+    # 缓存信息与清除使用与下载相同的文件名
+    info = await service.get_cache_info("2301.00001")
+    assert info["pdf_cached"] and info["pdf_size"] == len(pdf)
+    (service.pdf_cache_dir / "2301.00001v12.part").write_bytes(pdf[:10])
+    (service.pdf_cache_dir / "2301.00002v1").write_bytes(pdf)
+    assert await service.clear_cache("2301.00001")
+    assert [p.name for p in service.pdf_cache_dir.iterdir()] == ["2301.00002v1"]
+    assert not (await service.get_cache_info("2301.00001"))["pdf_cached"]
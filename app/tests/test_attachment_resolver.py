@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.config import settings
+from app.services.attachment_resolver import (
+    AttachmentResolutionError,
+    AttachmentResolver,
+)
+
+
+class FakeZoteroService:
+    """记录get_paper调用次数的假Zotero服务"""
+
+    def __init__(self, papers: dict[str, dict]):
+        self.papers = papers
+        self.mirror = None
+        self.library_version = 1
+        self.calls = 0
+
+    async def get_paper(self, key):
+        self.calls += 1
+        return self.papers.get(key)
+
+
+def make_paper(key: str, pdf_path) -> dict:
+    return {
+        "key": key,
+        "data": {"key": key, "title": key},
+        "pdf_attachments": [{"key": f"A{key}"}],
+        "pdf_path": pdf_path.as_uri(),
+    }
+
+
+@pytest.fixture
+def pdf_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    path = tmp_path / "my paper.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return path
+
+
+async def test_resolver_caches_and_validates(pdf_file):
+    upstream = FakeZoteroService({"P1": make_paper("P1", pdf_file)})
+    resolver = AttachmentResolver(upstream)
+
+    resolved = await resolver.resolve("P1")
+    assert resolved.path == pdf_file
+    assert resolved.paper is not None
+    assert (await resolver.resolve("P1")).paper is None
+    assert upstream.calls == 1
+
+    # 持久化：新实例无需访问Zotero
+    assert (await AttachmentResolver(upstream).resolve("P1")).path == pdf_file
+    assert upstream.calls == 1
+
+    # 库版本变化后重新解析
+    upstream.library_version = 2
+    await resolver.resolve("P1")
+    assert upstream.calls == 2
+
+    # 附件删除后失效
+    await resolver.on_mirror_sync([], ["AP1"])
+    await resolver.resolve("P1")
+    assert upstream.calls == 3
+
+    # 文件不存在时重新解析并报错
+    pdf_file.unlink()
+    with pytest.raises(AttachmentResolutionError, match="PDF file not found"):
+        await resolver.resolve("P1")
+    assert upstream.calls == 4
+    with pytest.raises(AttachmentResolutionError, match="Paper not found"):
+        await resolver.resolve("missing")
@@ -0,0 +1,25 @@
+import hashlib
+import os
+
+from app.services.fingerprint_index import FingerprintIndex
+
+
+def test_fingerprint_index_rehashes_only_on_stat_change(tmp_path):
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF-1.4 v1")
+    index = FingerprintIndex(tmp_path / "fingerprints.db")
+
+    assert index.get_hash(str(pdf)) == hashlib.md5(b"%PDF-1.4 v1").hexdigest()
+    assert index.get_hash(str(pdf)) == hashlib.md5(b"%PDF-1.4 v1").hexdigest()
+    assert (index.hits, index.misses) == (1, 1)
+
+    # 新实例从SQLite读取已知指纹
+    reloaded = FingerprintIndex(tmp_path / "fingerprints.db")
+    reloaded.get_hash(str(pdf))
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+    pdf.write_bytes(b"%PDF-1.4 v2")
+    st = pdf.stat()
+    os.utime(pdf, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert index.get_hash(str(pdf)) == hashlib.md5(b"%PDF-1.4 v2").hexdigest()
+    assert index.misses == 2
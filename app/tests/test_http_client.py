@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from app.services.http_client import HTTPClientManager
+
+
+async def _get(manager, name="test"):
+    return manager.get(name)
+
+
+def test_session_from_another_loop_is_released():
+    manager = HTTPClientManager()
+    manager.register("test")
+
+    # 旧循环已结束（例如每个测试使用独立的循环）：连接器随旧会话一起关闭
+    stale = asyncio.run(_get(manager))
+    connector = stale.connector
+    session = asyncio.run(_get(manager))
+    assert session is not stale
+    assert stale.closed and connector.closed
+
+    # 旧循环仍在其他线程中运行：在该循环中关闭旧会话
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        running = asyncio.run_coroutine_threadsafe(_get(manager), loop).result()
+        assert asyncio.run(_get(manager)) is not running
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), loop).result()
+        assert running.closed
+        # 关闭时同样释放其他循环上的会话
+        current = asyncio.run_coroutine_threadsafe(_get(manager), loop).result()
+        asyncio.run(manager.close())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), loop).result()
+        assert current.closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
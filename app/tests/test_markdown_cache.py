@@ -0,0 +1,55 @@
+import os
+import time
+
+from app.services.markdown_cache import MarkdownCache
+
+
+def test_cache_roundtrip_and_legacy_migration(tmp_path):
+    cache = MarkdownCache(tmp_path)
+    cache.put("a" * 32, "# Title\n" * 100, source_path=None)
+    assert cache.get("a" * 32) == "# Title\n" * 100
+    assert cache.path_for("a" * 32).stat().st_size < len("# Title\n" * 100)
+
+    (tmp_path / f"{'b' * 32}.md").write_text("legacy", encoding="utf-8")
+    assert cache.get("b" * 32) == "legacy"
+    assert not (tmp_path / f"{'b' * 32}.md").exists()
+    assert cache.get("c" * 32) is None
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    cache = MarkdownCache(tmp_path)
+    for key in ("k1", "k2", "k3"):
+        cache.put(key, os.urandom(2000).hex())
+    with cache._connect() as db:
+        db.execute("UPDATE entries SET accessed_at = 0 WHERE key = 'k2'")
+
+    cache.max_bytes = cache.total_bytes() - 1
+    assert cache.enforce_quota() == 1
+    assert cache.get("k2") is None
+    assert cache.get("k1") is not None and cache.get("k3") is not None
+
+
+def test_prune_removes_orphans_and_replaced_sources(tmp_path):
+    cache = MarkdownCache(tmp_path / "cache")
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b"%PDF")
+    gone = tmp_path / "deleted.pdf"
+
+    cache.put("old", "v1", source_path=str(pdf))
+    # PDF被替换后同一路径写入新条目，旧条目立即删除
+    cache.put("new", "v2", source_path=str(pdf))
+    assert cache.get("old") is None
+    cache.put("gone", "orphan", source_path=str(gone))
+
+    stray = tmp_path / "cache" / "leftover.tmp"
+    stray.write_text("x")
+    os.utime(stray, (time.time() - 7200, time.time() - 7200))
+
+    result = cache.prune()
+    assert result["orphaned"] == 1
+    assert result["stray_files"] == 1
+    assert cache.get("new") == "v2"
+    assert cache.get("gone") is None
+    assert cache.stats()["entries"] == 1
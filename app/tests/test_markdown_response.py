@@ -0,0 +1,65 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.v1 import markdown_response
+from app.core.config import settings
+from app.services.pdf_parser import PDFParserService
+
+
+def test_raw_markdown_response(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    parser = PDFParserService(mode="thread")
+    monkeypatch.setattr(markdown_response, "pdf_parser", parser)
+    document = tmp_path / "paper.txt"
+    document.write_text("# Title\n\nBody text\n", encoding="utf-8")
+    parsed = []
+
+    app = FastAPI()
+
+    @app.get("/markdown")
+    async def get_markdown(request: Request):
+        return await markdown_response.raw_markdown_response(
+            request, str(document), on_parsed=parsed.append
+        )
+
+    client = TestClient(app)
+    try:
+        # 首次请求触发解析，响应后回调
+        response = client.get("/markdown")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/markdown; charset=utf-8"
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == "# Title\n\nBody text\n"
+        assert parsed == ["# Title\n\nBody text\n"]
+
+        # 直接发送磁盘上的压缩文件
+        (cache_file,) = parser.cache_dir.glob("*.md.gz")
+        raw = client.get("/markdown", headers={"Accept-Encoding": "gzip"})
+        assert raw.headers["content-length"] == str(cache_file.stat().st_size)
+        assert gzip.decompress(cache_file.read_bytes()) == raw.content
+        assert len(parsed) == 1
+
+        etag = raw.headers["etag"]
+        cached = client.get(
+            "/markdown", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        assert cached.status_code == 304
+        assert not cached.content
+        since = client.get(
+            "/markdown",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-Modified-Since": raw.headers["last-modified"],
+            },
+        )
+        assert since.status_code == 304
+
+        # 不接受gzip的客户端得到解压后的内容，ETag不同
+        plain = client.get("/markdown", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.text == "# Title\n\nBody text\n"
+        assert plain.headers["etag"] != etag
+    finally:
+        parser.shutdown()
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import papers as papers_api
+from app.core.config import settings
+from app.services.zotero_mirror import ZoteroMirror
+from app.services.zotero_service import ZoteroService, encode_cursor
+from app.tests import test_zotero_mirror as mirror_fixture
+
+PAPER_COUNT = 8
+
+
+class FakeZoteroService(ZoteroService):
+    """不访问网络的ZoteroService，本地API分页按偏移返回论文"""
+
+    def __init__(self):
+        super().__init__(user_id=0)
+        self.papers = [
+            {"key": f"P{i}", "data": {"title": f"Paper {i}"}}
+            for i in range(PAPER_COUNT)
+        ]
+
+    async def get_papers(self, limit=100, q=None, tag=None, start=0):
+        return [dict(paper) for paper in self.papers[start : start + limit]]
+
+    async def get_pdf_attachments(self, item_key):
+        return [{"key": f"A{item_key[1:]}"}]
+
+    async def get_pdf_file_path(self, attachment_key):
+        return f"/papers/{attachment_key}.pdf"
+
+
+@pytest.fixture(params=["api", "mirror"])
+def client(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    service = FakeZoteroService()
+    if request.param == "mirror":
+        upstream = mirror_fixture.FakeZoteroService()
+        # 两篇论文共用一个添加时间，验证键集游标按key区分
+        upstream.put(
+            *(
+                mirror_fixture.make_paper(
+                    f"P{i}", 0, f"Paper {i}", f"2024-01-{i // 2 + 1:02d}T00:00:00Z"
+                )
+                for i in range(PAPER_COUNT)
+            ),
+            *(mirror_fixture.make_pdf(f"A{i}", f"P{i}", 0) for i in range(PAPER_COUNT)),
+        )
+        service.mirror = ZoteroMirror(upstream)
+    monkeypatch.setattr(papers_api, "zotero_service", service)
+
+    app = FastAPI()
+    app.include_router(papers_api.router, prefix="/api/v1")
+    with TestClient(app) as test_client:
+        if service.mirror is not None:
+            test_client.portal.call(service.mirror.sync)
+        yield test_client
+
+
+def test_cursor_pagination(client):
+    ids, pages = [], 0
+    params = {"limit": 3}
+    while True:
+        response = client.get("/api/v1/papers", params=params)
+        assert response.status_code == 200
+        ids.extend(paper["id"] for paper in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": 3, "cursor": cursor}
+
+    # 跟随游标到最后一页，没有重复也没有遗漏
+    assert pages == 3
+    assert len(ids) == len(set(ids)) == PAPER_COUNT
+    assert sorted(ids) == sorted(f"P{i}" for i in range(PAPER_COUNT))
+
+
+def test_ndjson_stream(client):
+    listed = client.get("/api/v1/papers", params={"limit": 5})
+    for response in (
+        client.get("/api/v1/papers", params={"limit": 5, "stream": True}),
+        client.get(
+            "/api/v1/papers",
+            params={"limit": 5},
+            headers={"Accept": "application/x-ndjson"},
+        ),
+    ):
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["X-Next-Cursor"] == listed.headers["X-Next-Cursor"]
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == listed.json()
+
+
+def test_invalid_cursor(client):
+    for cursor in ("not a cursor!", encode_cursor(["start", 3])):
+        response = client.get("/api/v1/papers", params={"cursor": cursor})
+        assert response.status_code == 400
+
+
+def test_facet_filters_without_mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(papers_api, "zotero_service", FakeZoteroService())
+    app = FastAPI()
+    app.include_router(papers_api.router, prefix="/api/v1")
+    client = TestClient(app)
+
+    # 分面过滤需要本地镜像
+    response = client.get("/api/v1/papers", params={"year": "2017"})
+    assert response.status_code == 503
+    # 镜像游标在镜像不可用时失效
+    cursor = encode_cursor({"after": ["2024-01-01T00:00:00Z", "P0"]})
+    assert client.get("/api/v1/papers", params={"cursor": cursor}).status_code == 400
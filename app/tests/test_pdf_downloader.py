@@ -0,0 +1,100 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from app.services.pdf_downloader import PDFDownloader, PDFValidationError
+from app.services.request_scheduler import RequestScheduler
+
+PDF = b"%PDF-1.7\n" + b"x" * 1000 + b"\n%%EOF\n"
+
+
+class FakeContent:
+    def __init__(self, body, fail_after=None):
+        self.body = body
+        self.fail_after = fail_after
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.body), 100):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise aiohttp.ClientPayloadError("connection reset")
+            await asyncio.sleep(0)
+            yield self.body[i : i + 100]
+
+
+class FakeResponse:
+    def __init__(self, status, body, headers, fail_after=None):
+        self.status = status
+        self.headers = headers
+        self.content_length = len(body)
+        self.content = FakeContent(body, fail_after)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """按Range返回内容的会话，第一次请求在传输中途断开"""
+
+    def __init__(self, body=PDF, fail_first=False):
+        self.body = body
+        self.fail_first = fail_first
+        self.requests = []
+
+    def get(self, url, proxy=None, headers=None):
+        self.requests.append(headers)
+        if headers:
+            start = int(headers["Range"].removeprefix("bytes=").rstrip("-"))
+            content_range = f"bytes {start}-{len(self.body) - 1}/{len(self.body)}"
+            return FakeResponse(
+                206, self.body[start:], {"Content-Range": content_range}
+            )
+        fail_after = 500 if self.fail_first and len(self.requests) == 1 else None
+        return FakeResponse(200, self.body, {}, fail_after)
+
+
+def make_downloader():
+    return PDFDownloader(RequestScheduler("test", rate=1000, burst=10, backoff_max=0))
+
+
+async def test_interrupted_download_resumes(tmp_path):
+    downloader = make_downloader()
+    session = FakeSession(fail_first=True)
+    dest = tmp_path / "2301.00001v1"
+
+    assert await downloader.download("url", dest, session) == dest
+    assert dest.read_bytes() == PDF
+    assert session.requests == [None, {"Range": "bytes=500-"}]
+    assert downloader.resumed == 1
+    assert not (tmp_path / "2301.00001v1.part").exists()
+    assert await downloader.is_cached(dest)
+
+
+async def test_concurrent_downloads_are_deduplicated(tmp_path):
+    downloader = make_downloader()
+    session = FakeSession()
+    dest = tmp_path / "paper.pdf"
+
+    paths = await asyncio.gather(
+        *(downloader.download("url", dest, session) for _ in range(3))
+    )
+    assert paths == [dest] * 3
+    assert len(session.requests) == 1
+    assert downloader.deduplicated == 2
+
+
+async def test_invalid_pdf_is_not_cached(tmp_path):
+    downloader = make_downloader()
+    session = FakeSession(body=b"<html>not a pdf</html>")
+    dest = tmp_path / "paper.pdf"
+
+    with pytest.raises(PDFValidationError):
+        await downloader.download("url", dest, session)
+    assert list(tmp_path.iterdir()) == []
+    assert downloader.failures == 1
@@ -0,0 +1,288 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import parse_worker
+from app.services.pdf_parser import (
+    ParserOverloadedError,
+    ParseTimeoutError,
+    PDFParserService,
+)
+from app.tests.pdf_fixture import write_pdf
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_parse_and_cache(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    # markitdown按扩展名选择转换器，用纯文本文件代替PDF即可验证执行与缓存流程
+    document = tmp_path / "paper.txt"
+    document.write_text("Attention is all you need", encoding="utf-8")
+    parser = PDFParserService(mode=mode, max_workers=2, max_tasks_per_child=1)
+    try:
+        assert await parser.parse_pdf(str(document)) == "Attention is all you need"
+        # 工作进程每次转换后被替换，仍可继续解析
+        other = tmp_path / "other.txt"
+        other.write_text("Deep residual learning", encoding="utf-8")
+        assert await parser.parse_pdf(str(other)) == "Deep residual learning"
+    finally:
+        parser.shutdown()
+
+    cached = PDFParserService(mode=mode)
+    assert await cached.parse_pdf(str(document)) == "Attention is all you need"
+    assert cached.executor is None
+
+    with pytest.raises(FileNotFoundError):
+        await cached.parse_pdf(str(tmp_path / "missing.pdf"))
+
+
+async def test_concurrent_parses_are_deduplicated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    document = tmp_path / "paper.txt"
+    document.write_text("content", encoding="utf-8")
+    parser = PDFParserService(mode="thread")
+    calls = []
+
+    def slow_convert(pdf_path):
+        calls.append(pdf_path)
+        time.sleep(0.2)
+        return "converted"
+
+    monkeypatch.setattr(parser, "_convert_sync", slow_convert)
+    try:
+        results = await asyncio.gather(
+            *(parser.parse_pdf(str(document)) for _ in range(3))
+        )
+    finally:
+        parser.shutdown()
+
+    assert results == ["converted"] * 3
+    assert len(calls) == 1
+    assert parser.deduplicated == 2
+    assert not parser._inflight
+    assert len(list(parser.cache_dir.glob("*.md.gz"))) == 1
+    assert not list(parser.cache_dir.glob("*.tmp"))
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_stream_pdf_pages_then_cache(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    # MasterFormat风格的编号被拆成两页：完整转换会合并为一行，逐页提取不会
+    pdf = write_pdf(tmp_path / "paper.pdf", ["First page", ".1", "Scope of work"])
+    parser = PDFParserService(mode=mode, max_workers=2)
+    conversions = []
+    convert = parser._convert
+
+    async def counting_convert(pdf_path, engine="full", spool=None):
+        conversions.append(engine)
+        return await convert(pdf_path, engine, spool)
+
+    monkeypatch.setattr(parser, "_convert", counting_convert)
+    # 两个流式请求都结束后才开始完整转换，否则后开始的请求可能直接读到完整转换的缓存
+    upgrades = []
+    schedule_upgrade = parser._schedule_upgrade
+    monkeypatch.setattr(parser, "_schedule_upgrade", upgrades.append)
+    try:
+        first, second = await asyncio.gather(
+            *(_collect(parser.stream_pdf(str(pdf))) for _ in range(2))
+        )
+        for pdf_path in upgrades:
+            schedule_upgrade(pdf_path)
+        # 并发的流式请求共享一次快速引擎转换（在解析执行器中进行）
+        assert conversions.count("text") == 1
+        streamed = parse_worker.extract_text(str(pdf))
+        assert "".join(first) == "".join(second) == streamed
+        assert first[0].startswith("First page")
+
+        # 流式结果只写入快速引擎的缓存，完整转换在后台进行
+        assert await parser.parse_pdf(str(pdf), engine="text") == streamed
+        await asyncio.gather(*parser._upgrades)
+        expected = parser._convert_sync(str(pdf))
+        assert ".1 Scope of work" in expected
+        assert expected != streamed
+        assert await parser.parse_pdf(str(pdf)) == expected
+        assert conversions.count("full") == 1
+        assert not list(parser.spool_dir.iterdir())
+
+        assert await _collect(parser.stream_pdf(str(pdf))) == [expected]
+    finally:
+        parser.shutdown()
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+async def test_stream_does_not_wait_for_upgrade(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    pdf = write_pdf(tmp_path / "paper.pdf", ["First page", "Second page"])
+    parser = PDFParserService(mode="thread", max_workers=2)
+    started, release = asyncio.Event(), asyncio.Event()
+    convert = parser._convert
+
+    async def held_convert(pdf_path, engine="full", spool=None):
+        if engine == "full":
+            started.set()
+            await release.wait()
+            raise RuntimeError("conversion failed")
+        return await convert(pdf_path, engine, spool)
+
+    monkeypatch.setattr(parser, "_convert", held_convert)
+    try:
+        streamed = await _collect(parser.stream_pdf(str(pdf)))
+        await asyncio.wait_for(started.wait(), 1)
+
+        # 完整转换在后台进行时，再次打开的流直接读取快速引擎的缓存
+        stream = parser.stream_pdf(str(pdf))
+        first = await asyncio.wait_for(anext(stream), 1)
+        assert first.startswith("First page")
+        assert [first, *await _collect(stream)] == streamed
+        assert parser._upgrades
+
+        # 后台完整转换失败不影响流式读取
+        release.set()
+        await asyncio.gather(*parser._upgrades, return_exceptions=True)
+        assert await _collect(parser.stream_pdf(str(pdf))) == streamed
+    finally:
+        release.set()
+        parser.shutdown()
+
+
+async def test_sections_and_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    document = tmp_path / "paper.txt"
+    document.write_text("Abstract\nShort.\n\n1 Introduction\nLonger text.\n")
+    parser = PDFParserService(mode="thread")
+    try:
+        index = await parser.get_sections(str(document))
+        titles = [s["title"] for s in index["sections"]]
+        assert titles == ["Abstract", "1 Introduction"]
+        intro = index["sections"][1]
+        text = await parser.read_range(str(document), intro["start"], intro["end"])
+        assert text == "1 Introduction\nLonger text.\n"
+
+        # 已缓存时按偏移读取压缩文件，不再载入整篇文档
+        loads = 0
+        parse_pdf = parser.parse_pdf
+
+        async def counting_parse(pdf_path):
+            nonlocal loads
+            loads += 1
+            return await parse_pdf(pdf_path)
+
+        parser.parse_pdf = counting_parse
+        assert await parser.read_range(str(document), 0, 8) == "Abstract"
+        assert await parser.read_range(str(document), intro["start"]) == text
+        assert loads == 0
+
+        # 章节索引作为附属文件随缓存写入，随条目一起删除
+        (cache_key,) = [p.name.split(".")[0] for p in parser.cache_dir.glob("*.md.gz")]
+        assert parser._load_sections(cache_key) == index
+        parser.cache._remove([cache_key])
+        assert parser._load_sections(cache_key) is None
+        assert await parser.get_sections(str(document)) == index
+    finally:
+        parser.shutdown()
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_text_engine_and_upgrade(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    pdf = write_pdf(tmp_path / "paper.pdf", ["First page", "Second page"])
+    parser = PDFParserService(mode=mode, max_workers=2)
+    try:
+        text = await parser.parse_pdf(str(pdf), engine="text")
+        assert text.startswith("First page")
+        # 快速引擎使用独立的缓存命名空间
+        assert await parser.is_cached(str(pdf), engine="text")
+        assert not await parser.is_cached(str(pdf))
+
+        content, engine = await parser.parse_fast(str(pdf))
+        assert (content, engine) == (text, "text")
+        await asyncio.gather(*parser._upgrades)
+        assert await parser.is_cached(str(pdf))
+
+        full, engine = await parser.parse_fast(str(pdf))
+        assert engine == "full"
+        # 正文类PDF两级引擎的结果一致
+        assert full == text
+
+        with pytest.raises(ValueError):
+            await parser.parse_pdf(str(pdf), engine="ocr")
+    finally:
+        parser.shutdown()
+
+
+async def test_admission_and_cancellation(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "PDF_PARSE_QUEUE_LIMIT", 1)
+    documents = []
+    for name in ("a", "b", "c"):
+        document = tmp_path / f"{name}.txt"
+        document.write_text(name, encoding="utf-8")
+        documents.append(str(document))
+    parser = PDFParserService(mode="thread", max_workers=1)
+    release = threading.Event()
+
+    def blocking_convert(pdf_path):
+        release.wait(5)
+        return pdf_path
+
+    monkeypatch.setattr(parser, "_convert_sync", blocking_convert)
+    try:
+        running = asyncio.create_task(parser.parse_pdf(documents[0]))
+        queued = asyncio.create_task(parser.parse_pdf(documents[1]))
+        await asyncio.sleep(0.1)
+        assert parser.stats()["queued"] == 1
+
+        # 工作进程与排队名额都已占满，新转换被立即拒绝；后台转换不排队
+        with pytest.raises(ParserOverloadedError):
+            await parser.parse_pdf(documents[2])
+        with pytest.raises(ParserOverloadedError):
+            await parser.parse_pdf(documents[2], background=True)
+
+        # 唯一的等待方取消后，排队中的转换被撤销
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert parser.cancelled == 1
+        assert len(parser._inflight) == 1
+
+        release.set()
+        assert await running == documents[0]
+        assert parser.stats()["rejected"] == 2
+    finally:
+        release.set()
+        parser.shutdown()
+
+
+async def test_parse_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(settings, "PDF_PARSE_TIMEOUT", 0.1)
+    document = tmp_path / "paper.txt"
+    document.write_text("content", encoding="utf-8")
+    parser = PDFParserService(mode="thread")
+    monkeypatch.setattr(parser, "_convert_sync", lambda pdf_path: time.sleep(0.5))
+    try:
+        with pytest.raises(ParseTimeoutError):
+            await parser.parse_pdf(str(document))
+        assert parser.timeouts == 1
+        assert not parser._inflight
+    finally:
+        parser.shutdown()
+
+
+def test_worker_timeout(monkeypatch):
+    # 工作进程内的定时器中止转换本身，即使转换代码捕获了所有Exception
+    def swallowing_convert(pdf_path):
+        try:
+            time.sleep(5)
+        except Exception:
+            return "fallback"
+
+    monkeypatch.setitem(parse_worker.ENGINES, "slow", swallowing_convert)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        parse_worker.run_engine("slow", "paper.pdf", timeout=0.1)
+    assert time.monotonic() - started < 1
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import preparse_scheduler as scheduler_module
+from app.services.attachment_resolver import AttachmentResolutionError, ResolvedPDF
+from app.services.preparse_scheduler import PRIORITY_RECENT, PreparseScheduler
+
+
+class FakeParser:
+    max_workers = 4
+
+    def __init__(self):
+        self.busy = False
+        self.parsed = []
+
+    def is_busy(self, idle_seconds=0.0):
+        return self.busy
+
+    async def is_cached(self, pdf_path, engine="full"):
+        return pdf_path in self.parsed
+
+    async def parse_pdf(self, pdf_path, background=False, engine="full"):
+        assert background
+        self.parsed.append(pdf_path)
+        return f"body of {pdf_path}"
+
+
+class FakeIndex:
+    def __init__(self):
+        self.bodies = {}
+
+    async def index_body(self, paper_key, markdown, paper=None):
+        self.bodies[paper_key] = markdown
+        return True
+
+
+class FakeResolver:
+    async def resolve(self, paper_key):
+        if paper_key == "NOPDF":
+            raise AttachmentResolutionError("No PDF found")
+        return ResolvedPDF(paper_key, f"A{paper_key}", f"/papers/{paper_key}.pdf")
+
+
+class FakeZotero:
+    def __init__(self, keys):
+        self.keys = keys
+
+    async def list_papers(self, limit=100, cursor=None):
+        return [{"key": key} for key in self.keys[:limit]], None
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "PREPARSE_RECENT_LIMIT", 10)
+    monkeypatch.setattr(settings, "PREPARSE_ADJACENT", 1)
+    monkeypatch.setattr(settings, "PREPARSE_IDLE_SECONDS", 0.0)
+    monkeypatch.setattr(scheduler_module, "POLL_INTERVAL", 0.01)
+    keys = ["P1", "P2", "P3", "P4", "NOPDF"]
+    return PreparseScheduler(
+        FakeParser(), FakeResolver(), FakeZotero(keys), FakeIndex()
+    )
+
+
+async def test_adjacent_papers_run_first(scheduler):
+    assert await scheduler.scan_library() == 5
+    scheduler.note_opened("P3")
+    assert [scheduler._pop() for _ in range(5)] == ["P2", "P4", "P1", "P3", "NOPDF"]
+    # 已在队列中的论文不会重复加入
+    scheduler.enqueue(["P1"], PRIORITY_RECENT)
+    assert scheduler.enqueue(["P1"], PRIORITY_RECENT) == 0
+
+
+async def test_waits_for_idle_and_respects_pause(scheduler):
+    await scheduler.scan_library()
+    scheduler.parser.busy = True
+    scheduler.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert scheduler.parser.parsed == []
+
+        scheduler.parser.busy = False
+        scheduler.pause()
+        await asyncio.sleep(0.05)
+        assert scheduler.parser.parsed == []
+
+        scheduler.resume()
+        for _ in range(100):
+            if scheduler.status()["queued"] == 0 and not scheduler.current:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await scheduler.stop()
+
+    assert scheduler.parser.parsed == [f"/papers/P{i}.pdf" for i in range(1, 5)]
+    assert scheduler.status()["skipped"] == 1
+    assert scheduler.index.bodies["P2"] == "body of /papers/P2.pdf"
+
+
+async def test_single_worker_is_left_for_interactive_parses(scheduler, monkeypatch):
+    monkeypatch.setattr(scheduler.parser, "max_workers", 1)
+    await scheduler.scan_library()
+    scheduler.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert scheduler.status()["concurrency"] == 0
+        assert not scheduler.status()["running"]
+        assert scheduler.parser.parsed == []
+    finally:
+        await scheduler.stop()
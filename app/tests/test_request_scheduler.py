@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from app.services.request_scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    RequestScheduler,
+    parse_retry_after,
+)
+
+
+def http_error(status, headers=None):
+    url = URL("https://export.arxiv.org/api/query")
+    request_info = aiohttp.RequestInfo(url, "GET", CIMultiDictProxy(CIMultiDict()), url)
+    return aiohttp.ClientResponseError(request_info, (), status=status, headers=headers)
+
+
+async def test_token_bucket_and_priority_lanes():
+    scheduler = RequestScheduler("test", rate=50, burst=1)
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    started = time.monotonic()
+    await asyncio.gather(
+        request("first", PRIORITY_INTERACTIVE),
+        request("bulk", PRIORITY_BULK),
+        request("interactive", PRIORITY_INTERACTIVE),
+    )
+
+    # 令牌用尽后等待中的请求按优先级放行，速率受令牌桶限制
+    assert order == ["first", "interactive", "bulk"]
+    assert time.monotonic() - started >= 0.035
+    lanes = scheduler.stats()["lanes"]
+    assert lanes["bulk"]["granted"] == 1
+    assert lanes["bulk"]["max_wait_seconds"] > 0
+
+
+async def test_retry_honors_retry_after():
+    scheduler = RequestScheduler("test", rate=1000, burst=10, max_retries=2)
+    attempts = []
+
+    async def throttled_once():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise http_error(503, {"Retry-After": "0.1"})
+        return "ok"
+
+    assert await scheduler.run(throttled_once) == "ok"
+    assert attempts[1] - attempts[0] >= 0.1
+    assert scheduler.stats()["throttled"] == 1
+
+    async def not_found():
+        attempts.append(time.monotonic())
+        raise http_error(404)
+
+    # 不可重试的错误直接抛出
+    with pytest.raises(aiohttp.ClientResponseError):
+        await scheduler.run(not_found)
+    assert scheduler.retries == 1
+    assert scheduler.failures == 1
+
+
+async def test_retry_after_beyond_backoff_max():
+    scheduler = RequestScheduler("test", rate=1000, burst=10, backoff_max=0.05)
+    attempts = []
+
+    async def throttled_once():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise http_error(429, {"Retry-After": "0.2"})
+        return "ok"
+
+    # backoff_max 只限制单次休眠，调度器仍按完整的 Retry-After 暂停
+    retried = asyncio.create_task(scheduler.run(throttled_once))
+    await asyncio.sleep(0.01)
+    started = time.monotonic()
+    await scheduler.acquire()
+    assert time.monotonic() - started >= 0.15
+    assert await retried == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,92 @@
+import pytest
+
+from app.core.config import settings
+from app.services.search_index import (
+    SearchIndex,
+    build_match_query,
+    extract_highlights,
+)
+
+
+def make_paper(key, title, abstract="", tags=()):
+    return {
+        "key": key,
+        "data": {
+            "itemType": "journalArticle",
+            "title": title,
+            "abstractNote": abstract,
+            "creators": [{"firstName": "Ashish", "lastName": "Vaswani"}],
+            "tags": [{"tag": tag} for tag in tags],
+        },
+    }
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    return SearchIndex()
+
+
+def test_build_match_query_escapes_syntax():
+    assert build_match_query('attention "OR" NEAR(') == '"attention" "OR" "NEAR"*'
+    assert build_match_query("  -*  ") == ""
+
+
+def test_extract_highlights():
+    text, highlights = extract_highlights("a \x02big\x03 \x02cat\x03")
+    assert text == "a big cat"
+    assert [text[s:e] for s, e in highlights] == ["big", "cat"]
+
+
+async def test_search_metadata_and_body(index):
+    await index.index_papers(
+        [
+            make_paper("P1", "Attention Is All You Need", tags=("transformer",)),
+            make_paper("P2", "Deep Residual Learning", abstract="residual nets"),
+        ]
+    )
+    assert await index.index_body("P2", "We use batch normalization everywhere.")
+    assert not await index.index_body("P2", "We use batch normalization everywhere.")
+
+    result = await index.search("normaliz")
+    assert [hit["paper_id"] for hit in result["results"]] == ["P2"]
+    hit = result["results"][0]
+    start, end = hit["highlights"][0]
+    assert hit["snippet"][start:end] == "normalization"
+
+    # 元数据更新保留已索引的正文
+    await index.index_papers([make_paper("P2", "ResNet")])
+    assert (await index.search("batch"))["results"][0]["title"] == "ResNet"
+
+    assert (await index.search("transformer"))["total"] == 1
+    await index.on_mirror_sync([], ["P1"])
+    assert (await index.search("transformer"))["total"] == 0
+
+
+class FakeZoteroService:
+    """没有镜像、按偏移分页返回论文的Zotero后端"""
+
+    mirror = None
+
+    def __init__(self, papers):
+        self.papers = papers
+
+    async def get_papers(self, limit=100, q=None, tag=None, start=0):
+        return self.papers[start : start + limit]
+
+
+async def test_reindex_without_mirror(index):
+    service = FakeZoteroService(
+        [make_paper(f"P{i}", f"Paper {i}") for i in range(150)]
+        + [make_paper("ATTN", "Attention Is All You Need")]
+    )
+    assert await index.reindex(service) == 151
+    assert (await index.search("attention"))["total"] == 1
+
+    # 重建时同步编辑与删除
+    service.papers = [make_paper("ATTN", "Transformers")] + service.papers[:150]
+    service.papers.pop()
+    assert await index.reindex(service) == 2
+    assert (await index.search("attention"))["total"] == 0
+    assert (await index.search("transformers"))["total"] == 1
+    assert (await index.search("149"))["total"] == 0
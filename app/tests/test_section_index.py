@@ -0,0 +1,59 @@
+from app.services.section_index import build_section_index
+
+MARKDOWN = """Attention Is All You Need
+
+Abstract
+The dominant sequence transduction models are based on RNNs.
+
+1 Introduction
+Recurrent neural networks have been established.
+
+3 Model Architecture
+Most competitive models have an encoder-decoder structure.
+
+3.1 Encoder and Decoder Stacks
+The encoder is composed of N = 6 identical layers.
+2 heads are used in this sentence that is not a heading.
+
+3.2 Attention
+An attention function maps a query to an output — 注意力。
+
+References
+[1] Ba et al. Layer normalization.
+"""
+
+
+def test_build_section_index():
+    index = build_section_index(MARKDOWN)
+    encoded = MARKDOWN.encode("utf-8")
+    assert index["bytes"] == len(encoded)
+
+    sections = index["sections"]
+    assert [(s["title"], s["level"]) for s in sections] == [
+        ("Abstract", 1),
+        ("1 Introduction", 1),
+        ("3 Model Architecture", 1),
+        ("3.1 Encoder and Decoder Stacks", 2),
+        ("3.2 Attention", 2),
+        ("References", 1),
+    ]
+
+    # 章节区间包含子章节，直到下一个同级标题
+    model = encoded[sections[2]["start"] : sections[2]["end"]].decode("utf-8")
+    assert model.startswith("3 Model Architecture")
+    assert "3.2 Attention" in model and "References" not in model
+
+    attention = encoded[sections[4]["start"] : sections[4]["end"]].decode("utf-8")
+    assert attention.endswith("注意力。\n\n")
+    assert sections[4]["tokens"] == -(-len(attention) // 4)
+    assert sections[-1]["end"] == len(encoded)
+
+
+def test_atx_headings():
+    index = build_section_index("# Title\ntext\n## Part\nmore\n# Next\n")
+    assert [(s["title"], s["level"]) for s in index["sections"]] == [
+        ("Title", 1),
+        ("Part", 2),
+        ("Next", 1),
+    ]
+    assert build_section_index("")["sections"] == []
@@ -0,0 +1,205 @@
+import pytest
+
+from app.core.config import settings
+from app.services.zotero_mirror import PaperFilters, ZoteroMirror
+
+
+def make_paper(key: str, version: int, title: str, date_added: str, tags=()):
+    return {
+        "key": key,
+        "version": version,
+        "meta": {"parsedDate": "2017-06-12"},
+        "data": {
+            "key": key,
+            "itemType": "journalArticle",
+            "title": title,
+            "creators": [
+                {"creatorType": "author", "firstName": "Ashish", "lastName": "Vaswani"}
+            ],
+            "dateAdded": date_added,
+            "tags": [{"tag": tag} for tag in tags],
+        },
+    }
+
+
+def make_pdf(key: str, parent: str, version: int):
+    return {
+        "key": key,
+        "version": version,
+        "links": {"enclosure": {"href": f"file:///papers/{key}.pdf"}},
+        "data": {
+            "key": key,
+            "itemType": "attachment",
+            "parentItem": parent,
+            "contentType": "application/pdf",
+            "dateAdded": "2024-01-01T00:00:00Z",
+        },
+    }
+
+
+class FakeZoteroService:
+    """按库版本返回变更的假Zotero服务"""
+
+    def __init__(self):
+        self.items: dict[str, dict] = {}
+        self.deleted: dict[str, int] = {}
+        self.version = 0
+
+    def put(self, *items):
+        self.version += 1
+        for item in items:
+            item["version"] = self.version
+            self.items[item["key"]] = item
+
+    def delete(self, key):
+        self.version += 1
+        self.items.pop(key)
+        self.deleted[key] = self.version
+
+    async def get_items_since(self, since, start=0, limit=100):
+        changed = [item for item in self.items.values() if item["version"] > since]
+        return changed[start : start + limit], self.version
+
+    async def get_deleted_since(self, since):
+        return {"items": [k for k, v in self.deleted.items() if v > since]}
+
+    async def get_pdf_file_path(self, attachment_key):
+        return None
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path)
+    return ZoteroMirror(FakeZoteroService())
+
+
+async def test_mirror_incremental_sync(mirror):
+    upstream = mirror.zotero_service
+    assert not await mirror.is_ready()
+
+    upstream.put(
+        make_paper("P1", 0, "Attention Is All You Need", "2024-01-01", ["nlp"]),
+        make_pdf("A1", "P1", 0),
+        make_paper("P2", 0, "Deep Residual Learning", "2024-02-01", ["cv"]),
+        make_pdf("A2", "P2", 0),
+        make_paper("P3", 0, "No PDF Here", "2024-03-01"),
+    )
+    assert await mirror.sync() == 5
+    assert await mirror.is_ready()
+
+    papers = await mirror.query_papers()
+    assert [paper["key"] for paper in papers] == ["P2", "P1"]
+    assert papers[1]["pdf_path"] == "file:///papers/A1.pdf"
+    assert [p["key"] for p in await mirror.query_papers(q="attention")] == ["P1"]
+    assert [p["key"] for p in await mirror.query_papers(tag="cv")] == ["P2"]
+    after = [papers[0]["data"]["dateAdded"], papers[0]["key"]]
+    assert [p["key"] for p in await mirror.query_papers(after=after)] == ["P1"]
+
+    # 无变更时不写入
+    assert await mirror.sync() == 0
+
+    upstream.put(make_paper("P1", 0, "Attention Is All You Need v2", "2024-01-01"))
+    upstream.delete("P2")
+    assert await mirror.sync() == 2
+
+    papers = await mirror.query_papers()
+    assert [paper["key"] for paper in papers] == ["P1"]
+    assert papers[0]["data"]["title"] == "Attention Is All You Need v2"
+    assert await mirror.query_papers(tag="nlp") == []
+    assert await mirror.get_paper("P2") is None
+
+
+async def test_mirror_facets(mirror):
+    upstream = mirror.zotero_service
+    attention = make_paper("P1", 0, "Attention", "2024-01-01", ["nlp", "transformer"])
+    attention["data"]["publicationTitle"] = "NeurIPS"
+    bert = make_paper("P2", 0, "BERT", "2024-02-01", ["nlp"])
+    bert["meta"]["parsedDate"] = "2019-06-01"
+    bert["data"]["publicationTitle"] = "NAACL"
+    upstream.put(
+        attention,
+        make_pdf("A1", "P1", 0),
+        bert,
+        make_pdf("A2", "P2", 0),
+        make_paper("P3", 0, "No PDF", "2024-03-01", ["nlp"]),
+    )
+    await mirror.sync()
+
+    facets = await mirror.get_facets()
+    assert facets["total"] == 2
+    assert facets["tags"] == [
+        {"value": "nlp", "count": 2},
+        {"value": "transformer", "count": 1},
+    ]
+    assert facets["years"] == [
+        {"value": "2019", "count": 1},
+        {"value": "2017", "count": 1},
+    ]
+    assert facets["has_pdf"] == [
+        {"value": "true", "count": 2},
+        {"value": "false", "count": 1},
+    ]
+
+    # 同一分面内为OR，不同分面之间为AND
+    filters = PaperFilters(tags=["nlp"], journals=["NeurIPS", "NAACL"], years=["2019"])
+    assert [p["key"] for p in await mirror.query_papers(filters=filters)] == ["P2"]
+    facets = await mirror.get_facets(filters=filters)
+    assert facets["total"] == 1
+    # 年份分面忽略自身的过滤条件
+    assert {entry["value"] for entry in facets["years"]} == {"2017", "2019"}
+    assert [
+        p["key"] for p in await mirror.query_papers(filters=PaperFilters(has_pdf=None))
+    ] == ["P3", "P2", "P1"]
+
+    # 删除附件后分面增量更新
+    upstream.delete("A1")
+    await mirror.sync()
+    facets = await mirror.get_facets(filters=PaperFilters(has_pdf=False))
+    assert facets["total"] == 2
+    assert facets["journals"] == [{"value": "NeurIPS", "count": 1}]
+
+
+async def test_file_urls_are_resolved_during_sync(mirror):
+    upstream = mirror.zotero_service
+    lookups = []
+    fail = True
+
+    async def get_pdf_file_path(attachment_key):
+        lookups.append(attachment_key)
+        if fail and attachment_key == "A2":
+            raise ConnectionError("Zotero unavailable")
+        return f"/papers/{attachment_key}.pdf"
+
+    upstream.get_pdf_file_path = get_pdf_file_path
+    # 本地API未给出 file:// 链接的附件
+    linked, broken = make_pdf("A1", "P1", 0), make_pdf("A2", "P2", 0)
+    del linked["links"], broken["links"]
+    upstream.put(
+        make_paper("P1", 0, "Attention", "2024-01-01"),
+        linked,
+        make_paper("P2", 0, "BERT", "2024-02-01"),
+        broken,
+    )
+    await mirror.sync()
+    assert sorted(lookups) == ["A1", "A2"]
+
+    # 读取只使用镜像中的结果，失败的附件带有 pdf_error
+    lookups.clear()
+    papers = {paper["key"]: paper for paper in await mirror.query_papers()}
+    assert papers["P1"]["pdf_path"] == "/papers/A1.pdf"
+    assert "pdf_path" not in papers["P2"]
+    assert papers["P2"]["pdf_error"] == "Zotero unavailable"
+    assert (await mirror.get_paper("P2"))["pdf_error"] == "Zotero unavailable"
+    assert lookups == []
+
+    # 失败的附件在下次同步时重试，库未变更时也会重试
+    fail = False
+    assert await mirror.sync() == 0
+    assert lookups == ["A2"]
+    paper = await mirror.get_paper("P2")
+    assert paper["pdf_path"] == "/papers/A2.pdf"
+    assert "pdf_error" not in paper
+
+    # 已取得地址的附件不再查询
+    assert await mirror.sync() == 0
+    assert lookups == ["A2"]
@@ -0,0 +1,143 @@
+import asyncio
+
+from app.services.zotero_service import ZoteroService
+
+
+class FakeZoteroService(ZoteroService):
+    """不访问网络的ZoteroService，用于测试列表组装逻辑"""
+
+    def __init__(self, papers: list[dict]):
+        super().__init__(user_id=0)
+        self.papers = papers
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_papers(self, limit=100, q=None, tag=None, start=0):
+        return [dict(paper) for paper in self.papers[start : start + limit]]
+
+    async def get_pdf_attachments(self, item_key):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # 倒序完成，验证结果仍保持原有顺序
+            await asyncio.sleep(0.001 * (100 - int(item_key[1:])))
+            if item_key == "P3":
+                raise RuntimeError("upstream failed")
+            if item_key == "P5":
+                return []
+            return [{"key": f"A{item_key[1:]}"}]
+        finally:
+            self.in_flight -= 1
+
+    async def get_pdf_file_path(self, attachment_key):
+        return f"file:///papers/{attachment_key}.pdf"
+
+
+async def test_get_papers_with_pdfs_keeps_order_and_isolates_failures(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "ZOTERO_MAX_CONCURRENCY", 3)
+    service = FakeZoteroService([{"key": f"P{i}"} for i in range(10)])
+
+    papers = await service.get_papers_with_pdfs(limit=10)
+
+    assert [paper["key"] for paper in papers] == [f"P{i}" for i in range(10) if i != 5]
+    failed = next(paper for paper in papers if paper["key"] == "P3")
+    assert "pdf_error" in failed and "pdf_attachments" not in failed
+    assert papers[0]["pdf_path"] == "file:///papers/A0.pdf"
+    assert service.max_in_flight <= 3
+
+
+class BatchedZoteroService(ZoteroService):
+    """记录上游调用次数的ZoteroService"""
+
+    def __init__(self):
+        super().__init__(user_id=0)
+        self.calls: list[str] = []
+
+    async def get_items_by_keys(self, keys):
+        self.calls.append("items")
+        return [
+            {
+                "key": key,
+                "data": {"itemType": "attachment", "contentType": "application/pdf"},
+                "links": {"enclosure": {"href": f"file:///papers/{key}.pdf"}},
+            }
+            for key in keys
+        ]
+
+    async def get_pdf_attachments(self, item_key):
+        self.calls.append("children")
+        return []
+
+    async def get_pdf_file_path(self, attachment_key):
+        self.calls.append("file")
+        return None
+
+
+async def test_resolve_pdf_attachments_batches_best_attachments():
+    service = BatchedZoteroService()
+    papers = [
+        {
+            "key": f"P{i}",
+            "links": {
+                "attachment": {
+                    "href": f"http://localhost:23119/api/users/0/items/A{i}",
+                    "attachmentType": "application/pdf",
+                }
+            },
+        }
+        for i in range(60)
+    ]
+    papers.append({"key": "NOPDF", "meta": {"numChildren": 0}})
+
+    resolved = await service.resolve_pdf_attachments(papers)
+
+    assert service.calls == ["items"]
+    assert len(resolved) == 60
+    assert resolved["P7"]["attachments"][0]["key"] == "A7"
+    assert resolved["P7"]["pdf_path"] == "file:///papers/A7.pdf"
+    assert "NOPDF" not in resolved
+
+
+async def test_get_json_revalidates_with_library_version():
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    requests = []
+
+    async def top_items(request):
+        requests.append(request.headers.get("If-Modified-Since-Version"))
+        if request.headers.get("If-Modified-Since-Version") == "7":
+            return web.Response(status=304)
+        return web.json_response(
+            [{"key": "P1", "data": {"title": "Cached"}}],
+            headers={"Last-Modified-Version": "7"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/api/users/0/items/top", top_items)
+    async with TestServer(app) as server:
+        service = ZoteroService(user_id=0, base_url=str(server.make_url("")))
+
+        first = await service.get_papers(limit=10)
+        first[0]["pdf_path"] = "mutated"
+        second = await service.get_papers(limit=10)
+
+    assert requests == [None, "7"]
+    assert second == [{"key": "P1", "data": {"title": "Cached"}}]
+    assert service.response_cache.stats()["hits"] == 1
+    assert service.response_cache.stats()["misses"] == 1
+
+
+def test_response_cache_key_escapes_values():
+    from app.services.response_cache import ResponseCache
+
+    path = "/api/users/0/items/top"
+    assert ResponseCache.make_key(path, {"q": "a", "limit": 10}) == (
+        ResponseCache.make_key(path, {"limit": 10, "q": "a"})
+    )
+    # 查询词中的 & 与 = 不会与其他参数混淆
+    assert ResponseCache.make_key(path, {"q": "a&limit=10"}) != (
+        ResponseCache.make_key(path, {"q": "a", "limit": 10})
+    )
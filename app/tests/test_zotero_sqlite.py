@@ -0,0 +1,162 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.core.config import settings
+from app.services.zotero_mirror import PaperFilters
+from app.services.zotero_sqlite import ZoteroSQLiteService
+from app.tests.zotero_fixture import ZoteroFixture, create_zotero_db
+
+
+@pytest.fixture
+def zotero_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", tmp_path / "data")
+    data_dir = tmp_path / "Zotero"
+    db, fixture = create_zotero_db(data_dir)
+
+    attention = fixture.add_paper(
+        "ATTN0001",
+        "Attention Is All You Need",
+        "2024-01-01 10:00:00",
+        authors=(("Ashish", "Vaswani"), ("Noam", "Shazeer")),
+        tags=("nlp", "transformer"),
+        date="2017-06-12 June 12, 2017",
+        publicationTitle="NeurIPS",
+    )
+    fixture.add_attachment("PDF00001", attention, "storage:attention.pdf")
+    fixture.add_attachment(
+        "HTML0001", attention, "storage:snapshot.html", content_type="text/html"
+    )
+
+    resnet = fixture.add_paper(
+        "RESN0001", "Deep Residual Learning", "2024-02-01 10:00:00", tags=("cv",)
+    )
+    fixture.add_attachment("PDF00002", resnet, "/abs/resnet.pdf")
+
+    fixture.add_paper("NOPDF001", "Paper Without PDF", "2024-03-01 10:00:00")
+    trashed = fixture.add_paper("TRASH001", "Trashed Paper", "2024-04-01 10:00:00")
+    fixture.delete(trashed)
+
+    db.commit()
+    db.close()
+    return data_dir
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+async def test_get_papers(zotero_dir, snapshot):
+    service = ZoteroSQLiteService(zotero_dir, snapshot=snapshot)
+
+    assert await service.test_connection()
+    papers = await service.get_papers()
+    assert [paper["key"] for paper in papers] == ["NOPDF001", "RESN0001", "ATTN0001"]
+
+    attention = papers[-1]
+    assert attention["data"]["date"] == "June 12, 2017"
+    assert attention["meta"]["parsedDate"] == "2017-06-12"
+    assert attention["data"]["publicationTitle"] == "NeurIPS"
+    assert [c["lastName"] for c in attention["data"]["creators"]] == [
+        "Vaswani",
+        "Shazeer",
+    ]
+    assert sorted(tag["tag"] for tag in attention["data"]["tags"]) == [
+        "nlp",
+        "transformer",
+    ]
+
+    assert [p["key"] for p in await service.get_papers(q="vaswani")] == ["ATTN0001"]
+    assert [p["key"] for p in await service.get_papers(tag="cv")] == ["RESN0001"]
+
+
+async def test_concurrent_snapshot_refresh(zotero_dir):
+    service = ZoteroSQLiteService(zotero_dir, snapshot=True)
+    assert len(await service.get_papers()) == 3
+
+    # 源数据库变化后，并发的查询同时触发快照刷新
+    db = sqlite3.connect(zotero_dir / "zotero.sqlite")
+    fixture = ZoteroFixture(db)
+    fixture.next_id = 100
+    fixture.add_paper("NEW00001", "New Paper", "2024-05-01 10:00:00")
+    db.commit()
+    db.close()
+
+    results = await asyncio.gather(*(service.get_papers() for _ in range(8)))
+    assert all(papers[0]["key"] == "NEW00001" for papers in results)
+    assert not list(service.snapshot_path.parent.glob("*.tmp"))
+
+
+async def test_pdf_attachments_and_paths(zotero_dir):
+    service = ZoteroSQLiteService(zotero_dir)
+
+    attachments = await service.get_pdf_attachments("ATTN0001")
+    assert [attachment["key"] for attachment in attachments] == ["PDF00001"]
+    assert attachments[0]["data"]["parentItem"] == "ATTN0001"
+
+    expected = (zotero_dir / "storage" / "PDF00001" / "attention.pdf").as_uri()
+    assert await service.get_pdf_file_path("PDF00001") == expected
+
+    papers = await service.get_papers_with_pdfs()
+    assert [paper["key"] for paper in papers] == ["RESN0001", "ATTN0001"]
+    assert papers[0]["pdf_path"] == "file:///abs/resnet.pdf"
+    assert papers[1]["pdf_path"] == expected
+
+    paper = await service.get_paper("ATTN0001")
+    assert paper["pdf_path"] == expected
+
+
+async def test_filters_without_mirror(zotero_dir):
+    service = ZoteroSQLiteService(zotero_dir)
+
+    async def keys(**kwargs):
+        papers, _ = await service.list_papers(**kwargs)
+        return [paper["key"] for paper in papers]
+
+    assert await keys() == ["RESN0001", "ATTN0001"]
+    assert await keys(filters=PaperFilters(has_pdf=None)) == [
+        "NOPDF001",
+        "RESN0001",
+        "ATTN0001",
+    ]
+    assert await keys(filters=PaperFilters(has_pdf=False)) == ["NOPDF001"]
+    assert await keys(filters=PaperFilters(tags=["nlp", "transformer"])) == ["ATTN0001"]
+    assert await keys(filters=PaperFilters(tags=["nlp", "cv"])) == []
+    assert await keys(filters=PaperFilters(years=["2017"])) == ["ATTN0001"]
+    assert await keys(filters=PaperFilters(journals=["NeurIPS"])) == ["ATTN0001"]
+    assert await keys(q="residual", filters=PaperFilters(has_pdf=None)) == ["RESN0001"]
+
+    # 键集分页
+    first, cursor = await service.list_papers(
+        limit=2, filters=PaperFilters(has_pdf=None)
+    )
+    assert [paper["key"] for paper in first] == ["NOPDF001", "RESN0001"]
+    assert first[1]["pdf_path"] == "file:///abs/resnet.pdf"
+    rest, cursor = await service.list_papers(
+        limit=2, cursor=cursor, filters=PaperFilters(has_pdf=None)
+    )
+    assert [paper["key"] for paper in rest] == ["ATTN0001"]
+    assert cursor is None
+
+
+async def test_facets_without_mirror(zotero_dir):
+    service = ZoteroSQLiteService(zotero_dir)
+
+    facets = await service.get_facets()
+    assert facets["total"] == 2
+    assert {entry["value"]: entry["count"] for entry in facets["tags"]} == {
+        "cv": 1,
+        "nlp": 1,
+        "transformer": 1,
+    }
+    assert facets["years"] == [{"value": "2017", "count": 1}]
+    assert facets["journals"] == [{"value": "NeurIPS", "count": 1}]
+    assert facets["item_types"] == [{"value": "journalArticle", "count": 2}]
+    # 每个分面忽略自身的过滤条件
+    assert facets["has_pdf"] == [
+        {"value": "true", "count": 2},
+        {"value": "false", "count": 1},
+    ]
+
+    narrowed = await service.get_facets(filters=PaperFilters(years=["2017"]))
+    assert narrowed["total"] == 1
+    assert narrowed["years"] == [{"value": "2017", "count": 1}]
+    assert [entry["value"] for entry in narrowed["tags"]] == ["nlp", "transformer"]
@@ -0,0 +1,173 @@
+"""
+生成最小化的 zotero.sqlite 测试数据库
+只包含 ZoteroSQLiteService 用到的表，可用于测试与本地基准测试：
+
+    python -m app.tests.zotero_fixture /tmp/zotero 10000
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE libraries (libraryID INTEGER PRIMARY KEY, type TEXT NOT NULL);
+CREATE TABLE itemTypesCombined (
+    itemTypeID INT NOT NULL PRIMARY KEY, typeName TEXT NOT NULL
+);
+CREATE TABLE fieldsCombined (fieldID INT NOT NULL PRIMARY KEY, fieldName TEXT NOT NULL);
+CREATE TABLE creatorTypes (creatorTypeID INTEGER PRIMARY KEY, creatorType TEXT);
+CREATE TABLE items (
+    itemID INTEGER PRIMARY KEY,
+    itemTypeID INT NOT NULL,
+    dateAdded TIMESTAMP NOT NULL,
+    dateModified TIMESTAMP NOT NULL,
+    libraryID INT NOT NULL,
+    key TEXT NOT NULL,
+    version INT NOT NULL DEFAULT 0,
+    UNIQUE (libraryID, key)
+);
+CREATE TABLE itemDataValues (valueID INTEGER PRIMARY KEY, value UNIQUE);
+CREATE TABLE itemData (
+    itemID INT, fieldID INT, valueID, PRIMARY KEY (itemID, fieldID)
+);
+CREATE TABLE creators (
+    creatorID INTEGER PRIMARY KEY, firstName TEXT, lastName TEXT, fieldMode INT
+);
+CREATE TABLE itemCreators (
+    itemID INT NOT NULL, creatorID INT NOT NULL, creatorTypeID INT NOT NULL,
+    orderIndex INT NOT NULL, PRIMARY KEY (itemID, creatorID, creatorTypeID, orderIndex)
+);
+CREATE TABLE tags (tagID INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE itemTags (
+    itemID INT NOT NULL, tagID INT NOT NULL, type INT NOT NULL,
+    PRIMARY KEY (itemID, tagID)
+);
+CREATE TABLE itemAttachments (
+    itemID INTEGER PRIMARY KEY, parentItemID INT, linkMode INT,
+    contentType TEXT, path TEXT
+);
+CREATE INDEX itemAttachments_parentItemID ON itemAttachments(parentItemID);
+CREATE TABLE itemNotes (itemID INTEGER PRIMARY KEY, parentItemID INT, note TEXT);
+CREATE TABLE deletedItems (itemID INTEGER PRIMARY KEY, dateDeleted DEFAULT 0);
+"""
+
+ITEM_TYPES = {"journalArticle": 1, "attachment": 2, "note": 3, "preprint": 4}
+FIELDS = {"title": 1, "date": 2, "publicationTitle": 3, "abstractNote": 4, "DOI": 5}
+
+
+class ZoteroFixture:
+    """向测试数据库中写入条目的辅助类"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+        self.next_id = 1
+
+    def _add_item(self, key: str, item_type: str, date_added: str) -> int:
+        item_id = self.next_id
+        self.next_id += 1
+        self.db.execute(
+            "INSERT INTO items VALUES (?, ?, ?, ?, 1, ?, ?)",
+            (item_id, ITEM_TYPES[item_type], date_added, date_added, key, item_id),
+        )
+        return item_id
+
+    def _set_field(self, item_id: int, field: str, value: str) -> None:
+        self.db.execute(
+            "INSERT OR IGNORE INTO itemDataValues (value) VALUES (?)", (value,)
+        )
+        self.db.execute(
+            """
+            INSERT INTO itemData
+            SELECT ?, ?, valueID FROM itemDataValues WHERE value = ?
+            """,
+            (item_id, FIELDS[field], value),
+        )
+
+    def add_paper(
+        self,
+        key: str,
+        title: str,
+        date_added: str,
+        authors: tuple[tuple[str, str], ...] = (),
+        tags: tuple[str, ...] = (),
+        date: str = "",
+        **fields: str,
+    ) -> int:
+        item_id = self._add_item(key, "journalArticle", date_added)
+        self._set_field(item_id, "title", title)
+        if date:
+            self._set_field(item_id, "date", date)
+        for field, value in fields.items():
+            self._set_field(item_id, field, value)
+        for index, (first, last) in enumerate(authors):
+            cursor = self.db.execute(
+                "INSERT INTO creators (firstName, lastName, fieldMode) VALUES (?, ?, 0)",
+                (first, last),
+            )
+            self.db.execute(
+                "INSERT INTO itemCreators VALUES (?, ?, 1, ?)",
+                (item_id, cursor.lastrowid, index),
+            )
+        for tag in tags:
+            self.db.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
+            self.db.execute(
+                "INSERT INTO itemTags SELECT ?, tagID, 0 FROM tags WHERE name = ?",
+                (item_id, tag),
+            )
+        return item_id
+
+    def add_attachment(
+        self,
+        key: str,
+        parent_id: int,
+        path: str,
+        content_type: str = "application/pdf",
+        date_added: str = "2024-01-01 00:00:00",
+    ) -> int:
+        item_id = self._add_item(key, "attachment", date_added)
+        self.db.execute(
+            "INSERT INTO itemAttachments VALUES (?, ?, 0, ?, ?)",
+            (item_id, parent_id, content_type, path),
+        )
+        return item_id
+
+    def delete(self, item_id: int) -> None:
+        self.db.execute("INSERT INTO deletedItems (itemID) VALUES (?)", (item_id,))
+
+
+def create_zotero_db(data_dir: Path) -> tuple[sqlite3.Connection, ZoteroFixture]:
+    """在data_dir下创建空的 zotero.sqlite"""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(data_dir / "zotero.sqlite")
+    db.executescript(SCHEMA)
+    db.execute("INSERT INTO libraries VALUES (1, 'user')")
+    db.executemany(
+        "INSERT INTO itemTypesCombined VALUES (?, ?)",
+        [(v, k) for k, v in ITEM_TYPES.items()],
+    )
+    db.executemany(
+        "INSERT INTO fieldsCombined VALUES (?, ?)", [(v, k) for k, v in FIELDS.items()]
+    )
+    db.execute("INSERT INTO creatorTypes VALUES (1, 'author')")
+    return db, ZoteroFixture(db)
+
+
+def build_large_library(data_dir: Path, n_papers: int) -> None:
+    """生成包含n_papers篇带PDF论文的数据库，用于基准测试"""
+    db, fixture = create_zotero_db(data_dir)
+    for i in range(n_papers):
+        parent_id = fixture.add_paper(
+            f"P{i:07d}",
+            f"Paper {i}",
+            f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}",
+            authors=(("Author", f"Number{i % 100}"),),
+            tags=(f"tag{i % 20}",),
+            date=f"{2000 + i % 25}-01-01 {2000 + i % 25}",
+        )
+        fixture.add_attachment(f"A{i:07d}", parent_id, f"storage:paper{i}.pdf")
+    db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    build_large_library(Path(sys.argv[1]), int(sys.argv[2]))